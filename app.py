@@ -2,54 +2,17 @@
 import streamlit as st
 import pandas as pd
 
-# --- Константы ---
-LIMIT_SNR_MONTH = 1_300_000       # месячный лимит для СНР (≈300 МРП)
-LIMIT_SNR_YEAR = 2_500_000_000    # годовой лимит для СНР (~2,5 млрд тг)
-
-# --- Функции ---
-def calculate_taxes(entity, mode, income_year, salaries_year, expenses_year):
-    """Расчёт налогов по выбранному режиму"""
-    tax = 0
-    warnings = []
-    after_tax_income = income_year
-
-    if mode == "snr_individual":
-        if salaries_year > 0:
-            warnings.append("⚠️ СНР неприменим для физлица с сотрудниками.")
-        if income_year / 12 > LIMIT_SNR_MONTH:
-            warnings.append("⚠️ Доход превышает лимит для СНР (~1,3 млн ₸ в месяц).")
-        if income_year > LIMIT_SNR_YEAR:
-            warnings.append("⚠️ Доход превышает лимит для СНР (2,5 млрд ₸ в год).")
-        tax = income_year * 0.04
-        after_tax_income = income_year - tax
-
-    elif mode == "snr_ip_too_kh":
-        if income_year / 12 > LIMIT_SNR_MONTH:
-            warnings.append("⚠️ Внимание!!! Доход превышает лимит для СНР (~1,3 млн ₸ в месяц).")
-        if income_year > LIMIT_SNR_YEAR:
-            warnings.append("⚠️ Внимание!!! Доход превышает лимит для СНР (2,5 млрд ₸ в год).")
-        tax = income_year * 0.04
-        after_tax_income = income_year - tax - salaries_year
-
-    elif mode == "general_ip":
-        profit = income_year - expenses_year - salaries_year
-        if profit <= 0:
-            tax = 0
-            warnings.append("⚠️ У вас убыток, налог на прибыль не взимается.")
-        else:
-            tax = profit * 0.10
-        after_tax_income = income_year - expenses_year - salaries_year - tax
-
-    elif mode == "general_too":
-        profit = income_year - expenses_year - salaries_year
-        if profit <= 0:
-            tax = 0
-            warnings.append("⚠️ У вас убыток, налог на прибыль не взимается.")
-        else:
-            tax = profit * 0.20
-        after_tax_income = income_year - expenses_year - salaries_year - tax
+from taxcore.catalog import ELIGIBLE_MODES
+from taxcore.regimes import REGIME_BY_KEY
+from taxcore.simple import LIMIT_SNR_YEAR, calculate_taxes
 
-    return tax, after_tax_income, warnings
+# подписи режимов в app (какие режимы доступны — taxcore.catalog.ELIGIBLE_MODES)
+MODE_DESCRIPTIONS = {
+    "snr_individual": "СНР — Специальный налоговый режим (самозанятые, 4%)",
+    "snr_ip_too_kh": "СНР — Специальный налоговый режим (упрощённый/розничный, 4%)",
+    "general_ip": "Общий режим — ИП (налог на прибыль 10%)",
+    "general_too": "Общий режим — ТОО (КПН 20%)",
+}
 
 
 # --- Streamlit UI ---
@@ -87,21 +50,12 @@ def main():
 
     period_choice = st.radio("За какой период введены данные?", ["В месяц", "В год"])
 
-    # --- Доступные режимы ---
-    available_modes = []
-    if entity == "individual":
-        if not has_employees:
-            available_modes.append(("СНР — Специальный налоговый режим (самозанятые, 4%)", "snr_individual"))
-    elif entity in ["ip", "too", "kh"]:
-        available_modes.append(("СНР — Специальный налоговый режим (упрощённый/розничный, 4%)", "snr_ip_too_kh"))
-        if entity == "ip":
-            available_modes.append(("Общий режим — ИП (налог на прибыль 10%)", "general_ip"))
-        elif entity == "too":
-            available_modes.append(("Общий режим — ТОО (КПН 20%)", "general_too"))
-
-    # фильтрация СНР по лимиту
+    # --- Доступные режимы: по типу налогоплательщика и запрету сотрудников из реестра ---
+    available_modes = [(MODE_DESCRIPTIONS[mk], mk) for mk in ELIGIBLE_MODES[entity, has_employees]]
+
+    # фильтрация СНР по лимиту (режимы с годовым лимитом в реестре)
     if income * (12 if period_choice == "В месяц" else 1) > LIMIT_SNR_YEAR:
-        available_modes = [m for m in available_modes if not m[1].startswith("snr")]
+        available_modes = [m for m in available_modes if REGIME_BY_KEY[m[1]].year_limit is None]
 
     if not available_modes:
         st.error("⚠️ Для вашего типа и дохода нет доступных режимов.")
@@ -1,114 +1,182 @@
 # app2.py
+import os
+
 import streamlit as st
 import pandas as pd
 
-st.set_page_config(page_title="Налоговый калькулятор 2.1", page_icon="📊", layout="centered")
-
-# --- Константы ---
-LIMIT_SNR_MONTH = 1_300_000       # месячный лимит для СНР (~1.3M)
-LIMIT_SNR_YEAR = 16_000_000       # годовой лимит для СНР (~16M) - ориентировочно
-# (в коде используем оба лимита; при изменениях законов поправь значения)
-
-# социальные ставки (можно вынести в конфиг)
-RATE_OPV = 0.10         # ОПВ (удержание с работника)
-RATE_OSMS_EMP = 0.02    # ОСМС (удержание с работника)
-RATE_IPN = 0.10         # ИПН (условно 10% от базы)
-RATE_SO = 0.035         # СО (начисление работодателя)
-RATE_OSMS_ER = 0.03     # ОСМС (работодателя)
-RATE_SOC_TAX = 0.095    # Социальный налог (примерно)
-RATE_OS_NS = 0.005      # ОС НС (0.5% как пример)
-
-# налоговые ставки режимов
-RATE_SNR = 0.04
-RATE_IP_GENERAL = 0.10
-RATE_TOO_KPN = 0.20
-
-# --- Вспомогательные функции ---
-def to_annual(value, period_choice):
-    """Пересчитать в годовые значения в зависимости от периода."""
-    try:
-        if period_choice == "В месяц":
-            return value * 12
-        else:
-            return value
-    except:
-        return 0.0
-
-def money(x):
-    return f"{x:,.2f} ₸"
-
-def calc_salary_items(salaries_annual):
-    """Возвращает словарь удержаний (employee) и начислений (employer) и суммарные суммы.
-       Important: IPN - удержание сотрудника, не включаем в налог компании, но показываем."""
-    emp = {}
-    er = {}
-    emp["ОПВ (10%)"] = salaries_annual * RATE_OPV
-    emp["ОСМС (удержание, 2%)"] = salaries_annual * RATE_OSMS_EMP
-    # налог на доходы физлиц (удержание, показываем отдельно)
-    taxable_base_for_ipn = max(0.0, salaries_annual - emp["ОПВ (10%)"] - emp["ОСМС (удержание, 2%)"])
-    emp["ИПН (10% от базы)"] = taxable_base_for_ipn * RATE_IPN
-
-    er["СО (3.5%)"] = salaries_annual * RATE_SO
-    er["ОСМС (работодатель, 3%)"] = salaries_annual * RATE_OSMS_ER
-    er["Соцналог (9.5%)"] = salaries_annual * RATE_SOC_TAX
-    er["ОС НС (0.5%)"] = salaries_annual * RATE_OS_NS
-
-    emp_total = sum(emp.values())
-    er_total = sum(er.values())
-    return emp, er, emp_total, er_total
-
-def compute_mode_tax(mode_key, income_annual, salaries_annual, expenses_considered, amortization_annual):
-    """Вычисляет налог по выбранному режиму и возвращает (mode_tax, taxable_base, warnings)."""
-    warnings = []
-    taxable_base = 0.0
-    mode_tax = 0.0
-
-    if mode_key == "snr_individual":
-        # СНР для физлица (самозанятый)
-        if salaries_annual > 0:
-            warnings.append("⚠️ СНР неприменим для физлица с сотрудниками.")
-        if income_annual / 12 > LIMIT_SNR_MONTH:
-            warnings.append("⚠️ Доход превышает месячный лимит СНР (~1.3M).")
-        if income_annual > LIMIT_SNR_YEAR:
-            warnings.append("⚠️ Доход превышает годовой лимит СНР (~16M).")
-        mode_tax = income_annual * RATE_SNR
-        taxable_base = income_annual  # for display purpose
-
-    elif mode_key == "snr_ip_too_kh":
-        if income_annual / 12 > LIMIT_SNR_MONTH:
-            warnings.append("⚠️ Доход превышает месячный лимит СНР (~1.3M).")
-        if income_annual > LIMIT_SNR_YEAR:
-            warnings.append("⚠️ Доход превышает годовой лимит СНР (~16M).")
-        mode_tax = income_annual * RATE_SNR
-        taxable_base = income_annual
-
-    elif mode_key == "general_ip":
-        # прибыль = доход - расходы_considered - salaries - amortization
-        profit = income_annual - expenses_considered - salaries_annual - amortization_annual
-        taxable_base = max(0.0, profit)
-        if profit <= 0:
-            mode_tax = 0.0
-            warnings.append("⚠️ Прибыль отрицательная или нулевая — налог на прибыль = 0.")
-        else:
-            mode_tax = profit * RATE_IP_GENERAL
-
-    elif mode_key == "general_too":
-        profit = income_annual - expenses_considered - salaries_annual - amortization_annual
-        taxable_base = max(0.0, profit)
-        if profit <= 0:
-            mode_tax = 0.0
-            warnings.append("⚠️ Прибыль отрицательная или нулевая — КПН = 0.")
-        else:
-            mode_tax = profit * RATE_TOO_KPN
+from taxcore import MODE_KEYS, REGIME_BY_KEY
+from taxcore.calc import (
+    LIMIT_SNR_YEAR,
+    to_annual, money,
+)
+from taxcore.cache import LRUCache, normalize_key
+from taxcore.catalog import (
+    DEFAULT_MODE_LABELS, ELIGIBLE_MODES, ENTITY_BY_LABEL, ENTITY_LABELS, MODE_BY_LABEL, MODE_LABEL, MODE_LABELS,
+    PAYROLL_ENTITIES,
+)
+from taxcore.metrics import METRICS, append_jsonl, inc, lap, span, trace, write_prometheus
+from taxcore.whatif import ScenarioGraph
+from results import ModeResults
+from inverse import SOLVE_METHODS, compare_inverse
+from montecarlo import simulate
+from reports import ReportJobs, tables_from_frames
+from sensitivity import sensitivity_batch
+from sweep import regime_map
+from tables import availability, comparison, ded_table, main_table, salary_tables
+from timeseries import MONTH_NAMES, monthly_frame
+
+RESULT_CACHE_SIZE = 512   # сколько разных наборов входов держать в кэше (LRU)
+# выгрузка замеров каждого перезапуска (пусто — не выгружать)
+METRICS_JSONL = os.environ.get("TAXCALC_METRICS_JSONL")   # по строке JSON на перезапуск
+METRICS_PROM = os.environ.get("TAXCALC_METRICS_PROM")     # текстовый файл Prometheus (node_exporter textfile)
+# процессов на одну выгрузку отчётов (по умолчанию 2, 0 — все ядра); выгрузки идут в фоне, не в перезапуске скрипта
+REPORT_WORKERS = int(os.environ.get("TAXCALC_REPORT_WORKERS", "2")) or None
+
+# --- Расчёт для UI: граф зависимостей (taxcore.whatif) + таблицы ---
+def breakeven_table(income_annual, salaries_annual, expenses_sum, amortization_annual, selected_modes):
+    # Breakeven incomes: where the best of the selected modes changes (same expenses/ФОТ/амортизация)
+    income_max = 2 * max(income_annual, LIMIT_SNR_YEAR)
+    rmap = regime_map(0.0, income_max, [expenses_sum], [salaries_annual], amortization_annual, modes=selected_modes)
+    return pd.DataFrame({
+        "Доход от": rmap["income_from"],
+        "Доход до": rmap["income_to"].where(rmap["income_to"] < income_max, float("inf")),
+        "Лучший режим": rmap["best_mode"].fillna("нет доступных"),
+    })
+
+
+def amortization_tip(primary, income_annual, salaries_annual, expenses_sum, amortization_annual):
+    # Tip: how much amortization changes the primary mode's tax (sensitivity engine, delta of the input)
+    if amortization_annual > 0 and REGIME_BY_KEY[primary].base == "profit":
+        sens = sensitivity_batch(income_annual, salaries_annual, expenses_sum, amortization_annual, modes=primary)
+        return float(sens.delta_tax["amortization"][0, 0])
+    return None
+
+
+def money_or_open(x):
+    return money(x) if x != float("inf") else "и выше"
+
+
+def show_table(df, money_columns=("Сумма",), formatter=money):
+    """Вывести таблицу; суммы в df — числа, в строки они превращаются только здесь.
+
+    Строки собираются в копии для вывода (как Styler.format(precision=2), но без
+    Styler — он в разы медленнее и платится на каждом перезапуске).
+    """
+    with span("render.table"):
+        shown = {}
+        for col in df.columns:
+            values = df[col]
+            if col in money_columns:
+                shown[col] = [formatter(x) for x in values]
+            elif values.dtype.kind == "f":
+                shown[col] = [f"{x:.2f}" for x in values]
+            elif values.dtype.kind == "b":
+                shown[col] = [str(x) for x in values]
+            else:
+                shown[col] = values
+        st.table(pd.DataFrame(shown, index=df.index))
+
+
+def build_app_graph():
+    """Граф расчёта для одной сессии: сценарий taxcore.whatif + таблицы и итоги app2.
+
+    Узлы-таблицы зависят только от своих входов: смена ФОТ перестраивает таблицы
+    удержаний/начислений, а переключение расхода — нет. Все DataFrame в узлах
+    только читаются (они же попадают в общий кэш результатов). Суммы в таблицах —
+    числа; форматирование — при выводе (show_table).
+    """
+    sg = ScenarioGraph()
+    g = sg.graph
+    g.add_input("selected_modes", ())
+    annual = ["annual:income", "annual:salaries", "expenses_sum", "annual:amortization"]
+
+    g.add_node("primary", lambda modes: modes[0], ["selected_modes"])
+    g.add_node("availability", lambda modes, inc, sal: [availability(mk, inc, sal) for mk in modes],
+               ["selected_modes", "annual:income", "annual:salaries"])
+    # results: выбранные режимы в порядке выбора (строка 0 — основной), колонками ModeResults
+    g.add_node("results", lambda infos, modes, av, inc, sal, exp, am: ModeResults.from_infos(
+        {mk: infos[mk] for mk in modes}, [a for a, _ in av], sal + exp + am, inc),
+        ["mode_infos", "selected_modes", "availability"] + annual, cutoff=False)
+    g.add_node("primary_info", lambda results: results.record(0), ["results"], cutoff=False)
+    # Compute net income after taxes for company perspective:
+    # note: Net = income - expenses_sum - salaries - amortization - company_tax
+    g.add_node("net_after_taxes", lambda inc, sal, exp, am, info: inc - exp - sal - am - info.company_total_tax,
+               annual + ["primary_info"])
+    g.add_node("calc_net", lambda inc, sal, exp, am, info: inc - (sal + exp + am + info.company_total_tax),
+               annual + ["primary_info"])
+    g.add_node("df_ded", lambda inc, sal, comp, exp, am, p, info: ded_table(inc, sal, comp, exp, am, p, info.taxable_base),
+               ["annual:income", "annual:salaries", "expenses_components", "expenses_sum", "annual:amortization",
+                "primary", "primary_info"], cutoff=False)
+    g.add_node("salary_tables", salary_tables, ["salary_items"], cutoff=False)
+    g.add_node("df_main", main_table, ["primary_info"], cutoff=False)
+    g.add_node("comparison", lambda results, av: comparison(results, [r for _, r in av]),
+               ["results", "availability"], cutoff=False)
+    g.add_node("df_map", breakeven_table, annual + ["selected_modes"], cutoff=False)
+    g.add_node("amort_diff", amortization_tip, ["primary"] + annual)
+
+    def assemble(results, primary_info, primary, net_after_taxes, calc_net, df_ded, salary_tables,
+                 df_main, comparison, df_map, amort_diff):
+        df_emp, df_er = salary_tables
+        df_comp, best = comparison
+        return {
+            "results": results,
+            "primary_info": primary_info,
+            "primary": primary,
+            "net_after_taxes": net_after_taxes,
+            "calc_net": calc_net,
+            "df_ded": df_ded,
+            "df_emp": df_emp,
+            "df_er": df_er,
+            "df_main": df_main,
+            "df_comp": df_comp,
+            "df_map": df_map,
+            "best": best,
+            "amort_diff": amort_diff,
+        }
+    g.add_node("breakdown", assemble, ["results", "primary_info", "primary", "net_after_taxes", "calc_net",
+                                       "df_ded", "salary_tables", "df_main", "comparison", "df_map", "amort_diff"],
+               cutoff=False)
+    return sg
+
+
+def get_scenario_graph():
+    """Граф текущей сессии (хранится в session_state, живёт между перезапусками скрипта)."""
+    if "scenario_graph" not in st.session_state:
+        st.session_state["scenario_graph"] = build_app_graph()
+    return st.session_state["scenario_graph"]
+
+
+@st.cache_resource
+def get_result_cache():
+    """Общий для всех сессий процесса LRU-кэш итоговых результатов («breakdown»)."""
+    return LRUCache(maxsize=RESULT_CACHE_SIZE)
+
+
+@st.cache_resource
+def get_monthly_cache():
+    """Общий для всех сессий кэш помесячных таблиц (по умолчанию у всех — равномерные месяцы)."""
+    return LRUCache(maxsize=RESULT_CACHE_SIZE)
+
+
+@st.cache_resource
+def get_report_jobs():
+    """Общая очередь фоновых выгрузок отчётов (XLSX / PDF)."""
+    return ReportJobs(workers=REPORT_WORKERS)
+
 
-    else:
-        mode_tax = 0.0
-        taxable_base = 0.0
+@st.fragment(run_every=1.0)
+def report_progress(job_id):
+    """Прогресс выгрузки: раз в секунду перерисовывается только этот фрагмент, по готовности — вся страница."""
+    job = get_report_jobs().get(job_id)
+    if job is None or job.finished is not None:
+        st.rerun()
+    st.progress(job.fraction, text=f"Клиентов: {job.done:,} из {job.total:,}" if job.total else "Подготовка…")
 
-    return mode_tax, taxable_base, warnings
 
 # --- Streamlit UI ---
-def main():
+def render_app():
+    st.set_page_config(page_title="Налоговый калькулятор 2.1", page_icon="📊", layout="centered")
+
     st.title("📊 Налоговый калькулятор — расширенная версия")
     st.markdown(
         "Детализированный расчёт налоговой нагрузки. "
@@ -120,14 +188,8 @@ def main():
     col1, col2 = st.columns([1, 1])
 
     with col1:
-        entity_choice = st.selectbox("Кто вы?", ["Физическое лицо (individual)", "ИП", "TOO / Компания", "Крестьянское хозяйство (КХ)"])
-        entity_map = {
-            "Физическое лицо (individual)": "individual",
-            "ИП": "ip",
-            "TOO / Компания": "too",
-            "Крестьянское хозяйство (КХ)": "kh"
-        }
-        entity = entity_map[entity_choice]
+        entity_choice = st.selectbox("Кто вы?", ENTITY_LABELS)
+        entity = ENTITY_BY_LABEL[entity_choice]
 
         has_employees = st.radio("Есть ли у вас сотрудники?", ["Нет", "Да"]) == "Да"
 
@@ -135,8 +197,8 @@ def main():
 
     with col2:
         income = st.number_input("Введите доход:", min_value=0.0, step=1000.0, format="%.2f", value=0.0)
-        salaries = st.number_input("Введите фонд зарплаты сотрудников за период:", min_value=0.0, step=1000.0, format="%.2f", value=0.0) if (entity in ["ip", "too", "kh"] or has_employees) else 0.0
-        amortization = st.number_input("Введите амортизацию (перечень/сумма):", min_value=0.0, step=100.0, format="%.2f", value=0.0) if (entity in ["ip", "too", "kh"] or has_employees) else 0.0
+        salaries = st.number_input("Введите фонд зарплаты сотрудников за период:", min_value=0.0, step=1000.0, format="%.2f", value=0.0) if (entity in PAYROLL_ENTITIES or has_employees) else 0.0
+        amortization = st.number_input("Введите амортизацию (перечень/сумма):", min_value=0.0, step=100.0, format="%.2f", value=0.0) if (entity in PAYROLL_ENTITIES or has_employees) else 0.0
 
     st.markdown("---")
     st.subheader("📋 Расходы (необязательные — бухгалтер отмечает, что учитывать)")
@@ -174,100 +236,53 @@ def main():
     # Choose mode(s) available (we will compute all and then mark availability)
     st.subheader("🔧 Режим налогообложения (выберите для расчёта)")
     modes_user = st.multiselect("Отметьте режимы, которые хотите сравнить (можно несколько):",
-                                ["СНР — самозанятые (4%)", "СНР — упрощёнка/розница (4%)",
-                                 "Общий режим — ИП (10%)", "Общий режим — ТОО (КПН 20%)"],
-                                default=["СНР — упрощёнка/розница (4%)", "Общий режим — ТОО (КПН 20%)"])
+                                MODE_LABELS, default=list(DEFAULT_MODE_LABELS))
+    # подсказка, а не фильтр: сравнивать можно любые режимы, выбор пользователя не сбрасывается
+    eligible = ELIGIBLE_MODES[entity, has_employees]
+    st.caption("Для выбранного типа налогоплательщика применимы: "
+               + (", ".join(MODE_LABEL[mk] for mk in eligible) if eligible else "нет режимов из списка") + ".")
     # Map to internal keys
-    mode_map = {
-        "СНР — самозанятые (4%)": "snr_individual",
-        "СНР — упрощёнка/розница (4%)": "snr_ip_too_kh",
-        "Общий режим — ИП (10%)": "general_ip",
-        "Общий режим — ТОО (КПН 20%)": "general_too"
-    }
-    selected_modes = [mode_map[m] for m in modes_user]
+    selected_modes = [MODE_BY_LABEL[m] for m in modes_user]
+
+    lap("ui.inputs")
 
     # ACTION: Calculate (button)
     if st.button("🔎 Рассчитать"):
-        # --- Пересчёт в годовые значения корректно ---
-        income_annual = to_annual(income, period_choice)
-        salaries_annual = to_annual(salaries, period_choice)
-        amortization_annual = to_annual(amortization, period_choice)
-
-        # Build expenses_considered based on checkboxes
-        expenses_components = {}
-        if use_rent:
-            expenses_components["Аренда"] = to_annual(rent, period_choice)
-        if use_materials:
-            expenses_components["Материалы"] = to_annual(materials, period_choice)
-        if use_services:
-            expenses_components["Услуги подрядчиков"] = to_annual(services, period_choice)
-        if use_travel:
-            expenses_components["Командировочные"] = to_annual(travel, period_choice)
-        if use_interest:
-            expenses_components["Проценты по кредитам"] = to_annual(interest, period_choice)
-        if use_other:
-            expenses_components["Прочие расходы"] = to_annual(other, period_choice)
-        # penalties shown but not included
-        expenses_sum = sum(expenses_components.values())
-
-        # salary items
-        emp_items, er_items, emp_total, er_total = calc_salary_items(salaries_annual)
-
-        # For each mode compute taxes (we compute all to compare)
-        results = []
-        mode_infos = {}
-        for mk in ["snr_individual", "snr_ip_too_kh", "general_ip", "general_too"]:
-            mode_tax, taxable_base, warnings = compute_mode_tax(mk, income_annual, salaries_annual, expenses_sum, amortization_annual)
-            # company_total_tax: include ONLY employer contributions + mode_tax (do not include IPN)
-            company_total_tax = mode_tax + er_total
-            # company_total_liability_for_display: also optionally show employee withholdings separately
-            mode_infos[mk] = {
-                "mode_tax": mode_tax,
-                "taxable_base": taxable_base,
-                "warnings": warnings,
-                "company_total_tax": company_total_tax,
-                "employee_withholdings_total": emp_total,
-                "employer_contributions_total": er_total
-            }
-
-        # Build display: choose which modes to show (those user selected)
-        display_results = []
-        for mk in selected_modes:
-            info = mode_infos[mk]
-            # availability check for SNR:
-            available = True
-            reason = ""
-            if mk in ("snr_individual", "snr_ip_too_kh"):
-                if income_annual / 12 > LIMIT_SNR_MONTH:
-                    available = False
-                    reason = f"доход (в мес.) {income_annual/12:,.2f} ₸ > лимит {LIMIT_SNR_MONTH:,.2f} ₸"
-                if income_annual > LIMIT_SNR_YEAR:
-                    available = False
-                    reason = f"доход (в год.) {income_annual:,.2f} ₸ > лимит {LIMIT_SNR_YEAR:,.2f} ₸"
-                if mk == "snr_individual" and salaries_annual > 0:
-                    available = False
-                    reason = "в самозанятых нельзя иметь сотрудников"
-            # for general modes, typically available
-            display_results.append((mk, info, available, reason))
-
-        # --- Primary result: show detailed breakdown for chosen primary mode (first in selected_modes) ---
         primary = selected_modes[0] if selected_modes else None
         if primary is None:
             st.error("Выберите хотя бы один режим для расчёта.")
             st.stop()
 
-        info = mode_infos[primary]
-        # Company tax (exclude IPN), employee withholdings shown separately
-        company_tax = info["company_total_tax"]
-        emp_with = info["employee_withholdings_total"]
-        er_contrib = info["employer_contributions_total"]
-        mode_tax = info["mode_tax"]
-        taxable_base = info["taxable_base"]
-        warnings = info["warnings"]
-
-        # Compute net income after taxes for company perspective:
-        # note: Net = income - expenses_sum - salaries - amortization - company_tax
-        net_after_taxes = income_annual - expenses_sum - salaries_annual - amortization_annual - company_tax
+        # --- Входы сценария: граф сам пересчитает годовые значения и всё, что от них зависит ---
+        scenario = get_scenario_graph()
+        scenario.set_inputs(period_choice, income=income, salaries=salaries, amortization=amortization)
+        # Expenses considered based on checkboxes (penalties shown but not included)
+        scenario.set_expense("Аренда", rent, use_rent)
+        scenario.set_expense("Материалы", materials, use_materials)
+        scenario.set_expense("Услуги подрядчиков", services, use_services)
+        scenario.set_expense("Командировочные", travel, use_travel)
+        scenario.set_expense("Проценты по кредитам", interest, use_interest)
+        scenario.set_expense("Прочие расходы", other, use_other)
+        scenario.graph.set("selected_modes", tuple(selected_modes))
+
+        income_annual = scenario.get("annual:income")
+        salaries_annual = scenario.get("annual:salaries")
+        amortization_annual = scenario.get("annual:amortization")
+        expenses_components = scenario.get("expenses_components")
+        lap("calc.inputs")
+
+        # повторное нажатие с теми же входами берёт готовый результат из кэша
+        cache = get_result_cache()
+        key = normalize_key(income_annual, salaries_annual, amortization_annual, expenses_components, selected_modes)
+        computed = []
+        res = cache.get_or_compute(key, lambda: computed.append(1) or scenario.get("breakdown"))
+        inc("result_cache_total", result="miss" if computed else "hit")
+        lap("calc.breakdown")
+        st.session_state["last_breakdown"] = res  # для отчёта: ссылка на объект общего кэша, не копия
+
+        info = res["primary_info"]
+        company_tax = info.company_total_tax
+        net_after_taxes = res["net_after_taxes"]
 
         # Output top metrics
         st.header("📌 Результат")
@@ -276,136 +291,203 @@ def main():
         col_b.metric("Доход после налогов (для компании)", money(net_after_taxes))
 
         # Show immediate warnings
-        for w in warnings:
+        for w in info.warnings:
             st.warning(w)
 
         # Detailed breakdown: Deductions -> Tax base -> Taxes -> Contributions
         st.subheader("🔍 Детализация расчёта (пошагово)")
+        show_table(res["df_ded"])
 
-        # DEDUCTIONS block (visible)
-        ded_rows = []
-        ded_rows.append(("Доход (валовой)", money(income_annual)))
-        ded_rows.append(("Вычеты: фонд зарплаты (ФОТ)", money(salaries_annual)))
-        # list expense components
-        for k, v in expenses_components.items():
-            ded_rows.append((f"Вычеты: {k}", money(v)))
-        ded_rows.append(("Вычеты: амортизация", money(amortization_annual)))
-        ded_rows.append(("Итого вычеты (зарплаты + расходы + амортизация)", money(salaries_annual + expenses_sum + amortization_annual)))
-        # taxable base (for profit taxes)
-        if primary in ("general_ip", "general_too"):
-            ded_rows.append(("Налогооблагаемая база (прибыль)", money(taxable_base)))
-        else:
-            ded_rows.append(("Налогооблагаемая база (для режима)", money(taxable_base)))
-
-        df_ded = pd.DataFrame(ded_rows, columns=["Позиция", "Сумма"])
-        st.table(df_ded)
-
-        # Salary-related items (two groups: удержания сотрудников и начисления работодателя)
         st.subheader("🧾 Удержания сотрудников (информативно)")
-        emp_list = [(k, money(v)) for k, v in emp_items.items()]
-        df_emp = pd.DataFrame(emp_list, columns=["Удержание (сотрудник)", "Сумма"])
-        st.table(df_emp)
+        show_table(res["df_emp"])
         st.caption("ИПН удерживается у сотрудника и перечисляется работодателем, но не увеличивает налоговую нагрузку компании (показывается для прозрачности).")
 
         st.subheader("🏢 Начисления работодателя (нагрузка компании)")
-        er_list = [(k, money(v)) for k, v in er_items.items()]
-        df_er = pd.DataFrame(er_list, columns=["Начисление (работодатель)", "Сумма"])
-        st.table(df_er)
+        show_table(res["df_er"])
 
-        # Mode tax and company totals
         st.subheader("💸 Налоги по режиму и итоговые обязательства")
-        main_rows = []
-        main_rows.append(("Налог по режиму", money(mode_tax)))
-        main_rows.append(("Начисления работодателя (итого)", money(er_contrib)))
-        main_rows.append(("Совокупная сумма обязательств (компания)", money(company_tax)))
-        main_rows.append(("Удержания сотрудников (итого, информативно)", money(emp_with)))
-        df_main = pd.DataFrame(main_rows, columns=["Позиция", "Сумма"])
-        st.table(df_main)
+        show_table(res["df_main"])
 
         # Consistency check
         st.subheader("🔁 Проверка консистентности")
-        calc_net = income_annual - (salaries_annual + expenses_sum + amortization_annual + company_tax)
+        calc_net = res["calc_net"]
         st.write(f"Чистый доход (проверка) = Доход - (ФОТ + расходы + амортизация + обязательства компании) = {money(calc_net)}")
         if abs(calc_net - net_after_taxes) > 1e-6:
             st.error("Несоответствие в вычислениях! Обратитесь к разработчику.")
 
+        lap("render.details")
+
         # Recommendations and comparison
         st.subheader("💡 Сравнение доступных режимов и рекомендации")
-        # Build results table for user-selected modes
-        comp_rows = []
-        for mk, info, available, reason in display_results:
-            comp_company_tax = info["company_total_tax"]
-            comp_emp_with = info["employee_withholdings_total"]
-            comp_er = info["employer_contributions_total"]
-            comp_taxable = info["taxable_base"]
-            comp_net = income_annual - (salaries_annual + expenses_sum + amortization_annual + comp_company_tax)
-            status = "Доступен" if available else f"⚠️ Недоступен ({reason})" if reason else "⚠️ Недоступен"
-            comp_rows.append({
-                "Режим": mk,
-                "Статус": status,
-                "Налог (компания)": comp_company_tax,
-                "Чистый доход (компания)": comp_net
-            })
-
-        df_comp = pd.DataFrame(comp_rows)
-        # Format money in dataframe for display
-        df_comp["Налог (компания)"] = df_comp["Налог (компания)"].apply(money)
-        df_comp["Чистый доход (компания)"] = df_comp["Чистый доход (компания)"].apply(money)
-        st.table(df_comp)
+        show_table(res["df_comp"], ["Налог (компания)", "Чистый доход (компания)"])
 
         # Recommendations textual (always show)
-        # Determine best by minimal company tax among available modes
-        available_modes_list = [r for r in comp_rows if r["Статус"].startswith("Доступен")]
-        if available_modes_list:
-            best_by_tax = min(available_modes_list, key=lambda x: x["Налог (компания)"])
-            # but note columns currently strings; rebuild to numeric selection
-            best = min(available_modes_list, key=lambda x: x["Налог (компания)"])
-            # Actually we need numeric comparisons -> recompute quick
-            best_idx = None
-            best_tax_num = None
-            for i, r in enumerate(comp_rows):
-                if r["Статус"] == "Доступен":
-                    taxn = r["Налог (компания)"]
-                    # numeric from money string not needed if we use info earlier - simpler:
-                    pass
-            # Build using mode_infos numeric
-            best_mode = None
-            best_tax_val = None
-            best_net_val = None
-            for mk, info, available, reason in display_results:
-                if available:
-                    val = info["company_total_tax"]
-                    netv = income_annual - (salaries_annual + expenses_sum + amortization_annual + val)
-                    if best_mode is None or val < best_tax_val:
-                        best_mode = mk
-                        best_tax_val = val
-                        best_net_val = netv
-            if best_mode:
-                st.success(f"Рекомендация: минимальная налоговая нагрузка у режима «{best_mode}» — налог ≈ {money(best_tax_val)}, чистый доход ≈ {money(best_net_val)}.")
+        if res["best"]:
+            best_mode, best_tax_val, best_net_val = res["best"]
+            st.success(f"Рекомендация: минимальная налоговая нагрузка у режима «{best_mode}» — налог ≈ {money(best_tax_val)}, чистый доход ≈ {money(best_net_val)}.")
         else:
             st.info("Нет доступных режимов (по ограничениям). Показаны расчёты для сравнения — рассмотрите переход на другой режим или изменение структуры бизнеса.")
 
+        st.markdown("**Границы смены режима по доходу** (при тех же расходах, ФОТ и амортизации):")
+        show_table(res["df_map"], ["Доход от", "Доход до"], money_or_open)
+
         # Provide targeted tips: where you can reduce tax
         st.subheader("🛠️ Подсказки по снижению налоговой нагрузки")
-        # Tip: check amortization
-        # compute impact of excluding amortization (if considered)
-        if amortization_annual > 0 and primary in ("general_ip", "general_too"):
-            # recompute profit without amortization
-            _, base_with_amort, _ = compute_mode_tax(primary, income_annual, salaries_annual, expenses_sum, amortization_annual)
-            tax_with_amort = mode_infos[primary]["mode_tax"]
-            _, base_no_amort, _ = compute_mode_tax(primary, income_annual, salaries_annual, expenses_sum, 0.0)
-            tax_no_amort = 0.0
-            if primary in ("general_ip"):
-                tax_no_amort = max(0.0, base_no_amort * RATE_IP_GENERAL)
-            elif primary in ("general_too"):
-                tax_no_amort = max(0.0, base_no_amort * RATE_TOO_KPN)
-            diff = tax_with_amort - tax_no_amort
-            st.info(f"Учёт амортизации снижает налог по выбранному режиму примерно на {money(diff)} (проверьте нормы амортизации и подтверждающие документы).")
+        if res["amort_diff"] is not None:
+            st.info(f"Учёт амортизации снижает налог по выбранному режиму примерно на {money(res['amort_diff'])} (проверьте нормы амортизации и подтверждающие документы).")
 
         # Tip: expenses categories
         st.markdown("**Совет:** убедитесь, что у вас есть первичные документы (счета, акты, договоры) для тех расходов, которые вы хотите учитывать — налоговая может отказать в вычете без подтверждений.")
 
+        stats = cache.stats()
+        gstats = scenario.graph.stats()
+        st.caption(f"Кэш расчётов: попаданий {stats['hits']}, промахов {stats['misses']}, записей {stats['size']}/{stats['maxsize']}. "
+                   f"Граф: пересчитано узлов {gstats['last_recomputed']} из {gstats['nodes']}.")
+
         st.balloons()
+        lap("render.comparison")
+
+    # Monthly view: real monthly figures instead of the annual average (seasonal income)
+    with st.expander("📅 Помесячный расчёт (сезонный доход)"):
+        st.caption("Лимиты СНР проверяются по каждому месяцу и по доходу с начала года, а не по среднему. "
+                   "По умолчанию — равномерное распределение введённых сумм; отредактируйте месяцы.")
+        expenses_month = to_annual(sum(v for v, use in ((rent, use_rent), (materials, use_materials),
+                                                        (services, use_services), (travel, use_travel),
+                                                        (interest, use_interest), (other, use_other)) if use),
+                                   period_choice) / 12
+        months_df = st.data_editor(pd.DataFrame({
+            "Месяц": MONTH_NAMES,
+            "Доход": to_annual(income, period_choice) / 12,
+            "ФОТ": to_annual(salaries, period_choice) / 12,
+            "Расходы": expenses_month,
+        }), disabled=["Месяц"], hide_index=True, key="monthly_inputs")
+        month_mode = selected_modes[0] if selected_modes else "general_too"
+        month_inputs = (months_df["Доход"].to_numpy(float), months_df["ФОТ"].to_numpy(float),
+                        months_df["Расходы"].to_numpy(float), to_annual(amortization, period_choice) / 12)
+        # таблица зависит только от входов — одна на все сессии с одинаковыми месяцами
+        df_month = get_monthly_cache().get_or_compute(
+            normalize_key(*(tuple(a) for a in month_inputs[:3]), month_inputs[3], month_mode),
+            lambda: monthly_frame(*month_inputs, month_mode))
+        month_regime = REGIME_BY_KEY[month_mode]
+        if month_regime.month_limit or month_regime.year_limit:
+            for col, label in (("Превышен лимит в месяц", "месячный"), ("Превышен лимит в год", "годовой")):
+                hits = df_month.index[df_month[col]]
+                if len(hits):
+                    st.warning(f"⚠️ {label.capitalize()} лимит СНР впервые превышен в месяце: {df_month['Месяц'][hits[0]]}.")
+        st.markdown(f"Режим: **{month_mode}**")
+        show_table(df_month, ["Доход", "Доход с начала года", "Доход за 12 мес.", "Налог по режиму",
+                              "Начисления работодателя", "Налог (компания)"])
+    lap("monthly")
+
+    # Risk view: income/expenses are uncertain -> distribution of the tax instead of one number
+    with st.expander("🎲 Риск-анализ (Монте-Карло)"):
+        st.caption("Доход и расходы считаются случайными вокруг введённых значений: доход — логнормальный, "
+                   "расходы — нормальный. Если в реализации СНР недоступен, берётся налог общего режима (если он выбран).")
+        mc_cols = st.columns(3)
+        income_cv = mc_cols[0].number_input("Разброс дохода, %", min_value=0.0, max_value=200.0, value=30.0, step=5.0)
+        expenses_cv = mc_cols[1].number_input("Разброс расходов, %", min_value=0.0, max_value=200.0, value=20.0, step=5.0)
+        draws = mc_cols[2].selectbox("Реализаций", [100_000, 1_000_000], format_func=lambda n: f"{n:,}")
+        if st.button("Смоделировать", disabled=not selected_modes):
+            income_mean = to_annual(income, period_choice)
+            expenses_mean = 12 * expenses_month
+            dist_income = ("lognormal", income_mean, income_cv / 100 * income_mean) if income_mean > 0 else 0.0
+            with span("montecarlo.simulate"):
+                mc = simulate(dist_income, ("normal", expenses_mean, expenses_cv / 100 * expenses_mean),
+                              to_annual(salaries, period_choice), to_annual(amortization, period_choice),
+                              draws=draws, modes=selected_modes)
+            summary = mc["summary"].reset_index().rename(columns={
+                "mode": "Режим", "mean": "Средний налог", "p5": "5%", "p50": "Медиана", "p95": "95%",
+                "p_unavailable": "P(недоступен), %", "p_best": "P(лучший), %"})
+            summary[["P(недоступен), %", "P(лучший), %"]] *= 100
+            show_table(summary, ["Средний налог", "5%", "Медиана", "95%"])
+            st.write(f"Вероятность превышения лимита СНР: **{mc['snr_breach_probability']:.1%}**")
+            if mc["recommended"] is None:
+                st.warning("Ни один из выбранных режимов не применим ни в одной реализации — выберите и общий режим.")
+            else:
+                st.success(f"С учётом риска (минимальный средний налог): «{mc['recommended']}».")
+    lap("montecarlo")
+
+    # Inverse: which income / payroll gives the target net (closed form per regime, inverse.py)
+    with st.expander("🎯 Обратный расчёт: нужный доход или ФОТ"):
+        st.caption("Для каждого выбранного режима — доход (при введённых ФОТ и расходах) или ФОТ (при введённом "
+                   "доходе), при котором чистый доход компании равен целевому. Суммы — за год.")
+        inv_cols = st.columns(2)
+        target_net = inv_cols[0].number_input("Целевой чистый доход (в периоде ввода):", min_value=0.0, value=0.0,
+                                              step=1000.0)
+        solve_for = inv_cols[1].radio("Искать", ("Доход", "ФОТ"), horizontal=True)
+        if st.button("Найти", disabled=not selected_modes):
+            solve, solved_label = ("income", "Нужен доход") if solve_for == "Доход" else ("salaries", "Нужный ФОТ")
+            with span("inverse.solve"):
+                inv = compare_inverse(to_annual(target_net, period_choice), solve, selected_modes,
+                                      income=to_annual(income, period_choice),
+                                      salaries=to_annual(salaries, period_choice), expenses=12 * expenses_month,
+                                      amortization=to_annual(amortization, period_choice))
+            rows = []
+            for mk in selected_modes:
+                if SOLVE_METHODS[inv[f"method_{mk}"][0]] == "infeasible":
+                    status = "⚠️ Недостижимо"
+                elif inv[f"warn_month_limit_{mk}"][0] or inv[f"warn_year_limit_{mk}"][0]:
+                    status = "⚠️ Превышен лимит СНР"
+                elif inv[f"warn_employees_{mk}"][0]:
+                    status = "⚠️ Самозанятому нельзя иметь сотрудников"
+                else:
+                    status = "Доступен"
+                rows.append({"Режим": mk, solved_label: inv[f"{solve}_{mk}"][0],
+                             "Налог (компания)": inv[f"company_total_tax_{mk}"][0],
+                             "ФОТ с начислениями": inv[f"payroll_cost_{mk}"][0], "Статус": status})
+            df_inv = pd.DataFrame(rows)
+            show_table(df_inv, [solved_label, "Налог (компания)", "ФОТ с начислениями"],
+                       lambda x: money(x) if x == x else "—")
+    lap("inverse")
+
+    # Reports: built by background threads (reports.ReportJobs); a rerun only submits and polls
+    with st.expander("📤 Отчёты (XLSX / PDF)"):
+        jobs = get_report_jobs()
+        report_fmt = st.radio("Формат", ("XLSX", "PDF"), horizontal=True)
+        last = st.session_state.get("last_breakdown")
+        if st.button("Отчёт по текущему расчёту", disabled=last is None,
+                     help="Таблицы последнего расчёта (кнопка «🔎 Рассчитать»)"):
+            tables = tables_from_frames(last["df_ded"], last["df_emp"], last["df_er"], last["df_main"], last["df_comp"])
+            st.session_state["report_job"] = jobs.submit_client(tables, f"taxcalc.{report_fmt.lower()}")
+        portfolio = st.file_uploader("Портфель клиентов: CSV или Parquet с колонками income, salaries, expenses "
+                                     "(за год), необязательно amortization, client, mode", type=["csv", "parquet"])
+        if st.button("Отчёты по портфелю", disabled=portfolio is None,
+                     help="XLSX — все клиенты в одной книге, PDF — архив ZIP с файлом на клиента"):
+            st.session_state["report_job"] = jobs.submit_file(
+                portfolio, portfolio.name, "taxcalc_portfolio." + ("xlsx" if report_fmt == "XLSX" else "zip"),
+                modes=tuple(selected_modes) or MODE_KEYS)
+        job = jobs.get(st.session_state.get("report_job"))
+        if job is not None:
+            if job.finished is None:
+                report_progress(job.id)
+            elif job.status == "error":
+                st.error(f"Отчёт не сформирован: {job.error}")
+            else:
+                st.download_button(f"⬇️ Скачать {job.file_name}", job.read, file_name=job.file_name, mime=job.mime)
+    lap("reports")
+
+
+def debug_panel(tr):
+    """Разбивка времени текущего перезапуска по этапам и счётчики процесса."""
+    with st.expander("🐞 Профилирование (этот перезапуск)"):
+        st.caption(f"Всего до панели: {sum(ms for _, d, ms in tr.spans if d == 0):.1f} мс. "
+                   "graph.* — пересчитанные узлы графа, render.table — форматирование сумм и вывод таблиц.")
+        st.dataframe(pd.DataFrame(tr.rows()), hide_index=True)
+        counters = METRICS.snapshot()["counters"]
+        if counters:
+            st.dataframe(pd.DataFrame([{"Счётчик": c["name"], "Метки": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+                                        "Значение": c["value"]} for c in counters]), hide_index=True)
+        st.download_button("Метрики процесса (Prometheus)", METRICS.prometheus(), file_name="taxcalc.prom")
+
+
+def main():
+    with trace("app2.rerun") as tr:
+        render_app()
+        debug_panel(tr)
+    if METRICS_JSONL:
+        append_jsonl(METRICS_JSONL, tr.to_record())
+    if METRICS_PROM:
+        write_prometheus(METRICS_PROM)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,321 @@
+# batch.py
+"""Векторизованный (NumPy) пакетный расчёт для compute_mode_tax и calc_salary_items
+и для calculate_taxes (taxcore).
+
+Формулы повторяют скалярные функции из taxcore операция в операцию, поэтому
+результаты совпадают бит в бит (float64, тот же порядок сложений/умножений).
+Параметры режимов (вид базы, ставка, лимиты) берутся из той же скомпилированной
+таблицы taxcore.regimes, что и в скалярном расчёте, — по коду режима строки.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from taxcore import MODE_KEYS, simple
+from taxcore.calc import CURRENT_RULES, regime_table
+from taxcore.regimes import WARNING_FLAGS
+from taxcore.rules import default_rules
+
+# порядок MODE_KEYS = коды режимов в пакетных массивах (-1 — неизвестный режим)
+MODE_CODES = {mk: i for i, mk in enumerate(MODE_KEYS)}
+
+# таблица режимов (taxcore.regimes) как группы кодов: сравнение codes == c на порядок
+# дешевле индексации массива параметров кодами, а режимов немного
+RegimeGroups = namedtuple("RegimeGroups", ("table", "income_base", "profit_base", "income_rates", "profit_rates",
+                                           "no_employees", "month_limit", "year_limit", "net_groups"))
+_REGIME_GROUPS = {}
+
+
+def _positive_part(x):
+    """Аналог max(0.0, x) из скалярного кода (в т.ч. для -0.0 и NaN)."""
+    return np.where(x > 0, x, 0.0)
+
+
+def _groups(codes_values):
+    """[(значение, коды)] по различным значениям, в порядке первого появления."""
+    groups = {}
+    for code, value in codes_values:
+        groups.setdefault(value, []).append(code)
+    return tuple((value, tuple(codes)) for value, codes in groups.items())
+
+
+def regime_groups(table):
+    """Группы кодов режимов RegimeTable для пакетного расчёта (кэш на процесс).
+
+    income_base / profit_base / no_employees — коды режимов с признаком;
+    *_rates, month_limit, year_limit — [(значение, коды)] (режимы без лимита
+    не входят); net_groups — [(вычитаемые суммы, коды)] для calculate_taxes.
+    """
+    groups = _REGIME_GROUPS.get(id(table))
+    if groups is None or groups.table is not table:
+        codes = range(len(table.keys))
+        groups = _REGIME_GROUPS[id(table)] = RegimeGroups(
+            table,
+            tuple(c for c in codes if table.base[c] == "income"),
+            tuple(c for c in codes if table.base[c] == "profit"),
+            _groups((c, table.rates[c]) for c in codes if table.base[c] == "income"),
+            _groups((c, table.rates[c]) for c in codes if table.base[c] == "profit"),
+            tuple(c for c in codes if table.no_employees[c]),
+            _groups((c, table.month_limit[c]) for c in codes if table.month_limit[c] != np.inf),
+            _groups((c, table.year_limit[c]) for c in codes if table.year_limit[c] != np.inf),
+            _groups((c, table.net_costs[c]) for c in codes))
+    return groups
+
+
+def in_codes(codes, members):
+    """Булев массив: код строки входит в members."""
+    if not members:
+        return np.zeros(codes.shape, dtype=bool)
+    mask = codes == members[0]
+    for code in members[1:]:
+        mask |= codes == code
+    return mask
+
+
+def group_values(codes, groups, default):
+    """Значение параметра по строкам из [(значение, коды)]; одна группа — скаляр.
+
+    Скаляр верен только внутри строк этих кодов — остальные строки вызывающий
+    код отбрасывает маской (как ставку СНР для строк общего режима).
+    """
+    if len(groups) == 1:
+        return groups[0][0]
+    return np.select([in_codes(codes, members) for _, members in groups], [v for v, _ in groups], default)
+
+
+def over_limit(codes, value, groups):
+    """value > лимита режима строки из [(лимит, коды)] (режимы без лимита — False)."""
+    out = None
+    for limit, members in groups:
+        hit = in_codes(codes, members) & (value > limit)
+        out = hit if out is None else out | hit
+    return np.zeros(codes.shape, dtype=bool) if out is None else out
+
+
+def _evaluate(groups, codes, income, salaries, expenses, amortization):
+    """Налог, база и флаги по группам режимов — векторный аналог функций RegimeTable.dispatch."""
+    income_base = in_codes(codes, groups.income_base)
+    profit_base = in_codes(codes, groups.profit_base)
+
+    profit = income - expenses - salaries - amortization
+    # убыток (<= 0) — налог 0; NaN не попадает ни в прибыль, ни в убыток и даёт NaN, как в скалярном коде
+    profit_tax = np.where(profit <= 0, 0.0, profit * group_values(codes, groups.profit_rates, 0.0))
+    income_tax = income * group_values(codes, groups.income_rates, 0.0)
+
+    mode_tax = np.select([income_base, profit_base], [income_tax, profit_tax], 0.0)
+    taxable_base = np.select([income_base, profit_base], [income, _positive_part(profit)], 0.0)
+
+    flags = {
+        "warn_employees": in_codes(codes, groups.no_employees) & (salaries > 0),
+        "warn_month_limit": over_limit(codes, income / 12, groups.month_limit),
+        "warn_year_limit": over_limit(codes, income, groups.year_limit),
+        "warn_loss": profit_base & (profit <= 0),
+    }
+    return mode_tax, taxable_base, flags
+
+
+def mode_codes(modes):
+    """Преобразовать массив ключей режимов (строки или коды) в int8-коды."""
+    modes = np.asarray(modes)
+    if modes.dtype.kind in "iu":
+        codes = modes.astype(np.int8)
+        codes[(codes < 0) | (codes >= len(MODE_KEYS))] = -1
+        return codes
+    codes = np.full(modes.shape, -1, dtype=np.int8)
+    for mk, code in MODE_CODES.items():
+        codes[modes == mk] = code
+    return codes
+
+
+def calc_salary_items_batch(salaries_annual, rules=None):
+    """Пакетный аналог calc_salary_items: (emp, er, emp_total, er_total) из массивов."""
+    r = rules or CURRENT_RULES
+    s = np.asarray(salaries_annual, dtype=np.float64)
+    emp = {}
+    er = {}
+    emp["ОПВ (10%)"] = s * r.rate_opv
+    emp["ОСМС (удержание, 2%)"] = s * r.rate_osms_emp
+    taxable_base_for_ipn = _positive_part(s - emp["ОПВ (10%)"] - emp["ОСМС (удержание, 2%)"])
+    emp["ИПН (10% от базы)"] = taxable_base_for_ipn * r.rate_ipn
+
+    er["СО (3.5%)"] = s * r.rate_so
+    er["ОСМС (работодатель, 3%)"] = s * r.rate_osms_er
+    er["Соцналог (9.5%)"] = s * r.rate_soc_tax
+    er["ОС НС (0.5%)"] = s * r.rate_os_ns
+
+    # sum() в скалярной версии складывает слева направо — повторяем порядок
+    emp_total = emp["ОПВ (10%)"] + emp["ОСМС (удержание, 2%)"] + emp["ИПН (10% от базы)"]
+    er_total = er["СО (3.5%)"] + er["ОСМС (работодатель, 3%)"] + er["Соцналог (9.5%)"] + er["ОС НС (0.5%)"]
+    return emp, er, emp_total, er_total
+
+
+def employer_rate(rules=None):
+    """Доля начислений работодателя в ФОТ (k: начисления = k × ФОТ, без пределов баз)."""
+    r = rules or CURRENT_RULES
+    return r.rate_so + r.rate_osms_er + r.rate_soc_tax + r.rate_os_ns
+
+
+def compute_mode_tax_batch(modes, income_annual, salaries_annual, expenses_considered, amortization_annual,
+                           rules=None):
+    """Пакетный аналог compute_mode_tax.
+
+    Возвращает (mode_tax, taxable_base, flags), где flags — словарь булевых
+    массивов по именам из WARNING_FLAGS. rules — RuleSet (по умолчанию действующий).
+    """
+    codes = mode_codes(modes)
+    income = np.asarray(income_annual, dtype=np.float64)
+    salaries = np.asarray(salaries_annual, dtype=np.float64)
+    expenses = np.asarray(expenses_considered, dtype=np.float64)
+    amortization = np.asarray(amortization_annual, dtype=np.float64)
+    codes, income, salaries, expenses, amortization = np.broadcast_arrays(
+        codes, income, salaries, expenses, amortization)
+
+    return _evaluate(regime_groups(regime_table(rules)), codes, income, salaries, expenses, amortization)
+
+
+def rule_indices(dates, rulebook=None):
+    """Индексы RuleSet (в rulebook.rule_sets), действующих на каждую дату массива dates."""
+    rulebook = rulebook or default_rules()
+    starts = np.array([rs.effective_from for rs in rulebook], dtype="datetime64[D]")
+    idx = np.searchsorted(starts, np.asarray(dates, dtype="datetime64[D]"), side="right") - 1
+    if idx.size and idx.min() < 0:
+        raise ValueError(f"есть даты раньше первых правил ({rulebook.rule_sets[0].effective_from})")
+    return idx
+
+
+def compute_batch_dated(dates, income, salaries, expenses, amortization, modes, rulebook=None):
+    """compute_batch для строк разных налоговых периодов: правила берутся по дате строки.
+
+    Каждый RuleSet применяется одним векторизованным проходом к своим строкам.
+    """
+    rulebook = rulebook or default_rules()
+    idx = rule_indices(dates, rulebook)
+    values = [np.asarray(c, dtype=np.float64) for c in (income, salaries, expenses, amortization)]
+    *values, codes, idx = np.broadcast_arrays(*values, mode_codes(modes), idx)
+    out = None
+    for i in np.unique(idx):
+        mask = idx == i
+        part = compute_batch(*(v[mask] for v in values), codes[mask], rulebook.rule_sets[i])
+        if out is None:
+            out = {k: np.empty(idx.shape, dtype=v.dtype) for k, v in part.items()}
+        for k, v in part.items():
+            out[k][mask] = v
+    if out is None:
+        return compute_batch(*values, codes)
+    out["rule_version"] = np.asarray([rs.version for rs in rulebook])[idx]
+    return out
+
+
+def warnings_at(flags, mode_key, i, rules=None):
+    """Собрать список текстов предупреждений строки i — как вернул бы compute_mode_tax."""
+    table = regime_table(rules)
+    texts = table.texts[table.codes[mode_key]]
+    return [text for name, text in zip(WARNING_FLAGS, texts) if flags[name][i]]
+
+
+def compute_batch(income, salaries, expenses, amortization, modes, rules=None):
+    """Полный пакетный расчёт по строкам: налог режима, база, удержания/начисления, флаги.
+
+    Все входы — массивы одной длины (или скаляры для broadcast); значения
+    годовые, как в compute_mode_tax. Возвращает словарь колонок-массивов.
+    """
+    mode_tax, taxable_base, flags = compute_mode_tax_batch(modes, income, salaries, expenses, amortization, rules)
+    _, _, emp_total, er_total = calc_salary_items_batch(salaries, rules)
+    result = {
+        "mode_tax": mode_tax,
+        "taxable_base": taxable_base,
+        "employee_withholdings_total": np.broadcast_to(emp_total, mode_tax.shape),
+        "employer_contributions_total": np.broadcast_to(er_total, mode_tax.shape),
+        # как в app2.main: налог режима + начисления работодателя (без ИПН)
+        "company_total_tax": mode_tax + er_total,
+    }
+    result.update(flags)
+    return result
+
+
+INPUT_COLUMNS = ("income", "salaries", "expenses", "amortization")
+
+
+def annual_columns(df, period="year"):
+    """Достать из DataFrame годовые массивы INPUT_COLUMNS (amortization необязательна).
+
+    period="month" — суммы месячные и умножаются на 12, как to_annual("В месяц").
+    """
+    factor = 12 if period == "month" else 1
+    cols = {}
+    for name in INPUT_COLUMNS:
+        if name in df:
+            cols[name] = df[name].fillna(0.0).to_numpy(np.float64) * factor
+        elif name == "amortization":
+            cols[name] = np.zeros(len(df))
+        else:
+            raise KeyError(f"Во входных данных нет колонки '{name}'")
+    return cols
+
+
+def compute_frame(df, income="income", salaries="salaries", expenses="expenses",
+                  amortization="amortization", mode="mode"):
+    """Обёртка для pandas: добавить к DataFrame колонки результатов compute_batch."""
+    import pandas as pd
+
+    res = compute_batch(df[income].to_numpy(np.float64), df[salaries].to_numpy(np.float64),
+                        df[expenses].to_numpy(np.float64), df[amortization].to_numpy(np.float64),
+                        df[mode].to_numpy())
+    return pd.concat([df, pd.DataFrame(res, index=df.index)], axis=1)
+
+
+def calculate_taxes_batch(modes, income_year, salaries_year, expenses_year):
+    """Пакетный аналог calculate_taxes (без амортизации, лимиты из taxcore.simple).
+
+    Возвращает (tax, after_tax_income, flags) — флаги по именам из WARNING_FLAGS.
+    """
+    codes = mode_codes(modes)
+    income = np.asarray(income_year, dtype=np.float64)
+    salaries = np.asarray(salaries_year, dtype=np.float64)
+    expenses = np.asarray(expenses_year, dtype=np.float64)
+    codes, income, salaries, expenses = np.broadcast_arrays(codes, income, salaries, expenses)
+
+    groups = regime_groups(simple.REGIME_TABLE)
+    tax, _, flags = _evaluate(groups, codes, income, salaries, expenses, 0.0)
+    values = {"tax": tax, "salaries": salaries, "expenses": expenses, "amortization": 0.0}
+    conds, choices = [], []
+    for costs, members in groups.net_groups:
+        net = income
+        for name in costs:
+            net = net - values[name]
+        conds.append(in_codes(codes, members))
+        choices.append(net)
+    after_tax_income = np.select(conds, choices, income)
+    return tax, after_tax_income, flags
+
+
+def compare_regimes_batch(income, salaries, expenses, amortization, rules=None):
+    """Пакетная версия сравнения режимов из app2.main: все MODE_KEYS для каждой строки.
+
+    Для каждого режима — совокупный налог компании, чистый доход и доступность
+    (лимиты дохода и запрет сотрудников из реестра режимов); best_mode — код режима с минимальным
+    налогом среди доступных (при равенстве — первый по MODE_KEYS, как в app2.main), -1 — если
+    доступных режимов нет.
+    """
+    income = np.asarray(income, dtype=np.float64)
+    salaries = np.asarray(salaries, dtype=np.float64)
+    expenses = np.asarray(expenses, dtype=np.float64)
+    amortization = np.asarray(amortization, dtype=np.float64)
+    income, salaries, expenses, amortization = np.broadcast_arrays(income, salaries, expenses, amortization)
+    r = rules or CURRENT_RULES
+    _, _, _, er_total = calc_salary_items_batch(salaries, r)
+
+    result = {}
+    taxes = []
+    for code, mk in enumerate(MODE_KEYS):
+        mode_tax, _, flags = compute_mode_tax_batch(code, income, salaries, expenses, amortization, r)
+        company_total_tax = mode_tax + er_total
+        available = ~(flags["warn_month_limit"] | flags["warn_year_limit"] | flags["warn_employees"])
+        result[f"tax_{mk}"] = company_total_tax
+        result[f"net_{mk}"] = income - (salaries + expenses + amortization + company_total_tax)
+        result[f"available_{mk}"] = available
+        taxes.append(np.where(available, company_total_tax, np.inf))
+    best = np.argmin(np.stack(taxes), axis=0).astype(np.int8)
+    none_available = ~np.any([result[f"available_{mk}"] for mk in MODE_KEYS], axis=0)
+    result["best_mode"] = np.where(none_available, np.int8(-1), best)
+    return result
@@ -0,0 +1,175 @@
+# batch_cli.py
+"""Пакетный расчёт налогов из командной строки (без Streamlit).
+
+Читает записи налогоплательщиков из CSV или Parquet порциями, считает каждую
+порцию векторизованно (batch.py) и сразу дописывает результат в выходной файл,
+поэтому потребление памяти ограничено размером порции, а не размером файла.
+
+    python batch_cli.py clients.parquet results.parquet --chunksize 200000
+    python batch_cli.py clients.csv results.csv --engine app --period month
+
+Входные колонки: income, salaries, expenses, amortization (необязательна),
+mode (или --mode для всех строк; с --compare не нужна). Остальные колонки
+переносятся в вывод как есть. --workers N считает порции в N процессах.
+"""
+import argparse
+import os
+import sys
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from batch import INPUT_COLUMNS, annual_columns, compute_batch, compute_batch_dated, calculate_taxes_batch
+from fixedpoint import compute_batch_tiyn, to_tiyn
+from parallel import compare_chunk, imap_ordered
+from taxcore.rules import DEFAULT_RULES_PATH, load_rules
+
+
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".txt"):
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Неизвестный формат файла: {path} (ожидается .csv или .parquet)")
+
+
+def iter_chunks(path, chunksize):
+    """Читать файл порциями по chunksize строк (pandas DataFrame на порцию).
+
+    Суммы (INPUT_COLUMNS) в CSV читаются как float64: иначе тип выводится по
+    каждой порции отдельно (целые в одной, дробные в другой) и схема вывода
+    Parquet между порциями расходится.
+    """
+    if _format(path) == "csv":
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dict.fromkeys(INPUT_COLUMNS, np.float64))
+    else:
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        for rb in pf.iter_batches(batch_size=chunksize):
+            yield rb.to_pandas()
+
+
+class ChunkWriter:
+    """Потоковая запись порций в CSV (дописывание) или Parquet (row group на порцию)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fmt = _format(path)
+        self._pq_writer = None
+        self._header_written = False
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a" if self._header_written else "w",
+                      header=not self._header_written, index=False)
+            self._header_written = True
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self.path, table.schema)
+            elif not table.schema.equals(self._pq_writer.schema):
+                # схема файла — по первой порции; у прочих колонок тип тоже выводится по порции
+                table = table.cast(self._pq_writer.schema)
+            self._pq_writer.write_table(table)
+
+    def close(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def process_chunk(df, engine="app2", period="year", mode=None, compare=False, rulebook=None, date_column=None,
+                  exact=False):
+    """Посчитать одну порцию и вернуть её с добавленными колонками результата.
+
+    compare=True — вместо одного режима сравнить все (см. parallel.compare_chunk).
+    date_column — колонка с датой/периодом строки: правила берутся из rulebook
+    на эту дату; без неё используется последний RuleSet из rulebook.
+    exact=True — точный расчёт в целых тиынах (fixedpoint.py), суммы в колонках *_tiyn.
+    """
+    if compare:
+        return compare_chunk(df, period=period, rules=rulebook.latest if rulebook else None)
+    cols = annual_columns(df, period)
+    modes = np.full(len(df), mode) if mode else df["mode"].to_numpy()
+
+    out = df.copy()
+    if engine == "app2" and exact:
+        res = compute_batch_tiyn(*(to_tiyn(cols[c]) for c in ("income", "salaries", "expenses", "amortization")),
+                                 modes, rulebook.latest if rulebook else None)
+        res = {(k if k.startswith("warn_") else f"{k}_tiyn"): v for k, v in res.items()}
+    elif engine == "app2" and date_column:
+        dates = pd.to_datetime(df[date_column]).to_numpy()
+        res = compute_batch_dated(dates, cols["income"], cols["salaries"], cols["expenses"], cols["amortization"],
+                                  modes, rulebook)
+    elif engine == "app2":
+        res = compute_batch(cols["income"], cols["salaries"], cols["expenses"], cols["amortization"], modes,
+                            rulebook.latest if rulebook else None)
+    else:
+        tax, after_tax_income, flags = calculate_taxes_batch(modes, cols["income"], cols["salaries"], cols["expenses"])
+        res = {"tax": tax, "after_tax_income": after_tax_income}
+        res.update(flags)
+    for k, v in res.items():
+        out[k] = v
+    return out
+
+
+def run(input_path, output_path, engine="app2", chunksize=100_000, period="year", mode=None,
+        compare=False, workers=1, rules_path=None, date_column=None, exact=False):
+    """Прогнать весь файл порциями; возвращает число обработанных строк.
+
+    workers > 1 — порции считаются в пуле процессов, запись идёт в исходном порядке.
+    Файл правил читается и компилируется один раз на весь прогон.
+    """
+    rulebook = load_rules(rules_path) if rules_path else None
+    func = partial(process_chunk, engine=engine, period=period, mode=mode, compare=compare,
+                   rulebook=rulebook, date_column=date_column, exact=exact)
+    rows = 0
+    with ChunkWriter(output_path) as writer:
+        for out in imap_ordered(func, iter_chunks(input_path, chunksize), workers=workers):
+            writer.write(out)
+            rows += len(out)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный расчёт налогов из CSV/Parquet.")
+    parser.add_argument("input", help="входной файл (.csv или .parquet)")
+    parser.add_argument("output", help="выходной файл (.csv или .parquet)")
+    parser.add_argument("--engine", choices=["app2", "app"], default="app2",
+                        help="app2: compute_mode_tax + начисления по ФОТ; app: calculate_taxes")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="строк в одной порции")
+    parser.add_argument("--period", choices=["year", "month"], default="year",
+                        help="период входных сумм (month — умножаются на 12)")
+    parser.add_argument("--mode", help="режим для всех строк вместо колонки mode")
+    parser.add_argument("--compare", action="store_true",
+                        help="сравнить все режимы и выбрать оптимальный (колонка best_mode)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--rules", help=f"файл ставок и лимитов (по умолчанию {os.path.relpath(DEFAULT_RULES_PATH)})")
+    parser.add_argument("--date-column",
+                        help="колонка с датой периода строки: ставки берутся из правил, действующих на эту дату")
+    parser.add_argument("--exact", action="store_true",
+                        help="точный расчёт в целых тиынах (колонки *_tiyn), только для --engine app2")
+    args = parser.parse_args(argv)
+    if args.exact and (args.engine != "app2" or args.compare or args.date_column):
+        parser.error("--exact поддерживается только для --engine app2 без --compare/--date-column")
+
+    rows = run(args.input, args.output, engine=args.engine, chunksize=args.chunksize,
+               period=args.period, mode=args.mode, compare=args.compare, workers=args.workers or None,
+               rules_path=args.rules, date_column=args.date_column, exact=args.exact)
+    print(f"Обработано строк: {rows:,}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_batch.py
+"""Бенчмарк: построчный compute_mode_tax/calc_salary_items против batch.compute_batch.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_batch --rows 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from batch import compute_batch, warnings_at
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax
+
+
+def synthetic_inputs(n, seed=0):
+    """Синтетические годовые входы: доход, ФОТ, расходы, амортизация, режим."""
+    rng = np.random.default_rng(seed)
+    income = np.round(rng.lognormal(16.0, 1.2, n), 2)
+    salaries = np.round(income * rng.uniform(0.0, 0.5, n), 2) * (rng.random(n) < 0.7)
+    expenses = np.round(income * rng.uniform(0.0, 0.6, n), 2)
+    amortization = np.round(income * rng.uniform(0.0, 0.05, n), 2)
+    modes = np.asarray(MODE_KEYS)[rng.integers(0, len(MODE_KEYS), n)]
+    return income, salaries, expenses, amortization, modes
+
+
+def scalar_rows(income, salaries, expenses, amortization, modes):
+    """Построчный расчёт теми же скалярными функциями, что использует app2.main."""
+    out = []
+    for inc, sal, exp, am, mk in zip(income.tolist(), salaries.tolist(), expenses.tolist(),
+                                     amortization.tolist(), modes.tolist()):
+        mode_tax, taxable_base, warnings = compute_mode_tax(mk, inc, sal, exp, am)
+        _, _, emp_total, er_total = calc_salary_items(sal)
+        out.append((mode_tax, taxable_base, emp_total, er_total, mode_tax + er_total, warnings))
+    return out
+
+
+def check_equal(res, rows, modes):
+    """Проверить побитовое совпадение пакетного и скалярного результатов."""
+    cols = ("mode_tax", "taxable_base", "employee_withholdings_total",
+            "employer_contributions_total", "company_total_tax")
+    for i, row in enumerate(rows):
+        for col, expected in zip(cols, row):
+            got = float(res[col][i])
+            if got.hex() != float(expected).hex():
+                raise AssertionError(f"row {i}: {col} batch={got!r} scalar={expected!r}")
+        if warnings_at(res, modes[i], i) != row[5]:
+            raise AssertionError(f"row {i}: warnings differ")
+
+
+def run(n, scalar_sample):
+    income, salaries, expenses, amortization, modes = synthetic_inputs(n)
+
+    t0 = time.perf_counter()
+    res = compute_batch(income, salaries, expenses, amortization, modes)
+    t_batch = time.perf_counter() - t0
+
+    k = min(n, scalar_sample)
+    t0 = time.perf_counter()
+    rows = scalar_rows(income[:k], salaries[:k], expenses[:k], amortization[:k], modes[:k])
+    t_scalar = (time.perf_counter() - t0) * n / k  # экстраполяция на все n строк
+
+    check_equal(res, rows, modes[:k])
+    return t_scalar, t_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--scalar-sample", type=int, default=200_000,
+                        help="сколько строк считать построчно (время экстраполируется)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'scalar, s':>10} {'batch, s':>10} {'speedup':>8}")
+    for n in args.rows:
+        t_scalar, t_batch = run(n, args.scalar_sample)
+        print(f"{n:>12,} {t_scalar:>10.3f} {t_batch:>10.3f} {t_scalar / t_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
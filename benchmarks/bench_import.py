@@ -0,0 +1,55 @@
+# benchmarks/bench_import.py
+"""Бенчмарк холодного старта: импорт taxcore + один расчёт в свежем интерпретаторе.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_import --budget-ms 50
+
+Время считается сверх пустого запуска python (его стоимость не зависит от нас).
+Код выхода 1, если медиана холодного старта taxcore больше бюджета.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SNIPPETS = {
+    "python (пустой)": "pass",
+    "taxcore": "import taxcore; taxcore.compute_mode_tax('general_too', 1e7, 2e6, 1e6, 0.0)",
+    "batch (numpy)": "import batch",
+    "app2 (streamlit)": "import app2",
+}
+
+
+def cold_start_ms(code, repeat):
+    """Медиана времени запуска `python -c code` в миллисекундах."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="допустимый холодный старт taxcore сверх пустого python")
+    args = parser.parse_args()
+
+    results = {name: cold_start_ms(code, args.repeat) for name, code in SNIPPETS.items()}
+    base = results["python (пустой)"]
+    print(f"{'':<18} {'всего, мс':>10} {'сверх python, мс':>17}")
+    for name, ms in results.items():
+        print(f"{name:<18} {ms:>10.1f} {ms - base:>17.1f}")
+
+    overhead = results["taxcore"] - base
+    if overhead > args.budget_ms:
+        print(f"taxcore: {overhead:.1f} мс > бюджета {args.budget_ms:.0f} мс", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
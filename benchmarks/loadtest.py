@@ -0,0 +1,206 @@
+# benchmarks/loadtest.py
+"""Нагрузочный тест app2: сотни одновременных сессий Streamlit через websocket.
+
+Каждая виртуальная сессия ведёт себя как браузер бухгалтера: подключается к
+/_stcore/stream, получает первую отрисовку, затем несколько раз меняет доход и
+нажимает «🔎 Рассчитать» (с паузой на «обдумывание»). Замеряется время от
+отправки перезапуска до script_finished, число ошибок и, если сервер запущен
+самим тестом, его память (RSS).
+
+    python -m benchmarks.loadtest --sessions 200 --reruns 5           # сам запускает streamlit
+    python -m benchmarks.loadtest --url ws://host:8501 --sessions 100  # уже запущенный сервер
+
+Нужен пакет websockets (клиент); протокол — protobuf-сообщения самого Streamlit.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+APP2_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app2.py")
+CALC_BUTTON = "🔎 Рассчитать"
+INCOME_LABEL = "Введите доход:"
+ENTITY_LABEL = "Кто вы?"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class SessionResult:
+    __slots__ = ("latencies", "errors", "first_ms")
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = []
+        self.first_ms = None
+
+
+async def _run_script(ws, widget_states=None):
+    """Отправить rerun_script и дождаться script_finished; вернуть (мс, {подпись: (тип, id)}, исключения)."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    for ws_state in widget_states or ():
+        msg.rerun_script.widget_states.widgets.append(ws_state)
+    t0 = time.perf_counter()
+    await ws.send(msg.SerializeToString())
+    widgets, exceptions = {}, []
+    while True:
+        fwd = ForwardMsg()
+        fwd.ParseFromString(await ws.recv())
+        kind = fwd.WhichOneof("type")
+        if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+            el = fwd.delta.new_element
+            el_type = el.WhichOneof("type")
+            if el_type == "exception":
+                exceptions.append(el.exception.message)
+                continue
+            sub = getattr(el, el_type)
+            label = getattr(sub, "label", None)
+            if label and getattr(sub, "id", ""):
+                widgets.setdefault(label, (el_type, sub.id, sub))
+        elif kind == "script_finished":
+            return (time.perf_counter() - t0) * 1000, widgets, exceptions
+
+
+def _calc_states(widgets, income, entity_index):
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    states = []
+    _, entity_id, entity = widgets[ENTITY_LABEL]
+    st_entity = WidgetState(id=entity_id)
+    st_entity.string_value = entity.options[entity_index]
+    states.append(st_entity)
+    states.append(WidgetState(id=widgets[INCOME_LABEL][1], double_value=income))
+    states.append(WidgetState(id=widgets[CALC_BUTTON][1], trigger_value=True))
+    return states
+
+
+async def run_session(url, reruns, think, rng, result):
+    import websockets
+
+    try:
+        async with websockets.connect(f"{url}/_stcore/stream", subprotocols=["streamlit"],
+                                      max_size=None, open_timeout=60) as ws:
+            ms, widgets, exc = await _run_script(ws)
+            result.first_ms = ms
+            result.errors.extend(exc)
+            for _ in range(reruns):
+                await asyncio.sleep(rng.uniform(0, 2 * think))
+                states = _calc_states(widgets, rng.uniform(1e5, 5e7), rng.randrange(4))
+                ms, new_widgets, exc = await _run_script(ws, states)
+                widgets.update(new_widgets)
+                result.latencies.append(ms)
+                result.errors.extend(exc)
+    except Exception as e:  # обрыв соединения, таймаут, отказ сервера
+        result.errors.append(repr(e))
+
+
+async def run_load(url, sessions, reruns, think, ramp, seed=0):
+    rng = random.Random(seed)
+    results = [SessionResult() for _ in range(sessions)]
+    tasks = []
+    t0 = time.perf_counter()
+    for i, res in enumerate(results):
+        tasks.append(asyncio.create_task(run_session(url, reruns, think, random.Random(rng.random()), res)))
+        await asyncio.sleep(ramp / sessions)
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - t0
+
+
+def summarize(results, elapsed):
+    lat = np.array([ms for r in results for ms in r.latencies])
+    first = np.array([r.first_ms for r in results if r.first_ms is not None])
+    failed = [r for r in results if r.errors]
+    out = {
+        "sessions": len(results),
+        "failed_sessions": len(failed),
+        "reruns": int(lat.size),
+        "elapsed_s": elapsed,
+        "reruns_per_s": lat.size / elapsed if elapsed else 0.0,
+    }
+    for name, arr in (("rerun_ms", lat), ("first_run_ms", first)):
+        if arr.size:
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            out[name] = {"p50": p50, "p95": p95, "p99": p99, "max": float(arr.max())}
+    if failed:
+        out["first_errors"] = [r.errors[0][:200] for r in failed[:5]]
+    return out
+
+
+def start_server(port, app=APP2_PATH):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return proc
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit не запустился за 60 с")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест app2 (одновременные сессии Streamlit).")
+    parser.add_argument("--url", help="ws://host:port уже запущенного сервера (иначе запускается свой)")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--reruns", type=int, default=5, help="нажатий «Рассчитать» на сессию")
+    parser.add_argument("--think", type=float, default=1.0, help="средняя пауза между нажатиями, с")
+    parser.add_argument("--ramp", type=float, default=10.0, help="за сколько секунд подключаются все сессии")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="записать итоги в JSON")
+    args = parser.parse_args(argv)
+
+    proc = None
+    url = args.url
+    if not url:
+        port = _free_port()
+        proc = start_server(port)
+        url = f"ws://127.0.0.1:{port}"
+    try:
+        rss_before = _rss_mb(proc.pid) if proc else None
+        results, elapsed = asyncio.run(run_load(url, args.sessions, args.reruns, args.think, args.ramp, args.seed))
+        summary = summarize(results, elapsed)
+        if proc:
+            summary["server_rss_mb"] = {"before": rss_before, "after": _rss_mb(proc.pid)}
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if summary["failed_sessions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# benchmarks/suite.py
+"""Набор бенчмарков горячих путей расчёта и проверка регрессий против базовой линии.
+
+Запуск из корня репозитория:
+    python -m benchmarks.suite --output bench.json                  # замер
+    python -m benchmarks.suite --compare benchmarks/baseline.json   # замер + сравнение
+    python -m benchmarks.suite --save-baseline                      # обновить базовую линию
+
+Результат — JSON с пропускной способностью (операций или строк в секунду)
+каждого бенчмарка. При --compare код выхода 1, если хоть один бенчмарк
+медленнее базовой линии больше чем на --threshold (по умолчанию 20%);
+у скалярных микробенчмарков свой, больший порог — их шум на общей машине
+доходит до десятков процентов.
+
+Против шума: бенчмарки замеряются --rounds кругами вперемешку (сначала все по
+разу, потом снова), от каждого берётся лучший результат, а заподозренные в
+регрессии замеряются ещё раз перед вердиктом. Базовая линия зависит от машины:
+обновляйте её на той же машине, где гоняете CI, и только на коде без регрессий —
+перезапись базовой линии «поглощает» замедление, и проверка его больше не видит.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from taxcore import MODE_KEYS, calc_salary_items, calculate_taxes, compute_mode_tax, to_annual
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+APP2_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app2.py")
+
+BENCHMARKS = {}
+
+
+SCALAR_THRESHOLD = 0.35  # допустимое падение скалярных микробенчмарков (вызовы по ~1 мкс)
+
+
+def benchmark(name, unit="ops", threshold=None):
+    """Зарегистрировать фабрику бенчмарка: setup(rows) -> (функция, единиц работы за вызов).
+
+    threshold — свой допустимый порог падения; при сравнении берётся больший из него и --threshold.
+    """
+    def deco(setup):
+        BENCHMARKS[name] = (setup, unit, threshold)
+        return setup
+    return deco
+
+
+# --- скалярные функции ядра ---
+@benchmark("scalar.calculate_taxes", threshold=SCALAR_THRESHOLD)
+def _(rows):
+    args = [("too", mk, 1.2e7 + i, 3e6, 2e6) for i, mk in enumerate(MODE_KEYS * 250)]
+    return lambda: [calculate_taxes(*a) for a in args], len(args)
+
+
+@benchmark("scalar.compute_mode_tax", threshold=SCALAR_THRESHOLD)
+def _(rows):
+    args = [(mk, 1.2e7 + i, 3e6, 2e6, 1e5) for i, mk in enumerate(MODE_KEYS * 250)]
+    return lambda: [compute_mode_tax(*a) for a in args], len(args)
+
+
+@benchmark("scalar.calc_salary_items", threshold=SCALAR_THRESHOLD)
+def _(rows):
+    args = [3e6 + i for i in range(1000)]
+    return lambda: [calc_salary_items(s) for s in args], len(args)
+
+
+@benchmark("scalar.to_annual", threshold=SCALAR_THRESHOLD)
+def _(rows):
+    args = [(1e6 + i, "В месяц" if i % 2 else "В год") for i in range(1000)]
+    return lambda: [to_annual(v, p) for v, p in args], len(args)
+
+
+# --- пакетные (векторизованные) пути на синтетических данных ---
+@benchmark("batch.compute_batch", unit="rows")
+def _(rows):
+    from batch import compute_batch
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, amortization, modes = synthetic_inputs(rows)
+    return lambda: compute_batch(income, salaries, expenses, amortization, modes), rows
+
+
+@benchmark("batch.compute_batch_tiyn", unit="rows")
+def _(rows):
+    from fixedpoint import compute_batch_tiyn, to_tiyn
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, amortization, modes = synthetic_inputs(rows)
+    tiyn = [to_tiyn(x) for x in (income, salaries, expenses, amortization)]
+    return lambda: compute_batch_tiyn(*tiyn, modes), rows
+
+
+@benchmark("batch.calculate_taxes_batch", unit="rows")
+def _(rows):
+    from batch import calculate_taxes_batch
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, _, modes = synthetic_inputs(rows)
+    return lambda: calculate_taxes_batch(modes, income, salaries, expenses), rows
+
+
+@benchmark("batch.compare_regimes", unit="rows")
+def _(rows):
+    from batch import compare_regimes_batch
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, amortization, _ = synthetic_inputs(rows)
+    return lambda: compare_regimes_batch(income, salaries, expenses, amortization), rows
+
+
+@benchmark("batch.inverse_income", unit="rows")
+def _(rows):
+    from inverse import solve_batch
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, amortization, modes = synthetic_inputs(rows)
+    target = income / 2
+    return lambda: solve_batch(target, "income", salaries=salaries, expenses=expenses,
+                               amortization=amortization, modes=modes), rows
+
+
+@benchmark("batch.sensitivity", unit="rows")
+def _(rows):
+    from sensitivity import sensitivity_batch
+    from benchmarks.bench_batch import synthetic_inputs
+
+    income, salaries, expenses, amortization, _ = synthetic_inputs(rows)
+    return lambda: sensitivity_batch(income, salaries, expenses, amortization), rows
+
+
+# --- полный пересчёт app2.main в headless Streamlit (AppTest) ---
+@benchmark("app2.recompute", unit="reruns")
+def _(rows):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP2_PATH, default_timeout=60)
+    at.run()
+    at.selectbox[0].set_value("TOO / Компания")
+    at.run()
+    counter = iter(range(1, 10**9))
+
+    def rerun():
+        # каждый раз новый доход, чтобы не попадать в кэш результатов app2
+        at.number_input[0].set_value(1_000_000.0 + next(counter))
+        at.button[0].click().run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return rerun, 1
+
+
+def measure(func, units, min_time=0.2, repeat=5):
+    """Лучшая из repeat серий; в серии столько вызовов, чтобы она шла не меньше min_time."""
+    func()  # прогрев
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - t0)
+    return units * number / best
+
+
+def run_suite(rows, pattern=None, min_time=0.2, repeat=5, rounds=3, names=None):
+    """Замерить бенчмарки rounds кругами вперемешку; от каждого — лучший результат.
+
+    pattern — подстрока имени, names — явный список имён (повторный замер регрессий).
+    """
+    funcs = {name: setup(rows) for name, (setup, _, _) in BENCHMARKS.items()
+             if (names is None or name in names) and (not pattern or pattern in name)}
+    best = dict.fromkeys(funcs, 0.0)
+    for _ in range(rounds):
+        for name, (func, units) in funcs.items():
+            best[name] = max(best[name], measure(func, units, min_time=min_time, repeat=repeat))
+    results = {}
+    for name, per_sec in best.items():
+        unit = BENCHMARKS[name][1]
+        results[name] = {"unit": unit, "per_sec": per_sec}
+        print(f"{name:<32} {per_sec:>16,.0f} {unit}/s", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "batch_rows": rows,
+            "rounds": rounds,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Напечатать сравнение с базовой линией; вернуть список регрессий.
+
+    Порог бенчмарка — больший из threshold и его собственного (см. benchmark).
+    """
+    regressions = []
+    print(f"{'бенчмарк':<32} {'база':>14} {'сейчас':>14} {'изменение':>10}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<32} {'—':>14} {cur['per_sec']:>14,.0f} {'новый':>10}")
+            continue
+        change = cur["per_sec"] / base["per_sec"] - 1
+        own = BENCHMARKS[name][2] if name in BENCHMARKS else None
+        flag = ""
+        if change < -max(threshold, own or 0.0):
+            regressions.append(name)
+            flag = "  РЕГРЕССИЯ"
+        print(f"{name:<32} {base['per_sec']:>14,.0f} {cur['per_sec']:>14,.0f} {change:>+9.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="строк в пакетных бенчмарках")
+    parser.add_argument("-k", dest="pattern", help="запускать только бенчмарки, содержащие подстроку")
+    parser.add_argument("--output", help="записать результаты в JSON-файл")
+    parser.add_argument("--compare", metavar="BASELINE", help="сравнить с JSON базовой линии")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="допустимое падение пропускной способности (доля)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"записать результаты в {BASELINE_PATH}")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5, help="серий в одном замере")
+    parser.add_argument("--rounds", type=int, default=3, help="кругов замера всех бенчмарков вперемешку")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.rows, args.pattern, args.min_time, args.repeat, args.rounds)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        suspects = compare(current, baseline, args.threshold)
+        if suspects:
+            # повторный замер: разовый всплеск нагрузки на машине не должен валить проверку
+            print(f"Повторный замер: {', '.join(suspects)}", file=sys.stderr)
+            again = run_suite(args.rows, min_time=args.min_time, repeat=args.repeat, rounds=args.rounds,
+                              names=suspects)
+            for name, res in again["results"].items():
+                current["results"][name]["per_sec"] = max(current["results"][name]["per_sec"], res["per_sec"])
+    for path in filter(None, [args.output, BASELINE_PATH if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    if args.compare and suspects:
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"Регрессии: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
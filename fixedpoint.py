@@ -0,0 +1,185 @@
+# fixedpoint.py
+"""Точный денежный расчёт в целых тиынах (int64) — пакетный аналог batch.compute_batch.
+
+Все суммы — целые тиыны (1 ₸ = 100 тиын), ставки — целые доли от RATE_DENOM
+(0.035 -> 350 / 10 000), поэтому сложение и вычитание точные, а округление
+происходит только в одном месте — при умножении суммы на ставку, по правилам
+из ROUNDING. Скорость того же порядка, что у float-версии (те же векторные
+операции NumPy над int64), в отличие от decimal.Decimal.
+
+Правила округления (ROUNDING, по статьям):
+    каждая статья удержаний/начислений и налог режима считается от своей базы
+    и округляется до 1 тиына «половина вверх» (0.5 тиына -> 1 тиын);
+    база ИПН = ФОТ − ОПВ − ОСМС считается из уже округлённых ОПВ и ОСМС;
+    итоги (удержания, начисления, налог компании) — точные суммы округлённых статей.
+Квант и способ округления статьи меняются в ROUNDING (например, (100, HALF_UP) —
+до целого тенге).
+
+Ограничение: сумма × числитель ставки должна помещаться в int64, т.е. суммы до
+~9·10¹⁴ тиын (~9 трлн ₸) по модулю; при превышении — OverflowError.
+"""
+import numpy as np
+
+from batch import group_values, in_codes, mode_codes, over_limit, regime_groups
+from taxcore.calc import CURRENT_RULES, regime_table
+from taxcore.rules import RATE_FIELDS
+
+TIYN_PER_TENGE = 100
+RATE_DENOM = 10_000
+
+HALF_UP = "half_up"        # 0.5 -> от нуля
+HALF_EVEN = "half_even"    # банковское округление
+DOWN = "down"              # отбрасывание дробной части
+
+# статья -> (квант в тиынах, способ округления)
+ROUNDING = {
+    "opv": (1, HALF_UP),
+    "osms_emp": (1, HALF_UP),
+    "ipn": (1, HALF_UP),
+    "so": (1, HALF_UP),
+    "osms_er": (1, HALF_UP),
+    "soc_tax": (1, HALF_UP),
+    "os_ns": (1, HALF_UP),
+    "mode_tax": (1, HALF_UP),
+}
+
+_MAX_SAFE = np.iinfo(np.int64).max // RATE_DENOM
+
+
+def to_tiyn(amount_tenge):
+    """Суммы в тенге (float) -> int64 тиыны с округлением до ближайшего тиына.
+
+    Половина тиына округляется от нуля, как HALF_UP статей: 0.005 -> 1 тиын,
+    −0.005 -> −1 тиын (в пределах погрешности float, т.е. как записано десятичной
+    дробью). NaN и ±inf -> ValueError, суммы вне int64 -> OverflowError.
+    """
+    t = np.asarray(amount_tenge, dtype=np.float64) * TIYN_PER_TENGE
+    if not np.isfinite(t).all():
+        raise ValueError("суммы должны быть конечными числами, переданы NaN или inf")
+    if t.size and np.abs(t).max() >= 2.0 ** 63:
+        raise OverflowError("сумма слишком велика по модулю для int64 тиынов")
+    whole = np.trunc(t)
+    half = np.abs(np.abs(t - whole) - 0.5) <= 2 * np.spacing(np.abs(t))
+    return np.where(half, whole + np.sign(t), np.rint(t)).astype(np.int64)
+
+
+def from_tiyn(amount_tiyn):
+    """int64 тиыны -> float тенге (для отображения/сравнения)."""
+    return np.asarray(amount_tiyn, dtype=np.int64) / TIYN_PER_TENGE
+
+
+def money_tiyn(x):
+    """Форматирование суммы в тиынах как money(): '1,234.56 ₸', без погрешности float."""
+    x = int(x)
+    sign = "-" if x < 0 else ""
+    tenge, tiyn = divmod(abs(x), TIYN_PER_TENGE)
+    return f"{sign}{tenge:,}.{tiyn:02d} ₸"
+
+
+def rate_numerators(rules=None):
+    """Ставки RuleSet как целые числители над RATE_DENOM; ошибка, если ставка не ложится точно."""
+    rules = rules or CURRENT_RULES
+    out = {}
+    for f in RATE_FIELDS:
+        out[f[len("rate_"):]] = _numerator(getattr(rules, f), f)
+    return out
+
+
+def _numerator(rate, name):
+    num = round(rate * RATE_DENOM)
+    if abs(num / RATE_DENOM - rate) > 1e-12:
+        raise ValueError(f"ставка {name}={rate} не представима как n/{RATE_DENOM}")
+    return num
+
+
+def _round_rate(a, numerator, item):
+    quantum, mode = ROUNDING[item]
+    q = quantum * RATE_DENOM
+    n = a * numerator
+    if mode == HALF_UP:
+        units = (n + q // 2) // q
+    elif mode == DOWN:
+        units = n // q
+    elif mode == HALF_EVEN:
+        units, rem = np.divmod(n, q)
+        units = units + ((2 * rem > q) | ((2 * rem == q) & (units % 2 == 1)))
+    else:
+        raise ValueError(f"неизвестный способ округления {mode!r}")
+    return units * quantum
+
+
+def apply_rate(amount_tiyn, numerator, item):
+    """amount × numerator / RATE_DENOM, округлённое по ROUNDING[item].
+
+    Отрицательная сумма (например, доход при СНР) округляется по модулю:
+    −x -> −(округление x), как ROUND_HALF_UP / ROUND_DOWN в decimal.
+    """
+    a = np.asarray(amount_tiyn, dtype=np.int64)
+    if a.size and (a.max() > _MAX_SAFE or a.min() < -_MAX_SAFE):
+        raise OverflowError("сумма слишком велика по модулю для расчёта в int64 тиынах")
+    negative = a < 0
+    if negative.any():
+        return np.where(negative, -_round_rate(-a, numerator, item), _round_rate(a, numerator, item))
+    return _round_rate(a, numerator, item)
+
+
+def calc_salary_items_tiyn(salaries, rules=None):
+    """Точный аналог calc_salary_items: (emp, er, emp_total, er_total) в тиынах."""
+    r = rate_numerators(rules)
+    s = np.asarray(salaries, dtype=np.int64)
+    emp = {
+        "ОПВ (10%)": apply_rate(s, r["opv"], "opv"),
+        "ОСМС (удержание, 2%)": apply_rate(s, r["osms_emp"], "osms_emp"),
+    }
+    ipn_base = np.maximum(0, s - emp["ОПВ (10%)"] - emp["ОСМС (удержание, 2%)"])
+    emp["ИПН (10% от базы)"] = apply_rate(ipn_base, r["ipn"], "ipn")
+    er = {
+        "СО (3.5%)": apply_rate(s, r["so"], "so"),
+        "ОСМС (работодатель, 3%)": apply_rate(s, r["osms_er"], "osms_er"),
+        "Соцналог (9.5%)": apply_rate(s, r["soc_tax"], "soc_tax"),
+        "ОС НС (0.5%)": apply_rate(s, r["os_ns"], "os_ns"),
+    }
+    return emp, er, sum(emp.values()), sum(er.values())
+
+
+def compute_batch_tiyn(income, salaries, expenses, amortization, modes, rules=None):
+    """Точный аналог batch.compute_batch: входы и суммы результата — int64 тиыны.
+
+    Ключи результата те же, что у compute_batch (флаги — булевы массивы).
+    """
+    rules = rules or CURRENT_RULES
+    codes = mode_codes(modes)
+    income, salaries, expenses, amortization = (np.asarray(x, dtype=np.int64)
+                                                for x in (income, salaries, expenses, amortization))
+    codes, income, salaries, expenses, amortization = np.broadcast_arrays(
+        codes, income, salaries, expenses, amortization)
+
+    table = regime_table(rules)
+    groups = regime_groups(table)
+    income_base = in_codes(codes, groups.income_base)
+    profit_base = in_codes(codes, groups.profit_base)
+    income_rate, profit_rate = (
+        group_values(codes, [(_numerator(rate, table.keys[members[0]]), members) for rate, members in rates], 0)
+        for rates in (groups.income_rates, groups.profit_rates))
+
+    profit = income - expenses - salaries - amortization
+    base = np.maximum(profit, 0)
+    mode_tax = np.select([income_base, profit_base], [apply_rate(income, income_rate, "mode_tax"),
+                                                      apply_rate(base, profit_rate, "mode_tax")], 0)
+    taxable_base = np.select([income_base, profit_base], [income, base], 0)
+
+    _, _, emp_total, er_total = calc_salary_items_tiyn(salaries, rules)
+    # лимиты в целых тиынах: income / 12 > лимит  <=>  income > 12 * лимит
+    limit_month = [(int(round(limit * TIYN_PER_TENGE)) * 12, members) for limit, members in groups.month_limit]
+    limit_year = [(int(round(limit * TIYN_PER_TENGE)), members) for limit, members in groups.year_limit]
+    return {
+        "mode_tax": mode_tax,
+        "taxable_base": taxable_base,
+        "employee_withholdings_total": emp_total,
+        "employer_contributions_total": er_total,
+        "company_total_tax": mode_tax + er_total,
+        "warn_employees": in_codes(codes, groups.no_employees) & (salaries > 0),
+        "warn_month_limit": over_limit(codes, income, limit_month),
+        "warn_year_limit": over_limit(codes, income, limit_year),
+        "warn_loss": profit_base & (profit <= 0),
+    }
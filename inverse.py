@@ -0,0 +1,229 @@
+# inverse.py
+"""Обратный расчёт: какой доход или какой ФОТ дают заданный чистый доход (пакетно, NumPy).
+
+Прямой расчёт идёт от валового дохода к чистому (compute_mode_tax +
+calc_salary_items, app2; calculate_taxes, app). При фиксированных остальных
+входах чистый доход компании — кусочно-линейная монотонная функция искомой
+величины, поэтому обратная задача решается в закрытом виде по участкам
+(k — доля начислений работодателя в ФОТ, er = k * S):
+
+    доход I при целевом чистом N (ФОТ S, расходы E, амортизация A):
+      СНР:          N = I - (S + E + A + rate_snr * I + er)     ->  I = (N + S + E + A + er) / (1 - rate_snr)
+      общий режим:  N = P * (1 - rate) - er при P > 0, иначе P - er;  P = I - E - S - A
+    ФОТ S при целевом N (доход I):
+      СНР:          S = (I - E - A - rate_snr * I - N) / (1 + k)
+      общий режим:  S = (Q * (1 - rate) - N) / (1 - rate + k), если это < Q = I - E - A,
+                    иначе (Q - N) / (1 + k)
+
+Вид базы (с дохода, как СНР, или с прибыли, как общий режим) и ставка строки
+берутся из таблицы режимов taxcore.regimes. Каждое решение проверяется прямым
+пакетным расчётом (batch.compute_batch / calculate_taxes_batch). Строки, где
+невязка больше tol (вырожденные правила, ставка >= 1 и т.п.), досчитываются
+векторной бисекцией по тому же прямому расчёту. Недостижимая цель (нужен отрицательный доход или ФОТ) — NaN.
+
+    python inverse.py --net 12e6 --salaries 3e6 --expenses 2e6
+    python inverse.py --solve salaries --net 12e6 --income 40e6 --expenses 2e6
+"""
+import argparse
+
+import numpy as np
+
+from batch import (calc_salary_items_batch, calculate_taxes_batch, compute_batch, employer_rate, group_values,
+                   in_codes, mode_codes, regime_groups)
+from taxcore import MODE_KEYS, simple
+from taxcore.calc import CURRENT_RULES, regime_table
+
+# как получено решение строки (колонка method)
+SOLVE_METHODS = ("closed", "numeric", "infeasible")
+SOLVE_TARGETS = ("income", "salaries")
+ENGINES = ("app2", "app")
+
+
+def _forward(solve, engine, codes, x, income, salaries, expenses, amortization, rules):
+    """Чистый доход прямым расчётом при значении x искомой величины."""
+    if solve == "income":
+        income = x
+    else:
+        salaries = x
+    if engine == "app":
+        return calculate_taxes_batch(codes, income, salaries, expenses)[1]
+    res = compute_batch(income, salaries, expenses, amortization, codes, rules)
+    return income - (salaries + expenses + amortization + res["company_total_tax"])
+
+
+def _regimes(codes, engine, r):
+    """По строкам: база с дохода / с прибыли, их ставки и вычитаются ли ФОТ / расходы в чистом доходе app."""
+    groups = regime_groups(simple.REGIME_TABLE if engine == "app" else regime_table(r))
+    pays = [in_codes(codes, tuple(c for costs, members in groups.net_groups if name in costs for c in members))
+            for name in ("salaries", "expenses")]
+    return (in_codes(codes, groups.income_base), in_codes(codes, groups.profit_base),
+            group_values(codes, groups.income_rates, 0.0), group_values(codes, groups.profit_rates, 0.0), *pays)
+
+
+def _closed_income(target, codes, salaries, expenses, amortization, engine, r):
+    """Доход по участкам (формулы из описания модуля)."""
+    income_base, profit_base, turnover_rate, rate, pays_salaries, pays_expenses = _regimes(codes, engine, r)
+    if engine == "app":
+        profit = np.where(target > 0, target / (1 - rate), target)
+        turnover_income = ((target + np.where(pays_salaries, salaries, 0.0) + np.where(pays_expenses, expenses, 0.0))
+                           / (1 - turnover_rate))
+        return np.select([income_base, profit_base], [turnover_income, profit + expenses + salaries], target)
+    _, _, _, er = calc_salary_items_batch(salaries, r)
+    costs = salaries + expenses + amortization + er
+    after_tax = target + er  # прибыль после налога
+    profit = np.where(after_tax > 0, after_tax / (1 - rate), after_tax)
+    return np.select([income_base, profit_base], [(target + costs) / (1 - turnover_rate),
+                                                  profit + expenses + salaries + amortization], target + costs)
+
+
+def _closed_salaries(target, codes, income, expenses, amortization, engine, r):
+    """ФОТ по участкам; режимы app, где ФОТ не влияет на чистый доход (самозанятые), — NaN."""
+    income_base, profit_base, turnover_rate, rate, pays_salaries, pays_expenses = _regimes(codes, engine, r)
+    if engine == "app":
+        k, amortization = 0.0, 0.0
+        turnover = np.where(pays_salaries, income - income * turnover_rate - np.where(pays_expenses, expenses, 0.0)
+                            - target, np.nan)
+        other = np.nan
+    else:
+        k = employer_rate(r)
+        turnover = (income - expenses - amortization - income * turnover_rate - target) / (1 + k)
+        other = (income - expenses - amortization - target) / (1 + k)
+    q = income - expenses - amortization  # прибыль при нулевом ФОТ
+    with_profit = (q * (1 - rate) - target) / (1 - rate + k)
+    general = np.where(with_profit < q, with_profit, (q - target) / (1 + k))
+    return np.select([income_base, profit_base], [turnover, general], other)
+
+
+def solve_monotone(func, target, lo, hi, tol=0.005, max_iter=200):
+    """Векторная бисекция: x в [lo, hi], где func(x, idx) ≈ target (func монотонна на отрезке).
+
+    func получает кандидаты и индексы строк (для выбора остальных входов). Строки,
+    где на концах цель не в разных сторонах, — NaN.
+    """
+    target = np.asarray(target, dtype=np.float64)
+    lo, hi = np.array(lo, dtype=np.float64), np.array(hi, dtype=np.float64)
+    idx = np.arange(target.size)
+    f_lo = func(lo, idx) - target
+    f_hi = func(hi, idx) - target
+    x = np.full(target.shape, np.nan)
+    bracketed = (np.sign(f_lo) * np.sign(f_hi) <= 0) & np.isfinite(f_lo) & np.isfinite(f_hi)
+    rising = f_hi >= f_lo
+    active = idx[bracketed]
+    for _ in range(max_iter):
+        if not active.size:
+            break
+        mid = lo[active] + (hi[active] - lo[active]) / 2
+        f_mid = func(mid, active) - target[active]
+        done = (np.abs(f_mid) <= tol) | (mid <= lo[active]) | (mid >= hi[active])
+        x[active[done]] = mid[done]
+        below = (f_mid < 0) == rising[active]  # корень правее mid
+        lo[active] = np.where(below, mid, lo[active])
+        hi[active] = np.where(below, hi[active], mid)
+        active = active[~done]
+    x[active] = lo[active] + (hi[active] - lo[active]) / 2
+    return x
+
+
+def solve_batch(target_net, solve="income", income=0.0, salaries=0.0, expenses=0.0, amortization=0.0,
+                modes="general_too", engine="app2", tol=0.005, rules=None, upper=1e18):
+    """Значение solve ("income" или "salaries"), при котором чистый доход = target_net (по строкам).
+
+    Остальные входы годовые, массивы или скаляры (broadcast, как в compute_batch);
+    значение искомой величины среди них игнорируется. engine="app2" — формулы
+    compute_mode_tax + calc_salary_items, "app" — calculate_taxes (без
+    амортизации и начислений). Возвращает словарь колонок: income, salaries,
+    net (прямой расчёт), residual, method (индекс в SOLVE_METHODS), для app2 —
+    ещё company_total_tax, employer_contributions_total, payroll_cost (ФОТ +
+    начисления) и флаги предупреждений compute_batch (лимиты СНР и т.п.).
+    """
+    if solve not in SOLVE_TARGETS:
+        raise ValueError(f"solve={solve!r}; допустимы: {', '.join(SOLVE_TARGETS)}")
+    if engine not in ENGINES:
+        raise ValueError(f"engine={engine!r}; допустимы: {', '.join(ENGINES)}")
+    r = rules or CURRENT_RULES
+    arrays = [np.asarray(v, dtype=np.float64) for v in (target_net, income, salaries, expenses, amortization)]
+    arrays[0] = np.atleast_1d(arrays[0])
+    target, income, salaries, expenses, amortization, codes = np.broadcast_arrays(*arrays, mode_codes(modes))
+    target = np.ascontiguousarray(target)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if solve == "income":
+            x = _closed_income(target, codes, salaries, expenses, amortization, engine, r)
+        else:
+            x = _closed_salaries(target, codes, income, expenses, amortization, engine, r)
+    x = np.where(x >= 0, x, np.nan)  # -0.0 и отрицательные — нет решения в допустимой области
+    x = np.where(x == 0, 0.0, x)
+    others = (income, salaries, expenses, amortization)
+
+    def net_at(values, idx):
+        return _forward(solve, engine, codes[idx], values, *(v[idx] for v in others), r)
+
+    net = np.full(target.shape, np.nan)
+    finite = np.isfinite(x)
+    net[finite] = net_at(x[finite], np.flatnonzero(finite))
+    residual = net - target
+    method = np.zeros(target.shape, dtype=np.int8)
+    bad = ~(np.abs(residual) <= np.maximum(tol, 16 * np.spacing(np.abs(target))))
+    if bad.any():  # запасной путь: бисекция по прямому расчёту на [0, upper]
+        idx = np.flatnonzero(bad)
+        fixed = solve_monotone(lambda v, j: net_at(v, idx[j]), target[idx], np.zeros(idx.size),
+                               np.full(idx.size, upper), tol)
+        x[idx] = fixed
+        ok = np.isfinite(fixed)
+        net[idx[ok]] = net_at(fixed[ok], idx[ok])
+        net[idx[~ok]] = np.nan
+        residual = net - target
+        method[idx] = np.where(ok, SOLVE_METHODS.index("numeric"), SOLVE_METHODS.index("infeasible"))
+
+    out = {
+        "income": x if solve == "income" else np.array(income),
+        "salaries": x if solve == "salaries" else np.array(salaries),
+        "net": net,
+        "residual": residual,
+        "method": method,
+    }
+    if engine == "app2":
+        solved_salaries = np.where(np.isfinite(out["salaries"]), out["salaries"], 0.0)
+        solved_income = np.where(np.isfinite(out["income"]), out["income"], 0.0)
+        res = compute_batch(solved_income, solved_salaries, expenses, amortization, codes, r)
+        invalid = method == SOLVE_METHODS.index("infeasible")
+        for name in ("company_total_tax", "employer_contributions_total"):
+            out[name] = np.where(invalid, np.nan, res[name])
+        out["payroll_cost"] = out["salaries"] + out["employer_contributions_total"]
+        for name in ("warn_employees", "warn_month_limit", "warn_year_limit", "warn_loss"):
+            out[name] = res[name] & ~invalid
+    return out
+
+
+def compare_inverse(target_net, solve="income", modes=MODE_KEYS, **inputs):
+    """solve_batch для нескольких режимов: колонки <solve>_<режим>, net_<режим>, method_<режим> и т.д."""
+    out = {}
+    for mk in modes:
+        res = solve_batch(target_net, solve, modes=mk, **inputs)
+        for name, col in res.items():
+            out[f"{name}_{mk}"] = col
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обратный расчёт: доход или ФОТ для целевого чистого дохода.")
+    parser.add_argument("--net", type=float, nargs="+", required=True, help="целевой чистый доход за год")
+    parser.add_argument("--solve", choices=SOLVE_TARGETS, default="income")
+    parser.add_argument("--income", type=float, default=0.0, help="доход за год (для --solve salaries)")
+    parser.add_argument("--salaries", type=float, default=0.0, help="ФОТ за год (для --solve income)")
+    parser.add_argument("--expenses", type=float, default=0.0)
+    parser.add_argument("--amortization", type=float, default=0.0)
+    parser.add_argument("--modes", nargs="+", default=list(MODE_KEYS), choices=MODE_KEYS)
+    parser.add_argument("--engine", choices=ENGINES, default="app2")
+    args = parser.parse_args(argv)
+
+    print(f"{'режим':<16}{'чистый':>20}{args.solve:>22}{'метод':>12}")
+    for mk in args.modes:
+        res = solve_batch(args.net, args.solve, args.income, args.salaries, args.expenses, args.amortization,
+                          modes=mk, engine=args.engine)
+        for i, net in enumerate(args.net):
+            print(f"{mk:<16}{net:>20,.2f}{res[args.solve][i]:>22,.2f}{SOLVE_METHODS[res['method'][i]]:>12}")
+
+
+if __name__ == "__main__":
+    main()
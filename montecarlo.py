@@ -0,0 +1,192 @@
+# montecarlo.py
+"""Моделирование Монте-Карло налоговой нагрузки при неопределённых доходе, расходах и ФОТ.
+
+Доход, расходы и ФОТ (годовые) задаются распределениями, из них берётся
+draws реализаций (10⁶ и больше), и для каждой все режимы считаются одним
+векторным вызовом batch.compare_regimes_batch — те же формулы, что
+compute_mode_tax / calc_salary_items. По режимам выдаются перцентили
+совокупного налога компании, вероятность, что режим окажется недоступен
+(превышение лимита дохода, запрет сотрудников), и вероятность, что он лучший.
+
+Если режим в реализации недоступен, клиенту придётся платить по общему
+режиму: «эффективный налог» режима в такой реализации — самый дешёвый из
+сравниваемых запасных режимов (по реестру taxcore.regimes — без лимитов
+дохода и с сотрудниками). Если запасных режимов среди сравниваемых нет,
+реализация для режима неприменима (NaN) и в статистику не входит; режим,
+неприменимый ни в одной реализации, получает NaN и не рекомендуется.
+Рекомендация — режим с минимальным средним (objective="mean") или 95-м
+перцентилем (objective="p95") эффективного налога; None, если таких нет.
+
+Реализации считаются порциями по chunk штук; порция i всегда получает i-й
+дочерний поток SeedSequence(seed), поэтому результат при одном seed не зависит
+от числа процессов (workers) и воспроизводим.
+
+    python montecarlo.py --income lognormal:20e6:6e6 --expenses normal:5e6:1e6 \
+        --payroll fixed:3e6 --draws 1000000 --workers 4
+"""
+import argparse
+from functools import partial
+
+import numpy as np
+
+from batch import compare_regimes_batch
+from parallel import imap_ordered
+from taxcore import MODE_KEYS
+from taxcore.calc import regime_table
+
+DISTRIBUTIONS = ("fixed", "normal", "lognormal", "uniform", "triangular")
+
+
+def parse_distribution(spec):
+    """'lognormal:20e6:6e6' или число -> кортеж (вид, параметры...)."""
+    if isinstance(spec, (int, float)):
+        return ("fixed", float(spec))
+    if isinstance(spec, tuple):
+        kind, params = spec[0], spec[1:]
+    else:
+        kind, *params = str(spec).split(":")
+        if not params:  # просто число
+            kind, params = "fixed", [kind]
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"неизвестное распределение {kind!r}; допустимы: {', '.join(DISTRIBUTIONS)}")
+    expected = {"fixed": 1, "normal": 2, "lognormal": 2, "uniform": 2, "triangular": 3}[kind]
+    if len(params) != expected:
+        raise ValueError(f"{kind}: нужно параметров {expected}, передано {len(params)}")
+    return (kind,) + tuple(float(p) for p in params)
+
+
+def sample(dist, n, rng):
+    """n значений распределения dist (из parse_distribution); отрицательные обрезаются до 0.
+
+    normal и lognormal задаются средним и стандартным отклонением самой величины.
+    """
+    kind, *p = dist
+    if kind == "fixed":
+        return np.full(n, p[0])
+    if kind == "normal":
+        x = rng.normal(p[0], p[1], n)
+    elif kind == "lognormal":
+        mean, sd = p
+        sigma2 = np.log1p((sd / mean) ** 2)
+        x = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), n)
+    elif kind == "uniform":
+        x = rng.uniform(p[0], p[1], n)
+    else:
+        x = rng.triangular(p[0], p[1], p[2], n)
+    return np.where(x > 0, x, 0.0)
+
+
+def simulate_chunk(task, income, expenses, payroll, amortization, modes, rules=None):
+    """Одна порция: task = (число реализаций, SeedSequence). Возвращает массивы по реализациям."""
+    n, seed_seq = task
+    rng = np.random.default_rng(seed_seq)
+    inc, exp, sal = (sample(d, n, rng) for d in (income, expenses, payroll))
+    res = compare_regimes_batch(inc, sal, exp, amortization, rules)
+    table = regime_table(rules)
+    general = [mk for mk in modes if mk in fallback_modes(table)]
+    fallback = (np.min([res[f"tax_{mk}"] for mk in general], axis=0) if general
+                else np.full(n, np.nan))  # запасного режима нет — реализация неприменима
+    out = {"limit_blocked": over_any_limit(table, inc)}
+    taxes = []
+    for mk in modes:
+        available = res[f"available_{mk}"]
+        out[f"available_{mk}"] = available
+        out[f"effective_{mk}"] = np.where(available, res[f"tax_{mk}"], fallback)
+        taxes.append(np.where(available, res[f"tax_{mk}"], np.inf))
+    taxes = np.stack(taxes)
+    # индекс в modes; -1 — ни один режим не доступен
+    out["best"] = np.where(np.isinf(taxes).all(axis=0), -1, np.argmin(taxes, axis=0)).astype(np.int8)
+    return out
+
+
+def fallback_modes(table):
+    """Ключи режимов RegimeTable, доступных при любом доходе и ФОТ (без лимитов, с сотрудниками)."""
+    return tuple(mk for mk, no_employees, month_limit, year_limit
+                 in zip(table.keys, table.no_employees, table.month_limit, table.year_limit)
+                 if not no_employees and month_limit == np.inf and year_limit == np.inf)
+
+
+def over_any_limit(table, income):
+    """Доход превышает лимит хотя бы одного режима с лимитами (как предупреждения compute_mode_tax)."""
+    blocked = np.zeros(np.shape(income), dtype=bool)
+    for month_limit, year_limit in set(zip(table.month_limit, table.year_limit)):
+        if month_limit != np.inf:
+            blocked |= income / 12 > month_limit
+        if year_limit != np.inf:
+            blocked |= income > year_limit
+    return blocked
+
+
+def _chunks(draws, chunk, seed):
+    sizes = [chunk] * (draws // chunk) + ([draws % chunk] if draws % chunk else [])
+    return zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))
+
+
+def simulate(income, expenses=0.0, payroll=0.0, amortization=0.0, draws=1_000_000, seed=0, workers=1,
+             chunk=250_000, modes=MODE_KEYS, percentiles=(5, 50, 95), objective="mean", rules=None):
+    """Смоделировать draws реализаций и свести статистику по режимам.
+
+    income, expenses, payroll — распределения (строка 'вид:параметры', кортеж
+    или число), amortization — число. Возвращает словарь: summary (pandas
+    DataFrame по режимам), snr_breach_probability (превышение лимита режимов с
+    лимитами, т.е. СНР), recommended (ключ режима или None), draws, seed.
+    """
+    import pandas as pd
+
+    if draws < 1 or chunk < 1:
+        raise ValueError(f"draws и chunk должны быть >= 1, переданы {draws} и {chunk}")
+    dists = [parse_distribution(d) for d in (income, expenses, payroll)]
+    modes = tuple(modes)
+    func = partial(simulate_chunk, income=dists[0], expenses=dists[1], payroll=dists[2],
+                   amortization=float(amortization), modes=modes, rules=rules)
+    parts = list(imap_ordered(func, _chunks(draws, chunk, seed), workers=workers))
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    rows = []
+    best = cols["best"]
+    best_counts = np.bincount(best[best >= 0], minlength=len(modes))
+    for i, mk in enumerate(modes):
+        eff = cols[f"effective_{mk}"]
+        eff = eff[~np.isnan(eff)]  # только реализации, где режим применим
+        row = {"mode": mk, "mean": eff.mean() if eff.size else np.nan}
+        values = np.percentile(eff, percentiles) if eff.size else np.full(len(percentiles), np.nan)
+        row.update({f"p{q:g}": v for q, v in zip(percentiles, values)})
+        row["p_unavailable"] = 1 - cols[f"available_{mk}"].mean()
+        row["p_best"] = best_counts[i] / draws
+        rows.append(row)
+    summary = pd.DataFrame(rows).set_index("mode")
+    key = "mean" if objective == "mean" else "p95"
+    if key not in summary:
+        raise ValueError(f"objective={objective!r} требует перцентиль 95 в percentiles")
+    return {
+        "summary": summary,
+        "snr_breach_probability": float(cols["limit_blocked"].mean()),
+        "recommended": summary[key].idxmin() if summary[key].notna().any() else None,
+        "draws": draws,
+        "seed": seed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Монте-Карло налоговой нагрузки по режимам.")
+    parser.add_argument("--income", required=True, help="распределение дохода за год, напр. lognormal:20e6:6e6")
+    parser.add_argument("--expenses", default="0", help="распределение расходов (normal:среднее:СКО и т.п.)")
+    parser.add_argument("--payroll", default="0", help="распределение ФОТ за год")
+    parser.add_argument("--amortization", type=float, default=0.0)
+    parser.add_argument("--draws", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="процессов (0 — все ядра)")
+    parser.add_argument("--chunk", type=int, default=250_000, help="реализаций в порции")
+    parser.add_argument("--modes", nargs="+", default=list(MODE_KEYS), choices=MODE_KEYS)
+    parser.add_argument("--objective", choices=("mean", "p95"), default="mean")
+    args = parser.parse_args(argv)
+
+    res = simulate(args.income, args.expenses, args.payroll, args.amortization, draws=args.draws, seed=args.seed,
+                   workers=args.workers or None, chunk=args.chunk, modes=args.modes, objective=args.objective)
+    print(res["summary"].to_string(float_format=lambda x: f"{x:,.2f}"))
+    print(f"Вероятность превышения лимита СНР: {res['snr_breach_probability']:.2%}")
+    print(f"Рекомендация ({args.objective}): {res['recommended'] or 'нет применимого режима'}")
+
+
+if __name__ == "__main__":
+    main()
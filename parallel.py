@@ -0,0 +1,73 @@
+# parallel.py
+"""Параллельный пакетный расчёт на пуле процессов.
+
+Вход режется на порции (единицы работы), порции считаются в пуле процессов,
+результаты собираются строго в порядке входа — вывод детерминирован и не
+зависит от числа процессов. Одновременно в работе не больше max_pending порций,
+так что и в потоковом режиме (batch_cli.py) память остаётся ограниченной.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from batch import annual_columns, compare_regimes_batch
+from taxcore import MODE_KEYS
+
+
+def default_workers():
+    """Число процессов по умолчанию — число доступных ядер."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # не Linux
+        return os.cpu_count() or 1
+
+
+def imap_ordered(func, chunks, workers=None, max_pending=None, mp_context=None):
+    """Как map(func, chunks), но в пуле из workers процессов; порядок результатов сохраняется.
+
+    workers=1 — без пула, в текущем процессе (удобно для отладки). mp_context —
+    контекст multiprocessing для пула (None — по умолчанию платформы).
+    """
+    workers = workers or default_workers()
+    if workers == 1:
+        yield from map(func, chunks)
+        return
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def compare_chunk(df, period="year", rules=None):
+    """Сравнение всех режимов для порции данных (колонки как в batch_cli)."""
+    cols = annual_columns(df, period)
+    res = compare_regimes_batch(cols["income"], cols["salaries"], cols["expenses"], cols["amortization"], rules)
+    res["best_mode"] = np.asarray(MODE_KEYS + ("",))[res["best_mode"]]  # -1 (нет доступных) -> ""
+    out = df.copy()
+    for k, v in res.items():
+        out[k] = v
+    return out
+
+
+def split_frame(df, chunksize):
+    """Нарезать DataFrame на порции по chunksize строк (без копирования данных)."""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def run_comparison(df, workers=None, chunksize=250_000, period="year"):
+    """Сравнить режимы для всех строк df в пуле процессов; порядок строк сохраняется."""
+    func = partial(compare_chunk, period=period)
+    parts = list(imap_ordered(func, split_frame(df, chunksize), workers=workers))
+    if not parts:
+        return func(df)
+    return pd.concat(parts)
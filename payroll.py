@@ -0,0 +1,113 @@
+# payroll.py
+"""Расчёт по ФОТ по каждому сотруднику и месяцу (NumPy), с пределами баз.
+
+calc_salary_items считает удержания и начисления от всего фонда зарплаты одной
+суммой, поэтому не может учесть пределы баз, которые действуют на каждого
+сотрудника за каждый месяц: ОПВ и ОСМС берутся не больше чем с N МЗП, СО — в
+пределах [1; 7] МЗП, ИПН — после стандартного вычета 14 МРП. Здесь реестр —
+матрица месячных зарплат (сотрудники × месяцы), каждая статья — матрица той же
+формы, всё считается одним векторным проходом (5 000 сотрудников × 12 месяцев —
+миллисекунды). Пределы берутся из RuleSet (PAYROLL_FIELDS в taxcore/rules.json).
+
+Базы статей — как в calc_salary_items (зарплата месяца), плюс пределы:
+    ОПВ       = min(З, опв_макс) × ставка
+    ОСМС раб. = min(З, осмс_раб_макс) × ставка
+    ИПН       = max(0, З − ОПВ − ОСМС − вычет) × ставка
+    СО        = clip(З, со_мин, со_макс) × ставка   (для З > 0)
+    ОСМС раб-ля = min(З, осмс_рд_макс) × ставка
+    соцналог, ОС НС — без пределов.
+Предел 0 в правилах означает «без предела»; если обнулить все PAYROLL_FIELDS,
+сумма по реестру совпадает с calc_salary_items от общего фонда.
+"""
+import numpy as np
+
+from batch import _positive_part
+from taxcore.calc import CURRENT_RULES, compute_mode_tax
+
+EMPLOYEE_ITEMS = {"opv": "ОПВ (10%)", "osms_emp": "ОСМС (удержание, 2%)", "ipn": "ИПН (10% от базы)"}
+EMPLOYER_ITEMS = {"so": "СО (3.5%)", "osms_er": "ОСМС (работодатель, 3%)",
+                  "soc_tax": "Соцналог (9.5%)", "os_ns": "ОС НС (0.5%)"}
+
+
+def _cap(rules, field, unit):
+    """Предел базы в тенге; 0 в правилах — без предела."""
+    v = getattr(rules, field) * unit
+    return v if v > 0 else np.inf
+
+
+def payroll_items(salaries, rules=None):
+    """Статьи по каждому сотруднику и месяцу: словарь матриц формы salaries.
+
+    salaries — месячные зарплаты (сотрудники × месяцы или любая форма).
+    Ключи — EMPLOYEE_ITEMS, EMPLOYER_ITEMS и итоги emp_total, er_total.
+    """
+    r = rules or CURRENT_RULES
+    s = np.asarray(salaries, dtype=np.float64)
+    out = {}
+    out["opv"] = np.minimum(s, _cap(r, "opv_base_max_mzp", r.mzp)) * r.rate_opv
+    out["osms_emp"] = np.minimum(s, _cap(r, "osms_emp_base_max_mzp", r.mzp)) * r.rate_osms_emp
+    out["ipn"] = _positive_part(s - out["opv"] - out["osms_emp"] - r.ipn_deduction_mrp * r.mrp) * r.rate_ipn
+
+    so_base = np.clip(s, r.so_base_min_mzp * r.mzp, _cap(r, "so_base_max_mzp", r.mzp))
+    out["so"] = np.where(s > 0, so_base, 0.0) * r.rate_so
+    out["osms_er"] = np.minimum(s, _cap(r, "osms_er_base_max_mzp", r.mzp)) * r.rate_osms_er
+    out["soc_tax"] = s * r.rate_soc_tax
+    out["os_ns"] = s * r.rate_os_ns
+
+    out["emp_total"] = out["opv"] + out["osms_emp"] + out["ipn"]
+    out["er_total"] = out["so"] + out["osms_er"] + out["soc_tax"] + out["os_ns"]
+    return out
+
+
+def roster_totals(salaries, rules=None):
+    """Итоги по реестру в формате calc_salary_items: (emp, er, emp_total, er_total) за весь период."""
+    items = payroll_items(salaries, rules)
+    emp = {label: float(items[k].sum()) for k, label in EMPLOYEE_ITEMS.items()}
+    er = {label: float(items[k].sum()) for k, label in EMPLOYER_ITEMS.items()}
+    return emp, er, float(items["emp_total"].sum()), float(items["er_total"].sum())
+
+
+def compute_roster(mode_key, income_annual, salaries, expenses_considered, amortization_annual, rules=None):
+    """Налог режима и обязательства компании по реестру (как info из app2.build_app_graph).
+
+    В compute_mode_tax идёт годовой ФОТ реестра (сумма матрицы), начисления и
+    удержания — по сотрудникам с пределами баз.
+    """
+    salaries = np.asarray(salaries, dtype=np.float64)
+    salaries_annual = float(salaries.sum())
+    emp, er, emp_total, er_total = roster_totals(salaries, rules)
+    mode_tax, taxable_base, warnings = compute_mode_tax(mode_key, income_annual, salaries_annual,
+                                                        expenses_considered, amortization_annual, rules)
+    return {
+        "salaries_annual": salaries_annual,
+        "mode_tax": mode_tax,
+        "taxable_base": taxable_base,
+        "warnings": warnings,
+        "employee_items": emp,
+        "employer_items": er,
+        "company_total_tax": mode_tax + er_total,
+        "employee_withholdings_total": emp_total,
+        "employer_contributions_total": er_total,
+    }
+
+
+def roster_matrix(df, employee="employee", month="month", salary="salary"):
+    """Длинная таблица (сотрудник, месяц, зарплата) -> (ids, months, матрица сотрудники × месяцы).
+
+    Повторы складываются (премии отдельными строками), пропуски — 0.
+    """
+    emp_codes, ids = df[employee].factorize(sort=True)
+    month_codes, months = df[month].factorize(sort=True)
+    matrix = np.zeros((len(ids), len(months)))
+    np.add.at(matrix, (emp_codes, month_codes), df[salary].fillna(0.0).to_numpy(np.float64))
+    return np.asarray(ids), np.asarray(months), matrix
+
+
+def items_frame(ids, months, items):
+    """Длинная таблица pandas: сотрудник, месяц и все статьи (для выгрузки)."""
+    import pandas as pd
+
+    n_emp, n_months = items["opv"].shape
+    cols = {"employee": np.repeat(ids, n_months), "month": np.tile(months, n_emp)}
+    cols.update({k: v.ravel() for k, v in items.items()})
+    return pd.DataFrame(cols)
@@ -0,0 +1,460 @@
+# reports.py
+"""Выгрузка таблиц app2 в XLSX и PDF — для одного клиента или целого портфеля.
+
+Для каждого клиента строятся те же таблицы, что app2 показывает после
+«Рассчитать» (tables.py): вычеты, удержания, начисления, налоги по основному
+режиму и сравнение режимов. Портфель читается порциями (batch_cli.iter_chunks),
+порции считаются в пуле процессов (parallel.imap_ordered — в работе не больше
+2×workers порций) и сразу дописываются в файл:
+
+- .xlsx — xlsxwriter в режиме constant_memory: лист на таблицу, строка —
+  клиент + строка таблицы, суммы остаются числами с денежным форматом; после
+  1 048 576 строк начинается следующий лист («Вычеты 2»);
+- .zip — по PDF на клиента (PDF собираются в процессах пула);
+- .pdf — отчёт одного клиента.
+
+Память не растёт с размером портфеля. ReportJobs выполняет выгрузки в фоновых
+потоках и отдаёт прогресс, поэтому app2 не ждёт их в перезапусках скрипта.
+
+    python reports.py clients.parquet portfolio.xlsx --workers 4
+    python reports.py clients.csv reports.zip --period month
+
+Входные колонки — как в batch_cli: income, salaries, expenses, amortization
+(необязательна), client (имя или код клиента, необязательна), mode (основной
+режим клиента, необязательна; пусто или неизвестный ключ — основной режим
+modes[0], как без колонки). Нужны пакеты xlsxwriter (XLSX) и reportlab (PDF).
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+
+from batch import annual_columns
+from batch_cli import iter_chunks
+from parallel import imap_ordered
+from results import ModeResults
+from tables import (
+    COMPARISON_COLUMNS, DED_COLUMNS, EMP_COLUMNS, ER_COLUMNS, MAIN_COLUMNS,
+    availability, comparison_rows, ded_rows, main_rows,
+)
+from taxcore import MODE_KEYS, money
+from taxcore.calc import calc_salary_items, compute_mode_flags
+from taxcore.whatif import mode_info
+
+# (лист XLSX, заголовок в PDF, колонки) — в порядке вывода app2
+REPORT_TABLES = (
+    ("Вычеты", "Детализация расчёта", DED_COLUMNS),
+    ("Удержания", "Удержания сотрудников (информативно)", EMP_COLUMNS),
+    ("Начисления", "Начисления работодателя (нагрузка компании)", ER_COLUMNS),
+    ("Налоги", "Налоги по режиму и итоговые обязательства", MAIN_COLUMNS),
+    ("Сравнение", "Сравнение режимов", COMPARISON_COLUMNS),
+)
+REPORT_FORMATS = {".xlsx": "xlsx", ".zip": "zip", ".pdf": "pdf"}
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+    "pdf": "application/pdf",
+}
+XLSX_MAX_ROWS = 1_048_576
+XLSX_MONEY_FORMAT = '#,##0.00 "₸"'
+# шрифт PDF должен содержать кириллицу и знак ₸ (встроенные шрифты PDF — только латиница)
+PDF_FONT_PATHS = (
+    os.environ.get("TAXCALC_PDF_FONT"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/DejaVuSans.ttf",
+)
+
+
+def report_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in REPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат отчёта: {path} (ожидается .xlsx, .zip или .pdf)")
+    return REPORT_FORMATS[ext]
+
+
+# --- Таблицы клиента ---
+def client_tables(income, salaries, expenses, amortization=0.0, modes=MODE_KEYS, expenses_components=None,
+                  rules=None):
+    """Таблицы одного клиента (годовые суммы) в порядке REPORT_TABLES — списки строк, суммы — числа.
+
+    modes[0] — основной режим (по нему «Вычеты» и «Налоги»), как первый выбранный в app2.
+    """
+    components = {"Расходы": expenses} if expenses_components is None else expenses_components
+    salary_items = calc_salary_items(salaries, rules)
+    infos = {mk: mode_info(compute_mode_flags(mk, income, salaries, expenses, amortization, rules), salary_items)
+             for mk in modes}
+    av = [availability(mk, income, salaries) for mk in modes]
+    results = ModeResults.from_infos(infos, [a for a, _ in av], salaries + expenses + amortization, income)
+    info = results.record(0)
+    emp_items, er_items, _, _ = salary_items
+    return (
+        ded_rows(income, salaries, components, expenses, amortization, modes[0], info.taxable_base),
+        list(emp_items.items()),
+        list(er_items.items()),
+        main_rows(info),
+        comparison_rows(results, [r for _, r in av])[0],
+    )
+
+
+def tables_from_frames(*frames):
+    """Таблицы из готовых DataFrame app2 (df_ded, df_emp, df_er, df_main, df_comp)."""
+    return tuple(list(df.itertuples(index=False, name=None)) for df in frames)
+
+
+def _client_modes(primary, modes):
+    if primary not in MODE_KEYS:  # колонки mode нет, пусто (NaN) или ключ неизвестен (опечатка, новый режим)
+        return modes
+    return (primary,) + tuple(mk for mk in modes if mk != primary)
+
+
+def report_chunk(task, fmt, modes=MODE_KEYS, period="year", rules=None):
+    """Порция портфеля: task = (номер первой строки, DataFrame) -> [(номер, клиент, таблицы или PDF)]."""
+    start, df = task
+    cols = annual_columns(df, period)
+    rows = range(start + 1, start + len(df) + 1)
+    names = df["client"].astype(str).tolist() if "client" in df else [f"Клиент {row}" for row in rows]
+    primaries = df["mode"].tolist() if "mode" in df else [None] * len(df)
+    out = []
+    for i, row in enumerate(rows):
+        tables = client_tables(float(cols["income"][i]), float(cols["salaries"][i]), float(cols["expenses"][i]),
+                               float(cols["amortization"][i]), _client_modes(primaries[i], modes), rules=rules)
+        out.append((row, names[i], tables if fmt == "xlsx" else render_pdf(names[i], tables)))
+    return out
+
+
+# --- PDF ---
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    """Зарегистрировать шрифт и собрать стили (один раз на процесс)."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    path = next((p for p in PDF_FONT_PATHS if p and os.path.exists(p)), None)
+    if path is None:
+        raise FileNotFoundError("Для PDF нужен TTF-шрифт с кириллицей: укажите путь в TAXCALC_PDF_FONT")
+    pdfmetrics.registerFont(TTFont("TaxcalcSans", path))
+    cell = ParagraphStyle("cell", fontName="TaxcalcSans", fontSize=8, leading=10)
+    table = [
+        ("FONT", (0, 0), (-1, -1), "TaxcalcSans", 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]
+    return {
+        "title": ParagraphStyle("title", fontName="TaxcalcSans", fontSize=14, leading=18, spaceAfter=6),
+        "heading": ParagraphStyle("heading", fontName="TaxcalcSans", fontSize=10, leading=13,
+                                  spaceBefore=8, spaceAfter=4),
+        "cell": cell,
+        "table": table,
+    }
+
+
+def _pdf_cell(value, style, wrap=False):
+    """Ячейка PDF: суммы — money(), длинный текст — Paragraph с переносом (он в разы медленнее строки)."""
+    from reportlab.platypus import Paragraph
+    from xml.sax.saxutils import escape
+
+    if not isinstance(value, str):
+        return money(value)
+    value = value.replace("\ufe0f", "")  # вариант-эмодзи у ⚠️ шрифту не нужен
+    return Paragraph(escape(value), style) if wrap or len(value) > 50 else value
+
+
+def render_pdf(client, tables):
+    """PDF-отчёт клиента (байты): заголовок и таблицы REPORT_TABLES."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table
+    from xml.sax.saxutils import escape
+
+    styles = _pdf_styles()
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm, topMargin=15 * mm,
+                            bottomMargin=15 * mm, title=f"Налоговый расчёт: {client}", invariant=True)
+    story = [Paragraph(escape(f"Налоговый расчёт: {client}"), styles["title"])]
+    for (_, heading, columns), rows in zip(REPORT_TABLES, tables):
+        data = [[_pdf_cell(v, styles["cell"], wrap=True) for v in columns]]
+        data += [[_pdf_cell(v, styles["cell"]) for v in row] for row in rows]
+        if len(columns) == 2:  # позиция, сумма
+            widths, first_money = [doc.width - 35 * mm, 35 * mm], 1
+        else:  # сравнение: режим, статус, налог, чистый доход
+            widths, first_money = [28 * mm, doc.width - 98 * mm, 35 * mm, 35 * mm], 2
+        table = Table(data, colWidths=widths, repeatRows=1)
+        table.setStyle(styles["table"] + [("ALIGN", (first_money, 1), (-1, -1), "RIGHT")])
+        story += [Paragraph(escape(heading), styles["heading"]), table]
+    doc.build(story)
+    return buf.getvalue()
+
+
+# --- Потоковые писатели ---
+class XlsxReportWriter:
+    """Запись таблиц клиентов в XLSX построчно (constant_memory): колонки «Клиент» + колонки таблицы."""
+
+    def __init__(self, path):
+        import xlsxwriter
+
+        self.book = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+        self.header = self.book.add_format({"bold": True})
+        self.money = self.book.add_format({"num_format": XLSX_MONEY_FORMAT})
+        self.sheets = [None] * len(REPORT_TABLES)  # [лист, следующая строка, номер части]
+
+    def _sheet(self, t):
+        state = self.sheets[t]
+        if state is None or state[1] >= XLSX_MAX_ROWS:
+            part = 1 if state is None else state[2] + 1
+            title, _, columns = REPORT_TABLES[t]
+            sheet = self.book.add_worksheet(title if part == 1 else f"{title} {part}")
+            sheet.set_column(0, 0, 18)
+            for c, name in enumerate(columns, 1):
+                sheet.set_column(c, c, 18 if name == "Режим" or name.startswith(("Сумма", "Налог", "Чистый")) else 44)
+            sheet.write_row(0, 0, ["Клиент"] + columns, self.header)
+            sheet.freeze_panes(1, 0)
+            state = self.sheets[t] = [sheet, 1, part]
+        return state
+
+    def write(self, row, client, tables):
+        for t, rows in enumerate(tables):
+            for values in rows:
+                state = self._sheet(t)
+                sheet, r = state[0], state[1]
+                sheet.write_string(r, 0, client)
+                for c, v in enumerate(values, 1):
+                    if isinstance(v, str):
+                        sheet.write_string(r, c, v)
+                    else:
+                        sheet.write_number(r, c, v, self.money)
+                state[1] = r + 1
+
+    def close(self):
+        self.book.close()
+
+
+class PdfZipWriter:
+    """Архив ZIP: PDF каждого клиента отдельным файлом, дописывается по одному."""
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def write(self, row, client, pdf):
+        safe = re.sub(r"[^\w.-]+", "_", client)[:80]
+        self.zip.writestr(f"{row:07d}_{safe}.pdf", pdf)
+
+    def close(self):
+        self.zip.close()
+
+
+class PdfFileWriter:
+    """Один PDF — только для одного клиента (портфель — в .zip)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.written = False
+
+    def write(self, row, client, pdf):
+        if self.written:
+            raise ValueError("В .pdf помещается отчёт одного клиента; для портфеля выберите .zip")
+        with open(self.path, "wb") as f:
+            f.write(pdf)
+        self.written = True
+
+    def close(self):
+        pass
+
+
+WRITERS = {"xlsx": XlsxReportWriter, "zip": PdfZipWriter, "pdf": PdfFileWriter}
+
+
+def _numbered(chunks):
+    start = 0
+    for df in chunks:
+        yield start, df
+        start += len(df)
+
+
+def export_reports(chunks, path, modes=MODE_KEYS, period="year", workers=1, progress=None, rules=None,
+                   mp_context=None):
+    """Выгрузить отчёты по клиентам из порций chunks (DataFrame) в path (.xlsx, .zip или .pdf).
+
+    progress(done) вызывается после каждой записанной порции; mp_context — как в
+    parallel.imap_ordered. Возвращает число клиентов.
+    """
+    fmt = report_format(path)
+    func = partial(report_chunk, fmt=fmt, modes=tuple(modes), period=period, rules=rules)
+    writer = WRITERS[fmt](path)
+    done = 0
+    try:
+        for part in imap_ordered(func, _numbered(chunks), workers=workers, mp_context=mp_context):
+            for row, client, payload in part:
+                writer.write(row, client, payload)
+            done += len(part)
+            if progress:
+                progress(done)
+    finally:
+        writer.close()
+    return done
+
+
+def export_client(path, tables, client="Клиент"):
+    """Выгрузить таблицы одного клиента (client_tables / tables_from_frames) в path."""
+    fmt = report_format(path)
+    writer = WRITERS[fmt](path)
+    try:
+        writer.write(1, client, tables if fmt == "xlsx" else render_pdf(client, tables))
+    finally:
+        writer.close()
+    return 1
+
+
+def count_rows(path):
+    """Число клиентов во входном файле (без чтения данных в память)."""
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        for block in iter(partial(f.read, 1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return max(lines + (last != b"\n") - 1, 0)  # без заголовка
+
+
+# --- Фоновые выгрузки (для app2) ---
+class ReportJob:
+    """Состояние выгрузки; поля пишет фоновый поток, читают перезапуски скрипта."""
+
+    __slots__ = ("id", "path", "file_name", "mime", "total", "done", "status", "error", "started", "finished")
+
+    def __init__(self, job_id, path, file_name, total=None):
+        self.id = job_id
+        self.path = path
+        self.file_name = file_name
+        self.mime = MIME_TYPES[report_format(file_name)]
+        self.total = total
+        self.done = 0
+        self.status = "queued"  # queued -> running -> done | error
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def fraction(self):
+        if self.status == "done":
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ReportJobs:
+    """Очередь выгрузок: max_jobs фоновых потоков, клиенты каждой выгрузки — в workers процессах.
+
+    Файлы пишутся во временный каталог; хранятся последние keep выгрузок.
+    Процессы запускаются через spawn: очередь живёт в многопоточном сервере
+    (Streamlit), а fork из потока копирует чужие блокировки в дочерний процесс.
+    """
+
+    def __init__(self, max_jobs=2, workers=1, chunksize=200, keep=64, directory=None):
+        self.workers = workers
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.chunksize = chunksize
+        self.keep = keep
+        self.directory = directory or tempfile.mkdtemp(prefix="taxcalc-reports-")
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="taxcalc-report")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _submit(self, file_name, produce, total=None):
+        job = ReportJob(uuid.uuid4().hex, None, file_name, total)
+        job.path = os.path.join(self.directory, f"{job.id}{os.path.splitext(file_name)[1]}")
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                old = self._jobs.pop(next(iter(self._jobs)))
+                if old.finished is None:  # ещё идёт — не трогаем
+                    self._jobs[old.id] = old
+                    break
+                if os.path.exists(old.path):
+                    os.remove(old.path)
+        self._pool.submit(self._run, job, produce)
+        return job.id
+
+    def _run(self, job, produce):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            produce(job)
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.error = f"{type(e).__name__}: {e}"
+            if os.path.exists(job.path):
+                os.remove(job.path)
+        finally:
+            job.finished = time.time()
+
+    def submit_client(self, tables, file_name, client="Клиент"):
+        """Отчёт одного клиента (таблицы уже посчитаны)."""
+        def produce(job):
+            job.done = export_client(job.path, tables, client)
+        return self._submit(file_name, produce, total=1)
+
+    def submit_file(self, fileobj, input_name, file_name, period="year", modes=MODE_KEYS):
+        """Отчёты по портфелю из файла CSV/Parquet (fileobj копируется на диск, читается порциями)."""
+        src = os.path.join(self.directory, f"{uuid.uuid4().hex}{os.path.splitext(input_name)[1].lower()}")
+        fileobj.seek(0)
+        with open(src, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+
+        def produce(job):
+            try:
+                job.total = count_rows(src)
+                export_reports(iter_chunks(src, self.chunksize), job.path, modes=modes, period=period,
+                               workers=self.workers, progress=lambda done: setattr(job, "done", done),
+                               mp_context=self.mp_context)
+            finally:
+                os.remove(src)
+        return self._submit(file_name, produce)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчёты XLSX / PDF по портфелю клиентов.")
+    parser.add_argument("input", help="CSV или Parquet (income, salaries, expenses[, amortization, client, mode])")
+    parser.add_argument("output", help=".xlsx (все клиенты) или .zip (PDF на клиента)")
+    parser.add_argument("--period", choices=("year", "month"), default="year", help="суммы во входе за год или в месяц")
+    parser.add_argument("--modes", nargs="+", default=list(MODE_KEYS), choices=MODE_KEYS)
+    parser.add_argument("--workers", type=int, default=1, help="процессов (0 — все ядра)")
+    parser.add_argument("--chunksize", type=int, default=1000, help="клиентов в порции")
+    args = parser.parse_args(argv)
+
+    total = count_rows(args.input)
+    t0 = time.perf_counter()
+
+    def progress(done):
+        print(f"\r{done:,} / {total:,}", end="", file=sys.stderr, flush=True)
+
+    done = export_reports(iter_chunks(args.input, args.chunksize), args.output, modes=args.modes,
+                          period=args.period, workers=args.workers or None, progress=progress)
+    print(f"\nГотово: {done:,} клиентов за {time.perf_counter() - t0:.1f} с -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# results.py
+"""Компактные результаты расчёта режимов: структура массивов вместо словарей.
+
+ModeResults хранит по колонке NumPy на показатель (float64), код режима (int8)
+и все булевы признаки одной битовой маской (uint8). Строка результата — это
+индекс, а не словарь: миллион результатов занимает ~50 МБ против сотен МБ
+у списка словарей, а числа остаются числами до самого вывода — форматирование
+(money) делается при отображении (app2.show_table), сравнивать и
+сортировать можно в любой момент.
+
+to_arrow() собирает pyarrow.Table без копирования данных: числовые колонки и
+маска передаются в Arrow как есть (буферы NumPy), режим — словарная колонка
+поверх int8-кодов. to_parquet() пишет эту таблицу.
+"""
+import numpy as np
+
+from batch import WARNING_FLAGS, mode_codes
+from taxcore import MODE_KEYS, regime_table
+
+VALUE_COLUMNS = ("mode_tax", "taxable_base", "employee_withholdings_total",
+                 "employer_contributions_total", "company_total_tax", "net")
+# биты маски flags: предупреждения в порядке WARNING_FLAGS, затем «режим недоступен»
+FLAG_BITS = {name: np.uint8(1 << i) for i, name in enumerate(WARNING_FLAGS + ("unavailable",))}
+
+
+def _memory_span(a):
+    """Байт памяти, которые реально адресует массив (с учётом шагов, в т.ч. нулевых)."""
+    if not a.size:
+        return 0
+    return a.itemsize + sum((n - 1) * abs(stride) for n, stride in zip(a.shape, a.strides))
+
+
+class ModeRecord:
+    """Одна строка ModeResults (создаётся по запросу, для скалярного кода)."""
+
+    __slots__ = ("mode",) + VALUE_COLUMNS + ("available", "warnings")
+
+    def __init__(self, results, i):
+        self.mode = results.mode_key(i)
+        for name in VALUE_COLUMNS:
+            setattr(self, name, float(getattr(results, name)[i]))
+        self.available = bool(results.available[i])
+        self.warnings = results.warnings(i)
+
+
+class ModeResults:
+    """Результаты по строкам (клиент × режим): колонки-массивы одной длины."""
+
+    __slots__ = ("mode",) + VALUE_COLUMNS + ("flags",)
+
+    def __init__(self, mode, mode_tax, taxable_base, employee_withholdings_total, employer_contributions_total,
+                 company_total_tax, net, flags):
+        self.mode = np.asarray(mode, dtype=np.int8)
+        for name, col in zip(VALUE_COLUMNS, (mode_tax, taxable_base, employee_withholdings_total,
+                                             employer_contributions_total, company_total_tax, net)):
+            setattr(self, name, np.asarray(col, dtype=np.float64))
+        self.flags = np.asarray(flags, dtype=np.uint8)
+
+    @staticmethod
+    def pack_flags(**masks):
+        """Собрать маску flags из булевых массивов по именам FLAG_BITS."""
+        flags = None
+        for name, mask in masks.items():
+            bits = np.where(mask, FLAG_BITS[name], np.uint8(0))
+            flags = bits if flags is None else flags | bits
+        return flags
+
+    @classmethod
+    def from_batch(cls, res, modes, income, salaries, expenses, amortization, available=None):
+        """Из словаря batch.compute_batch (колонки берутся без копирования)."""
+        net = np.asarray(income) - (np.asarray(salaries) + np.asarray(expenses) + np.asarray(amortization)
+                                    + res["company_total_tax"])
+        masks = {name: res[name] for name in WARNING_FLAGS}
+        if available is not None:
+            masks["unavailable"] = ~np.asarray(available, dtype=bool)
+        return cls(np.broadcast_to(mode_codes(modes), net.shape), res["mode_tax"], res["taxable_base"],
+                   res["employee_withholdings_total"], res["employer_contributions_total"],
+                   res["company_total_tax"], net, cls.pack_flags(**masks))
+
+    @classmethod
+    def from_infos(cls, infos, available, costs, income):
+        """Из словарей режимов app2 (taxcore.whatif): infos — {режим: info} в порядке строк.
+
+        available — признак доступности по строкам, costs — ФОТ + расходы + амортизация.
+        """
+        keys = list(infos)
+        flags = np.zeros(len(keys), dtype=np.uint8)
+        for i, mk in enumerate(keys):
+            for name in infos[mk]["flags"]:
+                flags[i] |= FLAG_BITS[name]
+            if not available[i]:
+                flags[i] |= FLAG_BITS["unavailable"]
+        col = {name: [infos[mk][name] for mk in keys] for name in VALUE_COLUMNS[:-1]}
+        net = [income - (costs + infos[mk]["company_total_tax"]) for mk in keys]
+        return cls(mode_codes(keys), net=net, flags=flags, **col)
+
+    def __len__(self):
+        return len(self.mode)
+
+    def mode_key(self, i):
+        code = int(self.mode[i])
+        return MODE_KEYS[code] if code >= 0 else None
+
+    def flag(self, name):
+        """Булев массив признака name (из FLAG_BITS)."""
+        return (self.flags & FLAG_BITS[name]) != 0
+
+    @property
+    def available(self):
+        return ~self.flag("unavailable")
+
+    def warnings(self, i):
+        """Тексты предупреждений строки i — как вернул бы compute_mode_tax."""
+        code = int(self.mode[i])
+        if code < 0:
+            return []
+        texts = regime_table().texts[code]
+        return [text for name, text in zip(WARNING_FLAGS, texts) if self.flags[i] & FLAG_BITS[name]]
+
+    def record(self, i):
+        return ModeRecord(self, i)
+
+    def best(self):
+        """Индекс строки с минимальным налогом компании среди доступных (первый при равенстве).
+
+        Строки с налогом NaN не участвуют; -1 — если выбрать не из чего (как best_mode
+        в batch.compare_regimes_batch).
+        """
+        taxes = np.where(self.available, self.company_total_tax, np.nan)
+        if np.isnan(taxes).all():
+            return -1
+        return int(np.nanargmin(taxes))
+
+    def nbytes(self):
+        """Память под колонки; broadcast-колонка (шаг 0, см. from_batch) занимает одно значение."""
+        return sum(_memory_span(getattr(self, name)) for name in self.__slots__)
+
+    def columns(self):
+        """Словарь колонок (без копирования)."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_frame(self):
+        """pandas DataFrame с числовыми колонками (режим — категория)."""
+        import pandas as pd
+
+        cols = self.columns()
+        cols["mode"] = pd.Categorical.from_codes(self.mode, categories=MODE_KEYS)
+        return pd.DataFrame(cols, copy=False)
+
+    def to_arrow(self):
+        """pyarrow.Table без копирования числовых буферов."""
+        import pyarrow as pa
+
+        unknown = self.mode < 0
+        codes = pa.array(self.mode, mask=unknown) if unknown.any() else pa.array(self.mode)
+        mode = pa.DictionaryArray.from_arrays(codes, pa.array(MODE_KEYS))
+        arrays = [mode] + [pa.array(getattr(self, name)) for name in VALUE_COLUMNS] + [pa.array(self.flags)]
+        return pa.Table.from_arrays(arrays, names=list(self.__slots__))
+
+    def to_parquet(self, path, **kwargs):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, **kwargs)
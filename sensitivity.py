@@ -0,0 +1,160 @@
+# sensitivity.py
+"""Чувствительность налога и чистого дохода к входам по всем режимам (пакетно, NumPy).
+
+Совокупный налог компании (налог режима + начисления работодателя k × ФОТ,
+как в compute_batch) — кусочно-линейная функция входов с одним изломом на
+нулевой прибыли, поэтому производные берутся аналитически (P = I − E − S − A):
+
+    с дохода (СНР):      d налог / dI = rate;  dE = dA = 0;  dS = k
+    с прибыли:           d налог / dI = rate при P >= 0, иначе 0
+                         d налог / dE = dA = −rate при P > 0, иначе 0;  dS = dE + k
+    чистый доход N = I − (S + E + A + налог):  dN / dI = 1 − d налог / dI,  dN / dX = −1 − d налог / dX
+
+Производные правые (на следующий тенге): на изломе P = 0 рост дохода уже
+облагается, а рост расходов налог не уменьшает. Предельная ставка — d налог /
+dI, эффективная — налог / доход. Дельты delta_* — сколько вход добавляет к
+налогу и чистому доходу целиком: значение при входе минус значение при
+обнулённом входе (для статьи расходов — при расходах без этой статьи), по тем
+же формулам, что batch.compute_mode_tax_batch. Доступность режима (лимиты СНР,
+запрет сотрудников) в дельтах не меняется — она отдельной колонкой available.
+
+Все режимы считаются одним проходом: коды режимов — ось (режимы × 1), входы —
+ось строк, массивы результатов — (режимы × строки).
+
+    python sensitivity.py --income 40e6 --salaries 6e6 --expenses 8e6 --amortization 1e6
+"""
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from batch import (INPUT_COLUMNS, MODE_CODES, calc_salary_items_batch, compute_mode_tax_batch, employer_rate,
+                   group_values, in_codes, mode_codes, regime_groups)
+from taxcore import MODE_KEYS
+from taxcore.calc import CURRENT_RULES, regime_table
+
+Sensitivity = namedtuple("Sensitivity", ("modes", "tax", "net", "effective_rate", "marginal_rate", "available",
+                                         "d_tax", "d_net", "delta_tax", "delta_net"))
+Sensitivity.__doc__ = """Результат sensitivity_batch; массивы — (режимы × строки), строка j — режим modes[j].
+
+tax / net — совокупный налог компании и чистый доход, effective_rate — налог /
+доход (NaN при доходе <= 0), marginal_rate — налог со следующего тенге дохода,
+available — режим доступен (как в compare_regimes_batch). d_tax / d_net —
+{вход: производная}, delta_tax / delta_net — {вход: вклад входа целиком};
+входы — INPUT_COLUMNS и статьи расходов. Одинаковые производные (расходы,
+амортизация, статьи) — один и тот же массив.
+"""
+
+# колонки sensitivity_columns: <величина>_<режим> и <величина>_<вход>_<режим>
+RATE_COLUMNS = ("tax", "net", "effective_rate", "marginal_rate", "available")
+DELTA_COLUMNS = ("d_tax", "d_net", "delta_tax", "delta_net")
+
+
+def _mode_tax(income_base, profit_base, turnover_rate, profit_rate, income, profit):
+    """Налог режима по формулам batch._evaluate — для входов с обнулённой величиной."""
+    return np.select([income_base, profit_base],
+                     [income * turnover_rate, np.where(profit <= 0, 0.0, profit * profit_rate)], 0.0)
+
+
+def sensitivity_batch(income, salaries, expenses, amortization=0.0, modes=MODE_KEYS, expense_items=None,
+                      rules=None):
+    """Налог, чистый доход, ставки и чувствительности по режимам modes для каждой строки.
+
+    Входы годовые, массивы или скаляры (broadcast, как в compute_batch);
+    expenses — учитываемые расходы целиком, expense_items — необязательный
+    {статья: суммы} (статьи входят в expenses). Возвращает Sensitivity.
+    """
+    modes = (modes,) if isinstance(modes, str) else tuple(modes)
+    unknown = [mk for mk in modes if mk not in MODE_CODES]
+    if unknown:
+        raise ValueError(f"неизвестные режимы: {', '.join(map(str, unknown))}; допустимы: {', '.join(MODE_KEYS)}")
+    r = rules or CURRENT_RULES
+    arrays = [np.asarray(v, dtype=np.float64) for v in (income, salaries, expenses, amortization)]
+    arrays[0] = np.atleast_1d(arrays[0])
+    income, salaries, expenses, amortization = np.broadcast_arrays(*arrays)
+    items = {name: np.broadcast_to(np.asarray(v, dtype=np.float64), income.shape)
+             for name, v in (expense_items or {}).items()}
+    codes = mode_codes(np.array(modes)).reshape(-1, 1)
+
+    mode_tax, _, flags = compute_mode_tax_batch(codes, income, salaries, expenses, amortization, r)
+    _, _, _, er_total = calc_salary_items_batch(salaries, r)
+    tax = mode_tax + er_total
+    net = income - (salaries + expenses + amortization + tax)
+    available = ~(flags["warn_month_limit"] | flags["warn_year_limit"] | flags["warn_employees"])
+
+    groups = regime_groups(regime_table(r))
+    income_base = in_codes(codes, groups.income_base)
+    profit_base = in_codes(codes, groups.profit_base)
+    turnover_rate = group_values(codes, groups.income_rates, 0.0)
+    profit_rate = group_values(codes, groups.profit_rates, 0.0)
+    profit = income - expenses - salaries - amortization
+
+    d_income = np.select([income_base, profit_base], [turnover_rate, np.where(profit >= 0, profit_rate, 0.0)], 0.0)
+    d_cost = np.where(profit_base & (profit > 0), -profit_rate, 0.0)
+    d_salaries = d_cost + employer_rate(r)
+    d_tax = {"income": d_income, "salaries": d_salaries, "expenses": d_cost, "amortization": d_cost}
+    d_net_cost = -1.0 - d_cost
+    d_net = {"income": 1.0 - d_income, "salaries": -1.0 - d_salaries, "expenses": d_net_cost,
+             "amortization": d_net_cost}
+
+    # прибыль без входа — в том же порядке вычитаний, что и profit
+    without = {
+        "income": (np.zeros_like(income), 0.0 - expenses - salaries - amortization),
+        "salaries": (income, income - expenses - 0.0 - amortization),
+        "expenses": (income, income - 0.0 - salaries - amortization),
+        "amortization": (income, income - expenses - salaries - 0.0),
+    }
+    for name, values in items.items():
+        without[name] = (income, income - (expenses - values) - salaries - amortization)
+        d_tax[name] = d_cost
+        d_net[name] = d_net_cost
+    inputs = {"income": income, "salaries": salaries, "expenses": expenses, "amortization": amortization, **items}
+
+    delta_tax, delta_net = {}, {}
+    for name, (income_without, profit_without) in without.items():
+        delta = mode_tax - _mode_tax(income_base, profit_base, turnover_rate, profit_rate, income_without,
+                                     profit_without)
+        if name == "salaries":
+            delta = delta + er_total  # без ФОТ нет и начислений
+        delta_tax[name] = delta
+        delta_net[name] = (inputs[name] if name == "income" else -inputs[name]) - delta
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective_rate = np.where(income > 0, tax / income, np.nan)
+    return Sensitivity(modes, tax, net, effective_rate, d_income, available, d_tax, d_net, delta_tax, delta_net)
+
+
+def sensitivity_columns(sens):
+    """Плоский словарь колонок (для DataFrame): tax_<режим>, d_tax_<вход>_<режим> и т.д."""
+    out = {}
+    for j, mk in enumerate(sens.modes):
+        for name in RATE_COLUMNS:
+            out[f"{name}_{mk}"] = getattr(sens, name)[j]
+        for name in DELTA_COLUMNS:
+            for inp, values in getattr(sens, name).items():
+                out[f"{name}_{inp}_{mk}"] = values[j]
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Чувствительность налога и чистого дохода к входам по режимам.")
+    parser.add_argument("--income", type=float, required=True, help="доход за год")
+    parser.add_argument("--salaries", type=float, default=0.0, help="ФОТ за год")
+    parser.add_argument("--expenses", type=float, default=0.0)
+    parser.add_argument("--amortization", type=float, default=0.0)
+    parser.add_argument("--modes", nargs="+", default=list(MODE_KEYS), choices=MODE_KEYS)
+    args = parser.parse_args(argv)
+
+    sens = sensitivity_batch(args.income, args.salaries, args.expenses, args.amortization, modes=args.modes)
+    for j, mk in enumerate(sens.modes):
+        print(f"{mk}: налог {sens.tax[j, 0]:,.2f}, чистый {sens.net[j, 0]:,.2f}, "
+              f"эффективная ставка {sens.effective_rate[j, 0]:.2%}, предельная {sens.marginal_rate[j, 0]:.2%}"
+              f"{'' if sens.available[j, 0] else ' (недоступен)'}")
+        print(f"    {'вход':<14}{'d налог':>10}{'d чистый':>10}{'Δ налог':>20}{'Δ чистый':>20}")
+        for name in INPUT_COLUMNS:
+            print(f"    {name:<14}{sens.d_tax[name][j, 0]:>10.4f}{sens.d_net[name][j, 0]:>10.4f}"
+                  f"{sens.delta_tax[name][j, 0]:>20,.2f}{sens.delta_net[name][j, 0]:>20,.2f}")
+
+
+if __name__ == "__main__":
+    main()
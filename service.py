@@ -0,0 +1,276 @@
+# service.py
+"""Локальный асинхронный HTTP JSON-сервис расчёта налогов (без Streamlit).
+
+    python service.py --port 8080
+
+POST /calculate  {"income": ..., "salaries": ..., "expenses": ..., "amortization": ..., "mode": "general_too"}
+    -> {"mode_tax": ..., "taxable_base": ..., ..., "warnings": [...]}
+GET  /metrics    -> задержки запросов (p50/p90/p99, мс) и размеры пакетов
+GET  /metrics/prometheus -> то же плюс время расчёта пакетов и счётчики по режимам
+                            (taxcore.metrics) в текстовом формате Prometheus
+GET  /health     -> {"status": "ok"}
+
+Одновременные запросы собираются в микропакеты (до max_batch штук или
+max_wait_ms миллисекунд) и считаются одним вызовом batch.compute_batch.
+Только stdlib asyncio — HTTP/1.1 с keep-alive, без внешних веб-фреймворков.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from batch import compute_batch, warnings_at
+from taxcore import MODE_KEYS
+from taxcore.metrics import METRICS, inc, span
+from taxcore.regimes import WARNING_FLAGS
+
+RESULT_FIELDS = ("mode_tax", "taxable_base", "employee_withholdings_total",
+                 "employer_contributions_total", "company_total_tax")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """Очередь запросов на расчёт: копит их и считает пачкой в compute_batch."""
+
+    def __init__(self, max_batch=512, max_wait_ms=1.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = deque(maxlen=10_000)
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()  # создаём внутри работающего цикла событий
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, row):
+        """row = (income, salaries, expenses, amortization, mode); вернуть словарь результата."""
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # всё, что уже стоит в очереди, забираем без ожидания
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            self.batch_sizes.append(len(items))
+            self._evaluate(items)
+
+    @staticmethod
+    def _evaluate(items):
+        try:
+            cols = list(zip(*(row for row, _ in items)))
+            modes = np.asarray(cols[4])
+            with span("service.compute_batch"):
+                res = compute_batch(*(np.asarray(c, dtype=np.float64) for c in cols[:4]), modes)
+            for mk, n in zip(*np.unique(modes, return_counts=True)):
+                inc("mode_evaluations_total", int(n), mode=str(mk))
+        except Exception as e:  # ошибка пакета отдаётся каждому запросу пакета
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for i, (row, fut) in enumerate(items):
+            if fut.done():  # клиент отключился
+                continue
+            out = {k: float(res[k][i]) for k in RESULT_FIELDS}
+            out.update({k: bool(res[k][i]) for k in WARNING_FLAGS})
+            out["warnings"] = warnings_at(res, row[4], i)
+            fut.set_result(out)
+
+
+class LatencyStats:
+    """Скользящее окно задержек запросов (мс) для /metrics."""
+
+    def __init__(self, window=100_000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+
+    def add(self, ms, ok=True):
+        self.samples.append(ms)
+        self.count += 1
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self):
+        out = {"requests": self.count, "errors": self.errors, "window": len(self.samples)}
+        if self.samples:
+            arr = np.fromiter(self.samples, dtype=np.float64)
+            p50, p90, p99, p999 = np.percentile(arr, [50, 90, 99, 99.9])
+            out.update(latency_ms={"mean": arr.mean(), "p50": p50, "p90": p90, "p99": p99,
+                                   "p99.9": p999, "max": arr.max()})
+        return out
+
+
+def parse_row(payload):
+    """Проверить JSON запроса и вернуть кортеж входов для MicroBatcher."""
+    if not isinstance(payload, dict):
+        raise ValueError("ожидается JSON-объект")
+    mode = payload.get("mode")
+    if mode not in MODE_KEYS:
+        raise ValueError(f"mode должен быть одним из {', '.join(MODE_KEYS)}")
+    values = []
+    for name in ("income", "salaries", "expenses", "amortization"):
+        v = payload.get(name, 0.0)
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"{name} должен быть числом")
+        try:
+            v = float(v)
+        except OverflowError:  # целое вне диапазона float
+            v = math.inf
+        if payload.get("period") == "month":  # как to_annual("В месяц")
+            v = v * 12
+        # json.loads пропускает NaN / Infinity — в ответе они дали бы нестандартный JSON
+        if not math.isfinite(v):
+            raise ValueError(f"{name} должен быть конечным числом")
+        values.append(v)
+    return (*values, mode)
+
+
+class TaxService:
+    def __init__(self, max_batch=512, max_wait_ms=1.0):
+        self.batcher = MicroBatcher(max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.stats = LatencyStats()
+
+    async def handle(self, method, path, body):
+        """Обработать один HTTP-запрос; вернуть (status, объект для JSON)."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            batches = self.batcher.batch_sizes
+            out = self.stats.snapshot()
+            out["batches"] = {"count": len(batches),
+                              "mean_size": float(np.mean(batches)) if batches else 0.0}
+            return 200, out
+        if path == "/metrics/prometheus":
+            return 200, self.prometheus()
+        if path != "/calculate":
+            return 404, {"error": f"нет такого пути: {path}"}
+        if method != "POST":
+            return 405, {"error": "используйте POST"}
+        try:
+            row = parse_row(json.loads(body or b"null"))
+        except ValueError as e:  # в т.ч. json.JSONDecodeError
+            return 400, {"error": str(e)}
+        return 200, await self.batcher.submit(row)
+
+    def prometheus(self):
+        """Метрики сервиса и taxcore.metrics в текстовом формате Prometheus."""
+        snap = self.stats.snapshot()
+        lines = [
+            "# TYPE taxcalc_requests_total counter",
+            f"taxcalc_requests_total {snap['requests']}",
+            "# TYPE taxcalc_request_errors_total counter",
+            f"taxcalc_request_errors_total {snap['errors']}",
+        ]
+        if "latency_ms" in snap:
+            lines.append("# TYPE taxcalc_request_latency_seconds summary")
+            for q, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                lines.append(f'taxcalc_request_latency_seconds{{quantile="{q}"}} {snap["latency_ms"][key] / 1000:.9f}')
+        return "\n".join(lines) + "\n" + METRICS.prometheus()
+
+    @staticmethod
+    async def _respond(writer, version, status, payload, keep_alive):
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data, content_type = json.dumps(payload, ensure_ascii=False).encode(), "application/json; charset=utf-8"
+        writer.write(
+            f"{version} {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                t0 = time.perf_counter()
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+                    await self._respond(writer, "HTTP/1.1", 400, {"error": "некорректная строка запроса"}, False)
+                    break
+                method, path, version = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self._respond(writer, version, 400, {"error": "некорректный Content-Length"}, False)
+                    break
+                body = await reader.readexactly(int(length))
+
+                try:
+                    status, payload = await self.handle(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    status, payload = 500, {"error": repr(e)}
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self._respond(writer, version, status, payload, keep_alive)
+                if path.startswith("/calculate"):
+                    self.stats.add((time.perf_counter() - t0) * 1000, ok=status == 200)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # оборванное соединение или слишком длинная строка
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        self.batcher.start()
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP JSON-сервис расчёта налогов.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=512, help="максимум запросов в одном пакете")
+    parser.add_argument("--max-wait-ms", type=float, default=1.0, help="сколько ждать добора пакета, мс")
+    args = parser.parse_args(argv)
+    service = TaxService(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    print(f"Сервис расчёта налогов: http://{args.host}:{args.port}/calculate")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# sweep.py
+"""Карта оптимальных режимов по сетке доход × расходы × ФОТ.
+
+Для фиксированных расходов E, ФОТ S и амортизации A совокупный налог каждого
+режима — кусочно-линейная функция дохода I (начисления по ФОТ c(S) от I не
+зависят):
+
+    СНР:          rate_snr * I + c(S),   доступен при I <= min(12 * лимит_мес, лимит_год)
+                                         (самозанятый — ещё и только при S == 0)
+    общий режим:  rate * max(0, I - D) + c(S),   D = E + S + A
+
+Поэтому границы, где меняется лучший режим, находятся в закрытом виде:
+0, D, лимит СНР и точки равенства rate * (I - D) = rate_snr * I,
+т.е. I = rate * D / (rate - rate_snr). Ставки и лимиты берутся из реестра
+режимов (taxcore.regimes, regime_table): налог с дохода — как СНР, налог с
+прибыли — как общий режим, лимит — у каждого режима с лимитами. Между соседними границами победитель
+постоянен — он определяется одним пакетным расчётом в середине интервала
+(batch.compare_regimes_batch, те же правила выбора, что в app2). Сетка из
+10⁸ точек превращается в несколько интервалов дохода на каждую пару (E, S).
+"""
+import numpy as np
+
+from batch import compare_regimes_batch
+from taxcore import MODE_KEYS
+from taxcore.calc import CURRENT_RULES, regime_table
+
+
+def _breakpoints(d, rules):
+    """Кандидаты в границы по доходу для массива D = E + S + A; форма (n, k)."""
+    table = regime_table(rules)
+    regimes = tuple(zip(table.base, table.rates, table.month_limit, table.year_limit))
+    limits = sorted({min(12 * month_limit, year_limit) for _, _, month_limit, year_limit in regimes} - {np.inf})
+    income_rates = sorted({rate for base, rate, _, _ in regimes if base == "income"})
+    profit_rates = sorted({rate for base, rate, _, _ in regimes if base == "profit"})
+    cols = [np.zeros_like(d), d] + [np.full_like(d, limit) for limit in limits]
+    for s in income_rates:
+        for rate in profit_rates:
+            if rate > s:  # иначе налог с дохода никогда не дешевле выше D — точки пересечения нет
+                cols.append(rate * d / (rate - s))
+    return np.stack(cols, axis=1)
+
+
+def winners(income, expenses, payroll, amortization, modes=MODE_KEYS, rules=None):
+    """Лучший режим (индекс в modes, -1 — ни один не доступен) для каждой точки."""
+    res = compare_regimes_batch(income, expenses=expenses, salaries=payroll,
+                                amortization=amortization, rules=rules)
+    taxes = np.stack([np.where(res[f"available_{mk}"], res[f"tax_{mk}"], np.inf) for mk in modes])
+    best = np.argmin(taxes, axis=0)
+    return np.where(np.isfinite(taxes.min(axis=0)), best, -1)
+
+
+def regime_map(income_min, income_max, expenses, payroll, amortization=0.0, modes=MODE_KEYS, rules=None):
+    """Интервалы дохода [income_from, income_to) с постоянным лучшим режимом.
+
+    expenses, payroll — одномерные сетки (годовые суммы); считаются все их
+    сочетания. modes — какие режимы сравнивать (например, доступные ТОО).
+    Возвращает pandas DataFrame: expenses, payroll, income_from, income_to,
+    best_mode — по строке на интервал.
+    """
+    import pandas as pd
+
+    rules = rules or CURRENT_RULES
+    e, s = np.meshgrid(np.asarray(expenses, dtype=np.float64), np.asarray(payroll, dtype=np.float64),
+                       indexing="ij")
+    e, s = e.ravel(), s.ravel()
+    d = e + s + amortization
+
+    # границы, попавшие в [income_min, income_max], по строкам; лишние — NaN
+    cand = _breakpoints(d, rules)
+    cand = np.where((cand > income_min) & (cand < income_max), cand, np.nan)
+    edges = np.concatenate([np.full((len(d), 1), income_min), np.sort(cand, axis=1),
+                            np.full((len(d), 1), income_max)], axis=1)
+    # NaN после сортировки стоят в конце — подтягиваем к ним income_max
+    edges = np.where(np.isnan(edges), income_max, edges)
+    lo, hi = edges[:, :-1], edges[:, 1:]
+    mid = (lo + hi) / 2
+
+    n, k = mid.shape
+    best = winners(mid.ravel(), np.repeat(e, k), np.repeat(s, k), amortization, modes, rules).reshape(n, k)
+
+    # выбрасываем пустые интервалы и склеиваем соседние с одинаковым победителем
+    keep = (hi > lo).ravel()
+    cell = np.repeat(np.arange(n), k)[keep]
+    lo, hi, best = lo.ravel()[keep], hi.ravel()[keep], best.ravel()[keep]
+    start = np.ones(len(cell), dtype=bool)
+    start[1:] = (cell[1:] != cell[:-1]) | (best[1:] != best[:-1])
+    first = np.flatnonzero(start)
+    last = np.append(first[1:], len(cell)) - 1
+    names = np.asarray(list(modes) + [None], dtype=object)  # -1 -> None
+    return pd.DataFrame({
+        "expenses": e[cell[first]],
+        "payroll": s[cell[first]],
+        "income_from": lo[first],
+        "income_to": hi[last],
+        "best_mode": names[best[first]],
+    })
@@ -0,0 +1,103 @@
+# tables.py
+"""Таблицы детализации app2: вычеты, удержания, начисления, налоги, сравнение режимов.
+
+Одни и те же строки показывает app2 (st.table) и выгружает reports.py (XLSX/PDF),
+поэтому модуль без Streamlit. *_rows возвращают списки кортежей (суммы — числа),
+*_table / comparison — pandas DataFrame из этих строк.
+"""
+import pandas as pd
+
+from taxcore.calc import regime_table
+from taxcore.regimes import REGIME_BY_KEY
+
+DED_COLUMNS = ["Позиция", "Сумма"]
+EMP_COLUMNS = ["Удержание (сотрудник)", "Сумма"]
+ER_COLUMNS = ["Начисление (работодатель)", "Сумма"]
+MAIN_COLUMNS = ["Позиция", "Сумма"]
+COMPARISON_COLUMNS = ["Режим", "Статус", "Налог (компания)", "Чистый доход (компания)"]
+
+
+def availability(mk, income_annual, salaries_annual):
+    """(available, reason) для режима — лимиты дохода и запрет сотрудников из реестра режимов."""
+    table = regime_table()
+    i = table.codes.get(mk)
+    available = True
+    reason = ""
+    if i is None:
+        return available, reason
+    month_limit, year_limit = table.month_limit[i], table.year_limit[i]
+    if income_annual / 12 > month_limit:
+        available = False
+        reason = f"доход (в мес.) {income_annual/12:,.2f} ₸ > лимит {month_limit:,.2f} ₸"
+    if income_annual > year_limit:
+        available = False
+        reason = f"доход (в год.) {income_annual:,.2f} ₸ > лимит {year_limit:,.2f} ₸"
+    if table.no_employees[i] and salaries_annual > 0:
+        available = False
+        reason = "в самозанятых нельзя иметь сотрудников"
+    # режимы без лимитов (общий режим) доступны всегда
+    return available, reason
+
+
+def ded_rows(income_annual, salaries_annual, expenses_components, expenses_sum, amortization_annual,
+             primary, taxable_base):
+    # DEDUCTIONS block (visible)
+    ded_rows = []
+    ded_rows.append(("Доход (валовой)", income_annual))
+    ded_rows.append(("Вычеты: фонд зарплаты (ФОТ)", salaries_annual))
+    # list expense components
+    for k, v in expenses_components.items():
+        ded_rows.append((f"Вычеты: {k}", v))
+    ded_rows.append(("Вычеты: амортизация", amortization_annual))
+    ded_rows.append(("Итого вычеты (зарплаты + расходы + амортизация)", salaries_annual + expenses_sum + amortization_annual))
+    # taxable base (for profit taxes)
+    regime = REGIME_BY_KEY.get(primary)
+    if regime is not None and regime.base == "profit":
+        ded_rows.append(("Налогооблагаемая база (прибыль)", taxable_base))
+    else:
+        ded_rows.append(("Налогооблагаемая база (для режима)", taxable_base))
+    return ded_rows
+
+
+def ded_table(*args):
+    return pd.DataFrame(ded_rows(*args), columns=DED_COLUMNS)
+
+
+def salary_tables(salary_items):
+    # Salary-related items (two groups: удержания сотрудников и начисления работодателя)
+    emp_items, er_items, _, _ = salary_items
+    df_emp = pd.DataFrame(list(emp_items.items()), columns=EMP_COLUMNS)
+    df_er = pd.DataFrame(list(er_items.items()), columns=ER_COLUMNS)
+    return df_emp, df_er
+
+
+def main_rows(info):
+    # Mode tax and company totals
+    main_rows = []
+    main_rows.append(("Налог по режиму", info.mode_tax))
+    main_rows.append(("Начисления работодателя (итого)", info.employer_contributions_total))
+    main_rows.append(("Совокупная сумма обязательств (компания)", info.company_total_tax))
+    main_rows.append(("Удержания сотрудников (итого, информативно)", info.employee_withholdings_total))
+    return main_rows
+
+
+def main_table(info):
+    return pd.DataFrame(main_rows(info), columns=MAIN_COLUMNS)
+
+
+def comparison_rows(results, reasons):
+    """Строки сравнения выбранных режимов (results — ModeResults) и лучший доступный режим (mk, налог, чистый доход) или None."""
+    status = ["Доступен" if available else f"⚠️ Недоступен ({reason})" if reason else "⚠️ Недоступен"
+              for available, reason in zip(results.available, reasons)]
+    rows = [(results.mode_key(i), status[i], float(results.company_total_tax[i]), float(results.net[i]))
+            for i in range(len(results))]
+    # Determine best by minimal company tax among available modes
+    i = results.best()
+    best = None if i < 0 else (results.mode_key(i), float(results.company_total_tax[i]), float(results.net[i]))
+    return rows, best
+
+
+def comparison(results, reasons):
+    """Таблица сравнения выбранных режимов (суммы — числа) и лучший доступный режим или None."""
+    rows, best = comparison_rows(results, reasons)
+    return pd.DataFrame(rows, columns=COMPARISON_COLUMNS), best
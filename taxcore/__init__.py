@@ -0,0 +1,18 @@
+# taxcore/__init__.py
+"""Ядро расчёта налогов без зависимостей от Streamlit, pandas и NumPy.
+
+Импорт пакета занимает единицы миллисекунд, поэтому его можно использовать в
+воркерах, CLI и serverless-функциях. Streamlit-приложения (app.py, app2.py)
+только строят интерфейс поверх этих функций.
+"""
+from taxcore.calc import (
+    LIMIT_SNR_MONTH, LIMIT_SNR_YEAR,
+    RATE_OPV, RATE_OSMS_EMP, RATE_IPN,
+    RATE_SO, RATE_OSMS_ER, RATE_SOC_TAX, RATE_OS_NS,
+    RATE_SNR, RATE_IP_GENERAL, RATE_TOO_KPN,
+    to_annual, money, calc_salary_items, compute_mode_tax, regime_table,
+)
+from taxcore.regimes import REGIMES, REGIME_BY_KEY
+from taxcore.simple import calculate_taxes
+
+MODE_KEYS = tuple(regime.key for regime in REGIMES)
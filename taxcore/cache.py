@@ -0,0 +1,59 @@
+# taxcore/cache.py
+"""Ограниченный LRU-кэш результатов расчёта со счётчиками попаданий/промахов."""
+import threading
+from collections import OrderedDict
+
+
+def normalize_key(*parts):
+    """Хэшируемый ключ кэша из входов: числа -> float, dict/list -> кортежи.
+
+    Ключ строится из уже годовых значений, поэтому «100 000 в месяц» и
+    «1 200 000 в год» дают один и тот же ключ.
+    """
+    def norm(x):
+        if isinstance(x, (int, float)) and not isinstance(x, bool):
+            return float(x) + 0.0  # + 0.0 убирает -0.0
+        if isinstance(x, dict):
+            return tuple((k, norm(v)) for k, v in x.items())
+        if isinstance(x, (list, tuple)):
+            return tuple(norm(v) for v in x)
+        return x
+    return norm(parts)
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш на maxsize записей (сессии Streamlit работают в потоках)."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, func):
+        """Вернуть значение по ключу или посчитать func(), сохранить и вытеснить самое старое."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = func()  # считаем без блокировки — параллельные сессии не ждут друг друга
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
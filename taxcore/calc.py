@@ -0,0 +1,106 @@
+# taxcore/calc.py
+"""Расчёт налогов расширенной версии (app2.py): режимы, удержания и начисления по ФОТ.
+
+Чистый Python без тяжёлых импортов — модуль можно использовать без Streamlit/pandas.
+"""
+
+from taxcore.regimes import compile_regimes
+from taxcore.rules import default_rules
+
+# --- Константы ---
+# Значения берутся из действующего (последнего) набора правил taxcore/rules.json;
+# при изменениях законов добавляй новую запись туда, а не правь код.
+CURRENT_RULES = default_rules().latest
+
+LIMIT_SNR_MONTH = CURRENT_RULES.limit_snr_month   # месячный лимит для СНР (~1.3M)
+LIMIT_SNR_YEAR = CURRENT_RULES.limit_snr_year     # годовой лимит для СНР (~16M) - ориентировочно
+
+# социальные ставки
+RATE_OPV = CURRENT_RULES.rate_opv             # ОПВ (удержание с работника)
+RATE_OSMS_EMP = CURRENT_RULES.rate_osms_emp   # ОСМС (удержание с работника)
+RATE_IPN = CURRENT_RULES.rate_ipn             # ИПН (условно 10% от базы)
+RATE_SO = CURRENT_RULES.rate_so               # СО (начисление работодателя)
+RATE_OSMS_ER = CURRENT_RULES.rate_osms_er     # ОСМС (работодателя)
+RATE_SOC_TAX = CURRENT_RULES.rate_soc_tax     # Социальный налог (примерно)
+RATE_OS_NS = CURRENT_RULES.rate_os_ns         # ОС НС (0.5% как пример)
+
+# налоговые ставки режимов
+RATE_SNR = CURRENT_RULES.rate_snr
+RATE_IP_GENERAL = CURRENT_RULES.rate_ip_general
+RATE_TOO_KPN = CURRENT_RULES.rate_too_kpn
+
+# тексты предупреждений compute_mode_tax (флаги — taxcore.regimes.WARNING_FLAGS)
+WARNING_TEXTS = {
+    "warn_employees": "⚠️ СНР неприменим для физлица с сотрудниками.",
+    "warn_month_limit": "⚠️ Доход превышает месячный лимит СНР (~1.3M).",
+    "warn_year_limit": "⚠️ Доход превышает годовой лимит СНР (~16M).",
+    "warn_loss": "⚠️ Прибыль отрицательная или нулевая — налог = 0.",
+    ("warn_loss", "general_ip"): "⚠️ Прибыль отрицательная или нулевая — налог на прибыль = 0.",
+    ("warn_loss", "general_too"): "⚠️ Прибыль отрицательная или нулевая — КПН = 0.",
+}
+_REGIME_TABLES = {}
+
+# --- Вспомогательные функции ---
+def to_annual(value, period_choice):
+    """Пересчитать в годовые значения в зависимости от периода."""
+    try:
+        if period_choice == "В месяц":
+            return value * 12
+        else:
+            return value
+    except:
+        return 0.0
+
+def money(x):
+    return f"{x:,.2f} ₸"
+
+def calc_salary_items(salaries_annual, rules=None):
+    """Возвращает словарь удержаний (employee) и начислений (employer) и суммарные суммы.
+       Important: IPN - удержание сотрудника, не включаем в налог компании, но показываем.
+       rules — RuleSet из taxcore.rules (по умолчанию действующий CURRENT_RULES)."""
+    r = rules or CURRENT_RULES
+    emp = {}
+    er = {}
+    emp["ОПВ (10%)"] = salaries_annual * r.rate_opv
+    emp["ОСМС (удержание, 2%)"] = salaries_annual * r.rate_osms_emp
+    # налог на доходы физлиц (удержание, показываем отдельно)
+    taxable_base_for_ipn = max(0.0, salaries_annual - emp["ОПВ (10%)"] - emp["ОСМС (удержание, 2%)"])
+    emp["ИПН (10% от базы)"] = taxable_base_for_ipn * r.rate_ipn
+
+    er["СО (3.5%)"] = salaries_annual * r.rate_so
+    er["ОСМС (работодатель, 3%)"] = salaries_annual * r.rate_osms_er
+    er["Соцналог (9.5%)"] = salaries_annual * r.rate_soc_tax
+    er["ОС НС (0.5%)"] = salaries_annual * r.rate_os_ns
+
+    emp_total = sum(emp.values())
+    er_total = sum(er.values())
+    return emp, er, emp_total, er_total
+
+def regime_table(rules=None):
+    """Реестр режимов (taxcore.regimes), скомпилированный под RuleSet; кэш на процесс."""
+    r = rules or CURRENT_RULES
+    table = _REGIME_TABLES.get(id(r))
+    if table is None or table.params is not r:
+        table = _REGIME_TABLES[id(r)] = compile_regimes(r, WARNING_TEXTS)
+    return table
+
+_CURRENT_TABLE = regime_table()
+
+def compute_mode_tax(mode_key, income_annual, salaries_annual, expenses_considered, amortization_annual, rules=None):
+    """Вычисляет налог по выбранному режиму и возвращает (mode_tax, taxable_base, warnings).
+       rules — RuleSet из taxcore.rules (по умолчанию действующий CURRENT_RULES)."""
+    table = _CURRENT_TABLE if rules is None else regime_table(rules)
+    evaluate = table.dispatch.get(mode_key)
+    if evaluate is None:
+        return 0.0, 0.0, []
+    return evaluate(income_annual, salaries_annual, expenses_considered, amortization_annual)
+
+def compute_mode_flags(mode_key, income_annual, salaries_annual, expenses_considered, amortization_annual,
+                       rules=None):
+    """Как compute_mode_tax, но вместо текстов предупреждений — имена флагов из WARNING_FLAGS:
+       (mode_tax, taxable_base, flags); тексты флагов — regime_table().texts."""
+    table = _CURRENT_TABLE if rules is None else regime_table(rules)
+    evaluate = table.flag_dispatch.get(mode_key)
+    if evaluate is None:
+        return 0.0, 0.0, []
+    return evaluate(income_annual, salaries_annual, expenses_considered, amortization_annual)
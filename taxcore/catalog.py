@@ -0,0 +1,32 @@
+# taxcore/catalog.py
+"""Справочники интерфейса: типы налогоплательщиков, режимы, их допустимость и выбор по умолчанию.
+
+Модуль импортируется один раз на процесс, поэтому все сессии Streamlit делят
+одни и те же неизменяемые таблицы — на перезапуск скрипта ничего не строится.
+"""
+from taxcore.regimes import REGIME_BY_KEY, REGIMES, eligible_modes
+
+# подпись в интерфейсе -> ключ (порядок = порядок в списке выбора)
+ENTITY_CHOICES = (
+    ("Физическое лицо (individual)", "individual"),
+    ("ИП", "ip"),
+    ("TOO / Компания", "too"),
+    ("Крестьянское хозяйство (КХ)", "kh"),
+)
+MODE_CHOICES = tuple((regime.label, regime.key) for regime in REGIMES)
+ENTITY_LABELS = tuple(label for label, _ in ENTITY_CHOICES)
+MODE_LABELS = tuple(label for label, _ in MODE_CHOICES)
+ENTITY_BY_LABEL = dict(ENTITY_CHOICES)
+MODE_BY_LABEL = dict(MODE_CHOICES)
+MODE_LABEL = {mk: label for label, mk in MODE_CHOICES}
+
+# допустимые режимы по (тип налогоплательщика, есть сотрудники) — по реестру (app.py)
+ELIGIBLE_MODES = {
+    (entity, has_employees): tuple(mk for mk in eligible_modes(entity)
+                                   if REGIME_BY_KEY[mk].employees or not has_employees)
+    for _, entity in ENTITY_CHOICES for has_employees in (False, True)
+}
+# режимы, отмеченные в выборе по умолчанию (одни и те же для любого типа налогоплательщика)
+DEFAULT_MODE_LABELS = (MODE_LABEL["snr_ip_too_kh"], MODE_LABEL["general_too"])
+# типы, у которых в интерфейсе всегда есть поля ФОТ и амортизации
+PAYROLL_ENTITIES = frozenset(("ip", "too", "kh"))
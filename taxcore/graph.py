@@ -0,0 +1,111 @@
+# taxcore/graph.py
+"""Граф зависимостей для инкрементального пересчёта.
+
+Узел — либо вход (значение задаётся через set), либо функция от других узлов.
+Пересчёт ленивый: get(name) пересчитывает узел, только если с момента его
+последней проверки изменился хотя бы один из его входов. Если пересчитанный
+узел дал то же значение, что и раньше, зависимые от него узлы не пересчитываются
+(ранняя отсечка): например, включение расхода с нулевой суммой не меняет
+expenses_sum, и налоги по режимам остаются прежними.
+"""
+from collections import Counter
+
+from taxcore.metrics import span
+
+_MISSING = object()
+
+
+class _Node:
+    __slots__ = ("name", "func", "deps", "value", "changed_at", "verified_at", "cutoff")
+
+    def __init__(self, name, func=None, deps=(), value=_MISSING, cutoff=True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.value = value
+        self.changed_at = 0
+        self.verified_at = -1
+        self.cutoff = cutoff
+
+
+def _same(a, b):
+    """Равенство для ранней отсечки; несравнимые значения (DataFrame и т.п.) — всегда «изменились»."""
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class Graph:
+    """Ленивый граф вычислений с отслеживанием зависимостей."""
+
+    def __init__(self):
+        self._nodes = {}
+        self.revision = 0
+        self.recomputed = Counter()   # сколько раз пересчитан каждый узел
+        self.last_recomputed = []     # какие узлы пересчитаны после последнего изменения входов
+        self._last_get_revision = None
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    def add_input(self, name, value=None):
+        self._nodes[name] = _Node(name, value=value)
+        self.revision += 1
+        self._nodes[name].changed_at = self.revision
+
+    def add_node(self, name, func, deps, cutoff=True):
+        """Узел name = func(*значения deps). cutoff=False — не сравнивать значения (дорого или нельзя)."""
+        self._nodes[name] = _Node(name, func, deps, cutoff=cutoff)
+        self.revision += 1
+
+    def set_deps(self, name, deps):
+        """Поменять список зависимостей узла (например, добавилась строка расходов)."""
+        node = self._nodes[name]
+        if tuple(deps) != node.deps:
+            node.deps = tuple(deps)
+            node.verified_at = -1
+            self.revision += 1
+
+    def set(self, name, value):
+        """Задать значение входа; если оно не изменилось — ничего не инвалидируется."""
+        node = self._nodes[name]
+        if node.func is not None:
+            raise ValueError(f"узел {name!r} вычисляемый, его нельзя задать")
+        if node.value is not _MISSING and _same(node.value, value):
+            return
+        self.revision += 1
+        node.value = value
+        node.changed_at = self.revision
+
+    def get(self, name):
+        if self._last_get_revision != self.revision:
+            self.last_recomputed = []
+            self._last_get_revision = self.revision
+        self._refresh(self._nodes[name])
+        return self._nodes[name].value
+
+    def _refresh(self, node):
+        """Привести узел в актуальное состояние; вернуть ревизию его последнего изменения."""
+        if node.func is None or node.verified_at == self.revision:
+            return node.changed_at
+        stale = node.verified_at < 0
+        for dep in node.deps:  # все зависимости обновляем всегда — их changed_at должен быть точным
+            if self._refresh(self._nodes[dep]) > node.verified_at:
+                stale = True
+        if stale:
+            with span(f"graph.{node.name}"):
+                new = node.func(*(self._nodes[d].value for d in node.deps))
+            self.recomputed[node.name] += 1
+            self.last_recomputed.append(node.name)
+            if node.value is _MISSING or not node.cutoff or not _same(new, node.value):
+                node.value = new
+                node.changed_at = self.revision
+        node.verified_at = self.revision
+        return node.changed_at
+
+    def stats(self):
+        return {"nodes": len(self._nodes), "last_recomputed": len(self.last_recomputed),
+                "total_recomputed": sum(self.recomputed.values())}
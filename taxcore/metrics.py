@@ -0,0 +1,201 @@
+# taxcore/metrics.py
+"""Встроенные замеры горячих путей: интервалы (spans), счётчики и их выгрузка.
+
+    with span("calc.breakdown"):      # время этапа
+        ...
+    lap("ui.inputs")                  # этап от предыдущей отметки до сейчас
+    inc("mode_evaluations_total", mode="general_too")
+
+Каждый интервал и счётчик попадает в общие для процесса агрегаты METRICS
+(сумма времени и число вызовов по имени — для Prometheus). Если в потоке
+открыт Trace (один перезапуск app2.main, один запрос), интервалы ещё и
+записываются в него по порядку, с вложенностью, — это разбивка «последнего
+запуска» для отладочной панели и строки JSON lines.
+
+Выгрузка: METRICS.prometheus() — текстовый формат Prometheus;
+Trace.to_record() + append_jsonl() — по строке JSON на запуск. Без
+Trace-контекста накладные расходы span — один вызов perf_counter и запись
+в словарь под блокировкой.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PREFIX = "taxcalc"
+
+_local = threading.local()
+
+
+class Metrics:
+    """Потокобезопасные агрегаты процесса: время по интервалам и счётчики с метками."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = {}      # имя -> [число вызовов, секунд всего]
+        self.counters = {}   # (имя, ((метка, значение), ...)) -> значение
+
+    def observe(self, name, seconds):
+        with self._lock:
+            s = self.spans.get(name)
+            if s is None:
+                self.spans[name] = [1, seconds]
+            else:
+                s[0] += 1
+                s[1] += seconds
+
+    def inc(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """Копия агрегатов: {"spans": {имя: {"count", "seconds"}}, "counters": [...]}."""
+        with self._lock:
+            return {
+                "spans": {k: {"count": c, "seconds": s} for k, (c, s) in self.spans.items()},
+                "counters": [{"name": n, "labels": dict(lb), "value": v} for (n, lb), v in self.counters.items()],
+            }
+
+    def prometheus(self):
+        """Агрегаты в текстовом формате Prometheus (exposition format 0.0.4)."""
+        snap = self.snapshot()
+        lines = [f"# HELP {PREFIX}_span_seconds Время этапов расчёта.",
+                 f"# TYPE {PREFIX}_span_seconds summary"]
+        for name, s in sorted(snap["spans"].items()):
+            lines.append(f'{PREFIX}_span_seconds_sum{{span="{_escape(name)}"}} {s["seconds"]:.9f}')
+            lines.append(f'{PREFIX}_span_seconds_count{{span="{_escape(name)}"}} {s["count"]}')
+        by_name = {}
+        for c in snap["counters"]:
+            by_name.setdefault(c["name"], []).append(c)
+        for name, items in sorted(by_name.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            for c in items:
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in c["labels"].items())
+                lines.append(f"{PREFIX}_{name}{{{labels}}} {c['value']}" if labels else f"{PREFIX}_{name} {c['value']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+
+
+class Trace:
+    """Интервалы одного запуска по порядку: (имя, глубина вложенности, мс)."""
+
+    def __init__(self, name, metrics=METRICS):
+        self.name = name
+        self.metrics = metrics
+        self.spans = []
+        self.counters = {}
+        self.started = datetime.now(timezone.utc)
+        self.total_ms = None
+        self._depth = 0
+        self._lap_t = time.perf_counter()
+        self._lap_i = 0
+
+    def lap(self, name):
+        """Этап «от предыдущей отметки до сейчас» без with-блока; интервалы внутри него вкладываются в него."""
+        now = time.perf_counter()
+        ms = (now - self._lap_t) * 1000
+        for entry in self.spans[self._lap_i:]:
+            entry[1] += 1
+        self.spans.insert(self._lap_i, [name, 0, ms])
+        self.metrics.observe(name, ms / 1000)
+        self._lap_i = len(self.spans)
+        self._lap_t = now
+
+    def rows(self):
+        """Строки для таблицы: этап (с отступом по вложенности), мс, доля от всего запуска."""
+        total = self.total_ms or sum(ms for _, d, ms in self.spans if d == 0) or 1.0
+        return [{"Этап": "  " * depth + name, "мс": round(ms, 3), "доля": f"{ms / total:.1%}"}
+                for name, depth, ms in self.spans]
+
+    def to_record(self):
+        """Словарь для строки JSON lines."""
+        return {
+            "ts": self.started.isoformat(timespec="milliseconds"),
+            "run": self.name,
+            "total_ms": self.total_ms,
+            "spans": [{"name": n, "depth": d, "ms": ms} for n, d, ms in self.spans],
+            "counters": [{"name": n, "labels": dict(lb), "value": v} for (n, lb), v in self.counters.items()],
+        }
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def trace(name, metrics=METRICS):
+    """Открыть Trace для текущего потока; его интервалы и счётчики пишутся и в metrics."""
+    tr = Trace(name, metrics)
+    prev = current_trace()
+    _local.trace = tr
+    t0 = time.perf_counter()
+    try:
+        yield tr
+    finally:
+        tr.total_ms = (time.perf_counter() - t0) * 1000
+        metrics.observe(name, tr.total_ms / 1000)
+        _local.trace = prev
+
+
+@contextmanager
+def span(name, metrics=METRICS):
+    """Замерить время блока: в агрегаты процесса и, если открыт, в Trace потока."""
+    tr = current_trace()
+    entry = None
+    if tr is not None:
+        entry = [name, tr._depth, 0.0]
+        tr.spans.append(entry)
+        tr._depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        metrics.observe(name, seconds)
+        if entry is not None:
+            entry[2] = seconds * 1000
+            tr._depth -= 1
+
+
+def lap(name):
+    """Отметка этапа в Trace потока (см. Trace.lap); без открытого Trace ничего не делает."""
+    tr = current_trace()
+    if tr is not None:
+        tr.lap(name)
+
+
+def inc(name, n=1, metrics=METRICS, **labels):
+    """Увеличить счётчик (в агрегатах процесса и в Trace потока)."""
+    metrics.inc(name, n, **labels)
+    tr = current_trace()
+    if tr is not None:
+        key = (name, tuple(sorted(labels.items())))
+        tr.counters[key] = tr.counters.get(key, 0) + n
+
+
+def append_jsonl(path, record):
+    """Дописать запись строкой JSON в конец файла."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def write_prometheus(path, metrics=METRICS):
+    """Записать агрегаты в файл (для textfile collector node_exporter); атомарно через замену."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(metrics.prometheus())
+    os.replace(tmp, path)
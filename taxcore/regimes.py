@@ -0,0 +1,200 @@
+# taxcore/regimes.py
+"""Реестр налоговых режимов: кто может применять режим, с какой базы и по какой ставке.
+
+Каждый режим — одна запись Regime в REGIMES; ветвлений по ключу режима в
+расчётах нет. compile_regimes() превращает реестр и параметры версии
+калькулятора (RuleSet для app2, константы taxcore.simple для app) в
+RegimeTable: таблицу диспетчеризации {ключ: функция с подставленными
+ставкой и лимитами} для скалярных compute_mode_tax / calculate_taxes и
+кортежи параметров по коду режима (позиции в REGIMES) для пакетных функций
+batch.py — там режимы с одинаковыми параметрами объединяются в группы кодов,
+и каждая группа считается одним векторным выражением. Скалярные функции
+(dispatch, flag_dispatch, calculate_taxes) собираются из одного шаблона кода
+(_evaluate_body) с подставленными параметрами: формула режима записана один
+раз, а проверок ограничений, которых у режима нет, в функции нет вовсе.
+
+Налоговая база задаётся видом (BASES):
+    "income" — налог с дохода (оборота): налог = ставка × доход;
+    "profit" — налог с прибыли: прибыль = доход − расходы − ФОТ − амортизация,
+               налог = ставка × прибыль, при прибыли <= 0 налог 0 и предупреждение.
+Ставка и лимиты — имена полей параметров (rate_snr, limit_snr_month, ...) или
+числа. Новый режим (например, патент или розничный налог) — ещё одна запись
+в REGIMES (и его ставка/лимиты в rules.json); код расчётов не меняется.
+"""
+from collections import namedtuple
+
+BASES = ("income", "profit")
+
+# флаги предупреждений в порядке, в котором расчёт добавляет тексты
+WARNING_FLAGS = ("warn_employees", "warn_month_limit", "warn_year_limit", "warn_loss")
+
+# что вычитается из дохода в «чистом доходе» calculate_taxes (app); "tax" — налог режима
+NET_COSTS = ("expenses", "salaries", "tax")
+
+Regime = namedtuple("Regime", ("key", "label", "entities", "base", "rate", "employees", "month_limit", "year_limit"),
+                    defaults=(True, None, None))
+Regime.__doc__ = """Описание режима.
+
+key — ключ режима, label — подпись в интерфейсе app2, entities — типы
+налогоплательщиков, которым режим доступен, base — вид базы из BASES, rate —
+ставка, employees — можно ли иметь сотрудников, month_limit / year_limit —
+лимиты дохода (None — без лимита). Ставка и лимиты — имя параметра или число.
+"""
+
+REGIMES = (
+    Regime("snr_individual", "СНР — самозанятые (4%)", ("individual",), "income", "rate_snr",
+           employees=False, month_limit="limit_snr_month", year_limit="limit_snr_year"),
+    Regime("snr_ip_too_kh", "СНР — упрощёнка/розница (4%)", ("ip", "too", "kh"), "income", "rate_snr",
+           month_limit="limit_snr_month", year_limit="limit_snr_year"),
+    Regime("general_ip", "Общий режим — ИП (10%)", ("ip",), "profit", "rate_ip_general"),
+    Regime("general_too", "Общий режим — ТОО (КПН 20%)", ("too",), "profit", "rate_too_kpn"),
+)
+REGIME_BY_KEY = {regime.key: regime for regime in REGIMES}
+if len(REGIME_BY_KEY) != len(REGIMES) or any(regime.base not in BASES for regime in REGIMES):
+    raise ValueError("в REGIMES повторяется ключ или указан неизвестный вид базы")
+
+
+_NET_ARGS = ("tax", "salaries", "expenses", "amortization")
+
+# имена аргументов в теле функции режима по умолчанию
+_ARGS = {name: name for name in ("income", "salaries", "expenses", "amortization")}
+
+
+def _evaluate_body(base, no_employees, month_limit, year_limit, costs, c, indent, args=_ARGS):
+    """Исходный код тела функции режима; c — суффикс имён его параметров в пространстве имён.
+
+    Возвращает (налог, налоговая база, предупреждения); с costs — (налог, доход
+    минус costs по порядку, предупреждения), как calculate_taxes. args —
+    {income / salaries / expenses / amortization: имя аргумента}; None — сумма
+    всегда 0 и в код не входит (x - 0 == x, в т.ч. для -0.0 и NaN).
+    """
+    if costs is not None and any(name not in _NET_ARGS for name in costs):
+        raise ValueError(f"неизвестные вычитаемые суммы {costs!r}; допустимы: {', '.join(_NET_ARGS)}")
+    income, salaries = args["income"], args["salaries"]
+    base_out = costs is None  # вторым значением — база (иначе чистый доход)
+    lines = ["warnings = []"]
+    if no_employees:
+        lines += [f"if {salaries} > 0:", "    warnings.append(employees_text{c})"]
+    if month_limit != float("inf"):
+        lines += [f"if {income} / 12 > month_limit{c}:", "    warnings.append(month_text{c})"]
+    if year_limit != float("inf"):
+        lines += [f"if {income} > year_limit{c}:", "    warnings.append(year_text{c})"]
+    if base == "income":
+        lines.append(f"tax, taxable = {income} * rate{c}, {income}" if base_out else f"tax = {income} * rate{c}")
+    else:
+        terms = [args[name] for name in ("expenses", "salaries", "amortization") if args[name]]
+        lines += [
+            " - ".join([f"profit = {income}"] + terms),
+            "if profit > 0:",
+            "    tax, taxable = profit * rate{c}, profit" if base_out else "    tax = profit * rate{c}",
+            "elif profit <= 0:",
+            "    warnings.append(loss_text{c})",
+            "    tax, taxable = zero, 0.0" if base_out else "    tax = zero",
+            "else:  # NaN: налог NaN, база 0.0 (как max(0.0, nan))",
+            "    tax, taxable = profit * rate{c}, 0.0" if base_out else "    tax = profit * rate{c}",
+        ]
+    if base_out:
+        result = "taxable"
+    else:
+        result = " - ".join([income] + ["tax" if name == "tax" else args[name] for name in costs
+                                        if name == "tax" or args[name]])
+    lines.append(f"return tax, {result}, warnings")
+    return "".join(indent + line.format(c=c) + "\n" for line in lines)
+
+
+def _evaluate_names(rate, month_limit, year_limit, texts, c):
+    """Параметры режима для тела _evaluate_body с суффиксом c."""
+    names = ("rate", "month_limit", "year_limit", "employees_text", "month_text", "year_text", "loss_text")
+    return {f"{name}{c}": value for name, value in zip(names, (rate, month_limit, year_limit) + tuple(texts))}
+
+
+def _param(params, value, default):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return getattr(params, value)
+    return value
+
+
+def _compile_evaluate(base, rate, no_employees, month_limit, year_limit, texts, zero):
+    """Функция расчёта одного режима с подставленными параметрами (элемент таблицы диспетчеризации)."""
+    namespace = {"zero": zero, **_evaluate_names(rate, month_limit, year_limit, texts, "")}
+    exec("def evaluate(income, salaries, expenses, amortization):\n"
+         + _evaluate_body(base, no_employees, month_limit, year_limit, None, "", "    "), namespace)
+    return namespace["evaluate"]
+
+
+class RegimeTable:
+    """Реестр режимов, скомпилированный под параметры одной версии калькулятора.
+
+    dispatch — таблица диспетчеризации {ключ режима: функция} для скалярного
+    расчёта: (налог, налоговая база, предупреждения) из (доход, ФОТ, расходы,
+    амортизация); compile_after_tax() собирает из тех же формул функцию с
+    чистым доходом calculate_taxes вместо базы. Остальные поля — кортежи по коду режима (позиции в keys) для
+    пакетного расчёта и интерфейса: base — вид базы, rates — ставка,
+    no_employees — нельзя иметь сотрудников, month_limit / year_limit — лимиты
+    (inf — без лимита), texts — тексты предупреждений в порядке WARNING_FLAGS,
+    net_costs — вычитаемые из дохода суммы для чистого дохода calculate_taxes.
+    flag_dispatch — как dispatch, но вместо текстов предупреждений — имена
+    флагов из WARNING_FLAGS (те же функции, скомпилированные с именами флагов).
+    """
+
+    __slots__ = ("params", "keys", "codes", "base", "rates", "no_employees", "month_limit", "year_limit",
+                 "texts", "net_costs", "zero", "dispatch", "flag_dispatch")
+
+    def __init__(self, params, texts, net_costs=None, zero=0.0):
+        self.params = params
+        self.keys = tuple(regime.key for regime in REGIMES)
+        self.codes = {mk: i for i, mk in enumerate(self.keys)}
+        self.base = tuple(regime.base for regime in REGIMES)
+        self.rates = tuple(_param(params, regime.rate, 0.0) for regime in REGIMES)
+        self.no_employees = tuple(not regime.employees for regime in REGIMES)
+        self.month_limit = tuple(_param(params, regime.month_limit, float("inf")) for regime in REGIMES)
+        self.year_limit = tuple(_param(params, regime.year_limit, float("inf")) for regime in REGIMES)
+        self.texts = tuple(tuple(texts.get((flag, mk), texts.get(flag)) for flag in WARNING_FLAGS)
+                           for mk in self.keys)
+        net_costs = net_costs or {}
+        self.net_costs = tuple(net_costs.get(mk, NET_COSTS) for mk in self.keys)
+        self.zero = zero
+        rows = tuple(zip(self.keys, self.base, self.rates, self.no_employees, self.month_limit, self.year_limit))
+        self.dispatch = {mk: _compile_evaluate(*row, mode_texts, zero)
+                         for (mk, *row), mode_texts in zip(rows, self.texts)}
+        self.flag_dispatch = {mk: _compile_evaluate(*row, WARNING_FLAGS, zero) for mk, *row in rows}
+
+    def compile_after_tax(self, name, args, inputs, fallback):
+        """Функция name(args) -> (налог, чистый доход, предупреждения) по режиму из аргумента mode.
+
+        Ветвь на каждый режим (формулы — как в dispatch, чистый доход — доход
+        минус net_costs режима) в одной функции, без вызова через таблицу: это
+        горячий путь calculate_taxes. inputs — имена аргументов (доход, ФОТ,
+        расходы, амортизация), None — сумма всегда 0; fallback — выражение,
+        которое вернуть для неизвестного режима.
+        """
+        names = dict(zip(("income", "salaries", "expenses", "amortization"), inputs))
+        lines = [f"def {name}({args}):"]
+        namespace = {"zero": self.zero}
+        for c, row in enumerate(zip(self.keys, self.base, self.rates, self.no_employees, self.month_limit,
+                                    self.year_limit, self.texts, self.net_costs)):
+            mk, base, rate, no_employees, month_limit, year_limit, texts, costs = row
+            lines.append(f"    if mode == {mk!r}:")
+            lines.append(_evaluate_body(base, no_employees, month_limit, year_limit, costs, f"_{c}", " " * 8,
+                                        names))
+            namespace.update(_evaluate_names(rate, month_limit, year_limit, texts, f"_{c}"))
+        lines.append(f"    return {fallback}")
+        exec("\n".join(lines), namespace)
+        return namespace[name]
+
+
+def compile_regimes(params, texts, net_costs=None, zero=0.0):
+    """Скомпилировать реестр под параметры params (RuleSet или объект с теми же атрибутами).
+
+    texts — тексты предупреждений: {флаг: текст}, для отдельного режима —
+    {(флаг, ключ режима): текст}; net_costs — {ключ режима: вычитаемые суммы}
+    (по умолчанию NET_COSTS); zero — налог при убытке (0.0 в app2, 0 в app).
+    """
+    return RegimeTable(params, texts, net_costs, zero)
+
+
+def eligible_modes(entity):
+    """Ключи режимов, доступных типу налогоплательщика, в порядке реестра."""
+    return tuple(regime.key for regime in REGIMES if entity in regime.entities)
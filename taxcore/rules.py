@@ -0,0 +1,129 @@
+# taxcore/rules.py
+"""Версионированные таблицы ставок и лимитов с поиском по дате вступления в силу.
+
+Таблицы читаются из JSON (по умолчанию taxcore/rules.json), проверяются и один
+раз компилируются в RuleBook: отсортированный кортеж неизменяемых RuleSet и
+список дат начала действия для бинарного поиска. Пакетный расчёт нескольких
+налоговых лет берёт нужный RuleSet по дате, не перечитывая файл на каждую запись.
+"""
+import json
+import os
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+LIMIT_FIELDS = ("limit_snr_month", "limit_snr_year")
+RATE_FIELDS = (
+    "rate_opv", "rate_osms_emp", "rate_ipn",                        # удержания с работника
+    "rate_so", "rate_osms_er", "rate_soc_tax", "rate_os_ns",        # начисления работодателя
+    "rate_snr", "rate_ip_general", "rate_too_kpn",                  # ставки режимов
+)
+# базы для расчёта по каждому сотруднику (payroll.py): МЗП/МРП в тенге, границы баз — в МЗП/МРП
+PAYROLL_FIELDS = (
+    "mzp", "mrp",
+    "opv_base_max_mzp", "osms_emp_base_max_mzp",                    # предел базы удержаний
+    "so_base_min_mzp", "so_base_max_mzp", "osms_er_base_max_mzp",   # пределы базы начислений
+    "ipn_deduction_mrp",                                            # стандартный вычет по ИПН в месяц
+)
+RULE_FIELDS = LIMIT_FIELDS + RATE_FIELDS + PAYROLL_FIELDS
+
+RuleSet = namedtuple("RuleSet", ("version", "effective_from") + RULE_FIELDS)
+
+
+class RulesError(ValueError):
+    """Ошибка в файле правил (нет поля, неверная ставка, дубли дат и т.п.)."""
+
+
+def _parse_rule_set(raw, n):
+    where = f"rule_sets[{n}]"
+    if not isinstance(raw, dict):
+        raise RulesError(f"{where}: ожидается объект")
+    missing = [f for f in ("version", "effective_from") + RULE_FIELDS if f not in raw]
+    if missing:
+        raise RulesError(f"{where}: нет полей {', '.join(missing)}")
+    unknown = sorted(set(raw) - set(RuleSet._fields))
+    if unknown:
+        raise RulesError(f"{where}: неизвестные поля {', '.join(unknown)}")
+    try:
+        effective_from = date.fromisoformat(raw["effective_from"])
+    except (TypeError, ValueError):
+        raise RulesError(f"{where}: effective_from должен быть датой YYYY-MM-DD") from None
+    values = {}
+    for f in RULE_FIELDS:
+        v = raw[f]
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise RulesError(f"{where}: {f} должен быть числом")
+        if f in RATE_FIELDS and not 0 <= v <= 1:
+            raise RulesError(f"{where}: ставка {f}={v} вне диапазона [0, 1]")
+        if f in LIMIT_FIELDS and v <= 0:
+            raise RulesError(f"{where}: лимит {f}={v} должен быть положительным")
+        if f in PAYROLL_FIELDS and v < 0:
+            raise RulesError(f"{where}: {f}={v} не может быть отрицательным")
+        values[f] = v
+    return RuleSet(version=str(raw["version"]), effective_from=effective_from, **values)
+
+
+class RuleBook:
+    """Скомпилированный набор RuleSet, упорядоченный по effective_from."""
+
+    __slots__ = ("rule_sets", "starts", "_by_version")
+
+    def __init__(self, rule_sets):
+        self.rule_sets = tuple(sorted(rule_sets, key=lambda rs: rs.effective_from))
+        if not self.rule_sets:
+            raise RulesError("файл правил не содержит ни одного rule_set")
+        self.starts = [rs.effective_from.toordinal() for rs in self.rule_sets]
+        if len(set(self.starts)) != len(self.starts):
+            raise RulesError("две записи с одинаковой effective_from")
+        self._by_version = {rs.version: rs for rs in self.rule_sets}
+        if len(self._by_version) != len(self.rule_sets):
+            raise RulesError("версии правил должны быть уникальными")
+
+    def __len__(self):
+        return len(self.rule_sets)
+
+    def __iter__(self):
+        return iter(self.rule_sets)
+
+    @property
+    def latest(self):
+        return self.rule_sets[-1]
+
+    def index_at(self, on):
+        """Индекс RuleSet, действующего на дату on (date или 'YYYY-MM-DD')."""
+        if isinstance(on, str):
+            on = date.fromisoformat(on)
+        i = bisect_right(self.starts, on.toordinal()) - 1
+        if i < 0:
+            raise RulesError(f"нет правил на дату {on} (первые действуют с {self.rule_sets[0].effective_from})")
+        return i
+
+    def at(self, on):
+        """RuleSet, действующий на дату on."""
+        return self.rule_sets[self.index_at(on)]
+
+    def version(self, version):
+        """RuleSet по строке версии."""
+        try:
+            return self._by_version[version]
+        except KeyError:
+            raise RulesError(f"нет правил версии {version!r}") from None
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """Прочитать, проверить и скомпилировать файл правил в RuleBook."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    raw_sets = data.get("rule_sets") if isinstance(data, dict) else None
+    if not isinstance(raw_sets, list):
+        raise RulesError(f"{path}: ожидается объект с массивом rule_sets")
+    return RuleBook(_parse_rule_set(raw, n) for n, raw in enumerate(raw_sets))
+
+
+@lru_cache(maxsize=None)
+def default_rules():
+    """RuleBook из taxcore/rules.json (читается один раз на процесс)."""
+    return load_rules()
@@ -0,0 +1,37 @@
+# taxcore/simple.py
+"""Расчёт налогов простой версии (app.py). Чистый Python без тяжёлых импортов."""
+from types import SimpleNamespace
+
+from taxcore.regimes import compile_regimes
+
+# --- Константы ---
+LIMIT_SNR_MONTH = 1_300_000       # месячный лимит для СНР (≈300 МРП)
+LIMIT_SNR_YEAR = 2_500_000_000    # годовой лимит для СНР (~2,5 млрд тг)
+
+# параметры режимов простой версии (имена — как поля RuleSet, см. taxcore.regimes)
+SIMPLE_RULES = SimpleNamespace(
+    rate_snr=0.04, rate_ip_general=0.10, rate_too_kpn=0.20,
+    limit_snr_month=LIMIT_SNR_MONTH, limit_snr_year=LIMIT_SNR_YEAR,
+)
+WARNING_TEXTS = {
+    "warn_employees": "⚠️ СНР неприменим для физлица с сотрудниками.",
+    "warn_month_limit": "⚠️ Доход превышает лимит для СНР (~1,3 млн ₸ в месяц).",
+    "warn_year_limit": "⚠️ Доход превышает лимит для СНР (2,5 млрд ₸ в год).",
+    ("warn_month_limit", "snr_ip_too_kh"): "⚠️ Внимание!!! Доход превышает лимит для СНР (~1,3 млн ₸ в месяц).",
+    ("warn_year_limit", "snr_ip_too_kh"): "⚠️ Внимание!!! Доход превышает лимит для СНР (2,5 млрд ₸ в год).",
+    "warn_loss": "⚠️ У вас убыток, налог на прибыль не взимается.",
+}
+# чистый доход: самозанятый не вычитает ФОТ, СНР юрлица/ИП — без расходов, общий режим — всё
+NET_COSTS = {
+    "snr_individual": ("tax",),
+    "snr_ip_too_kh": ("tax", "salaries"),
+}
+REGIME_TABLE = compile_regimes(SIMPLE_RULES, WARNING_TEXTS, NET_COSTS, zero=0)
+
+# --- Функции ---
+# calculate_taxes собирается из реестра одной функцией с ветвью на режим (горячий путь app)
+calculate_taxes = REGIME_TABLE.compile_after_tax(
+    "calculate_taxes", "entity, mode, income_year, salaries_year, expenses_year",
+    ("income_year", "salaries_year", "expenses_year", None), "0, income_year, []")
+calculate_taxes.__doc__ = "Расчёт налогов по выбранному режиму"
+calculate_taxes.__module__ = __name__
@@ -0,0 +1,164 @@
+# taxcore/store.py
+"""Постоянное хранилище результатов на диске (SQLite) с ключами по содержимому.
+
+Ключ записи — SHA-256 от имени функции, «отпечатка» правил и нормализованных
+входов (normalize_key). Отпечаток compute_mode_tax — значения RuleSet вместе с
+версией и хэш исходника taxcore/calc.py; у calculate_taxes ставки зашиты в код,
+поэтому отпечаток — хэш taxcore/simple.py. Формулы режимов обе функции берут
+из реестра, поэтому в отпечаток входит и хэш taxcore/regimes.py. Изменились
+ставки, лимиты или формулы — меняется отпечаток, и старые записи просто
+перестают находиться; purge_stale() удаляет их из файла (вызывается при открытии).
+
+Одинаковые сценарии с разных запусков и машин дают один ключ, поэтому файл
+можно переносить между машинами. Чтение и запись — пакетами (get_many,
+put_many), одна транзакция на пакет.
+"""
+import hashlib
+import json
+import numbers
+import os
+import sqlite3
+import threading
+
+from taxcore import calc, regimes, simple
+from taxcore.cache import normalize_key
+
+_SQL_CHUNK = 500  # параметров в одном IN (...) — меньше лимита старых SQLite (999)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    func TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_fingerprint ON results (fingerprint);
+"""
+
+
+def _file_hash(module):
+    with open(module.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def fingerprint(func_name, rules=None):
+    """Отпечаток формул и ставок, от которых зависит результат функции."""
+    if func_name == "compute_mode_tax":
+        r = rules or calc.CURRENT_RULES
+        payload = repr((_file_hash(calc), _file_hash(regimes), tuple(r)))
+    elif func_name == "calculate_taxes":
+        payload = repr((_file_hash(simple), _file_hash(regimes)))
+    else:
+        raise ValueError(f"неизвестная функция {func_name!r}")
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _norm_arg(x):
+    # то же, что normalize_key для плоских аргументов, но без рекурсии (горячий путь)
+    t = type(x)
+    if t is float or t is int:
+        return float(x) + 0.0
+    if t is str:
+        return x
+    if isinstance(x, numbers.Real) and not isinstance(x, bool):
+        return float(x) + 0.0  # числа numpy (np.int64, np.float32 ...) дают тот же ключ, что int/float
+    return normalize_key(x)[0]
+
+
+def make_key(fp, func_name, args):
+    """Ключ записи (16 байт) для входов args функции func_name при отпечатке fp."""
+    payload = repr((func_name, fp, tuple(map(_norm_arg, args))))
+    return hashlib.sha256(payload.encode("utf-8")).digest()[:16]
+
+
+class ResultStore:
+    """Хранилище результатов compute_mode_tax / calculate_taxes в файле SQLite.
+
+    Потокобезопасно в пределах процесса; несколько процессов могут работать с
+    одним файлом (WAL). rulebook — какие правила считать актуальными при
+    очистке (по умолчанию все записи taxcore/rules.json).
+    """
+
+    FUNCS = {"compute_mode_tax": calc.compute_mode_tax, "calculate_taxes": simple.calculate_taxes}
+
+    def __init__(self, path, rulebook=None, purge=True):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if purge:
+            self.purge_stale(rulebook)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, keys):
+        """Словарь key -> значение для найденных ключей."""
+        keys = list(keys)
+        found = {}
+        loads = json.loads
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[i:i + _SQL_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                found.update((k, loads(v)) for k, v in rows)
+        return found
+
+    def put_many(self, items):
+        """Записать пары (key, func_name, fingerprint, value) одной транзакцией."""
+        rows = [(k, f, fp, json.dumps(v, ensure_ascii=False)) for k, f, fp, v in items]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+
+    def compute_many(self, func_name, rows, rules=None):
+        """Результаты func_name(*row) для всех rows: найденные берутся из файла, остальные считаются и пишутся.
+
+        Для compute_mode_tax rules передаётся в функцию и входит в отпечаток.
+        Значения возвращаются в формате JSON (кортежи — списками).
+        """
+        func = self.FUNCS[func_name]
+        fp = fingerprint(func_name, rules)
+        rows = [tuple(r) for r in rows]
+        keys = [make_key(fp, func_name, r) for r in rows]
+        found = self.get_many(set(keys))
+        new = {}
+        for key, row in zip(keys, rows):
+            if key not in found and key not in new:
+                value = func(*row, rules) if func_name == "compute_mode_tax" else func(*row)
+                new[key] = json.loads(json.dumps(value, ensure_ascii=False))
+        if new:
+            self.put_many((k, func_name, fp, v) for k, v in new.items())
+        with self._lock:
+            self.hits += len(rows) - len(new)
+            self.misses += len(new)
+        found.update(new)
+        return [found[k] for k in keys]
+
+    def purge_stale(self, rulebook=None):
+        """Удалить записи, чей отпечаток не соответствует текущим формулам и правилам; вернуть число удалённых."""
+        from taxcore.rules import default_rules
+
+        rulebook = rulebook or default_rules()
+        current = [fingerprint("compute_mode_tax", rs) for rs in rulebook] + [fingerprint("calculate_taxes")]
+        with self._lock, self._db:
+            cur = self._db.execute(
+                f"DELETE FROM results WHERE fingerprint NOT IN ({','.join('?' * len(current))})", current)
+        return cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size,
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
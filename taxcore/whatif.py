@@ -0,0 +1,94 @@
+# taxcore/whatif.py
+"""Сценарий расчёта app2 в виде графа зависимостей (taxcore.graph) для «что если».
+
+    входы (период, доход, ФОТ, амортизация, строки расходов)
+      -> годовые значения (по узлу на вход и на строку расходов)
+      -> expenses_components -> expenses_sum
+      -> mode:<режим> (compute_mode_flags) -> info:<режим>
+      -> mode_infos
+    ФОТ -> salary_items (calc_salary_items) -> company_total_tax:<режим>
+
+Переключение одной строки расходов пересчитывает её годовое значение, сумму
+расходов и налоги режимов, но не начисления по ФОТ; изменение ФОТ не трогает
+строки расходов. Порядок сложения расходов — порядок добавления строк, как в
+app2.main, поэтому результаты совпадают с прямым расчётом бит в бит.
+"""
+from taxcore import MODE_KEYS
+from taxcore.calc import calc_salary_items, compute_mode_flags, to_annual
+from taxcore.graph import Graph
+from taxcore.metrics import inc
+
+
+def _components(names, *values):
+    return {n: v for n, v in zip(names, values) if v is not None}
+
+
+def _line_annual(amount, enabled, period_choice):
+    return to_annual(amount, period_choice) if enabled else None
+
+
+def _mode_tax(mk, *args):
+    inc("mode_evaluations_total", mode=mk)
+    return compute_mode_flags(mk, *args)
+
+
+def mode_info(mode_result, salary_items):
+    """Итоги режима (как в app2) из результата compute_mode_flags и calc_salary_items.
+
+    flags — имена флагов предупреждений (WARNING_FLAGS); тексты — по таблице режимов при выводе.
+    """
+    mode_tax, taxable_base, flags = mode_result
+    _, _, emp_total, er_total = salary_items
+    return {
+        "mode_tax": mode_tax,
+        "taxable_base": taxable_base,
+        "flags": flags,
+        # company_total_tax: include ONLY employer contributions + mode_tax (do not include IPN)
+        "company_total_tax": mode_tax + er_total,
+        "employee_withholdings_total": emp_total,
+        "employer_contributions_total": er_total,
+    }
+
+
+class ScenarioGraph:
+    """Граф сценария: set_* меняют входы, get(узел) пересчитывает только затронутое."""
+
+    def __init__(self, period_choice="В год"):
+        self.graph = Graph()
+        self.expense_names = []
+        g = self.graph
+        g.add_input("period", period_choice)
+        for name in ("income", "salaries", "amortization"):
+            g.add_input(name, 0.0)
+            g.add_node(f"annual:{name}", to_annual, [name, "period"])
+        g.add_node("expenses_components", lambda *v: _components(self.expense_names, *v), [])
+        g.add_node("expenses_sum", lambda comp: sum(comp.values()), ["expenses_components"])
+        g.add_node("salary_items", calc_salary_items, ["annual:salaries"])
+        for mk in MODE_KEYS:
+            g.add_node(f"mode:{mk}", lambda *a, mk=mk: _mode_tax(mk, *a),
+                       ["annual:income", "annual:salaries", "expenses_sum", "annual:amortization"])
+            g.add_node(f"info:{mk}", mode_info, [f"mode:{mk}", "salary_items"])
+        g.add_node("mode_infos", lambda *infos: dict(zip(MODE_KEYS, infos)), [f"info:{mk}" for mk in MODE_KEYS])
+
+    def set_inputs(self, period_choice=None, **values):
+        """Задать период и/или income, salaries, amortization (в периоде ввода)."""
+        if period_choice is not None:
+            self.graph.set("period", period_choice)
+        for name, value in values.items():
+            self.graph.set(name, value)
+
+    def set_expense(self, name, amount, enabled=True):
+        """Задать строку расходов; новая строка добавляется в конец (порядок суммирования)."""
+        g = self.graph
+        if name not in self.expense_names:
+            self.expense_names.append(name)
+            g.add_input(f"expense:{name}", amount)
+            g.add_input(f"use:{name}", enabled)
+            g.add_node(f"annual:expense:{name}", _line_annual, [f"expense:{name}", f"use:{name}", "period"])
+            g.set_deps("expenses_components", [f"annual:expense:{n}" for n in self.expense_names])
+        else:
+            g.set(f"expense:{name}", amount)
+            g.set(f"use:{name}", enabled)
+
+    def get(self, name):
+        return self.graph.get(name)
@@ -0,0 +1,86 @@
+# tests/test_batch.py
+"""Пакетный расчёт (batch.py) против скалярного (taxcore) на сетке входов — бит в бит.
+
+Сетка включает NaN, нули, отрицательную и нулевую прибыль и значения вокруг
+лимитов СНР (ровно на лимите и на одно представимое число выше/ниже).
+"""
+import itertools
+
+import numpy as np
+
+from batch import (calc_salary_items_batch, calculate_taxes_batch, compare_regimes_batch, compute_batch,
+                   warnings_at)
+from taxcore import MODE_KEYS, calc_salary_items, calculate_taxes, compute_mode_tax, simple
+from taxcore.calc import CURRENT_RULES
+from taxcore.regimes import WARNING_FLAGS
+
+
+def _around(x):
+    return [np.nextafter(x, -np.inf), x, np.nextafter(x, np.inf)]
+
+
+INCOMES = [0.0, -0.0, 1.0, -5e5, 1e6, 3e6, 1e8, np.nan,
+           *_around(CURRENT_RULES.limit_snr_month * 12), *_around(CURRENT_RULES.limit_snr_year),
+           *_around(simple.LIMIT_SNR_MONTH * 12.0), *_around(float(simple.LIMIT_SNR_YEAR))]
+SALARIES = [0.0, 1e5, 5e6, np.nan]
+EXPENSES = [0.0, 1e6, 3e6, np.nan]  # при доходе 1e6 / 3e6 — нулевая прибыль
+AMORTIZATION = [0.0, -0.0, 3e5]
+MODES = list(MODE_KEYS) + ["bogus"]
+
+
+def _grid(*axes):
+    rows = list(itertools.product(*axes))
+    return [np.array(col) for col in zip(*rows)]
+
+
+def _same(a, b):
+    """Совпадение float бит в бит (NaN равен NaN, 0.0 не равен -0.0)."""
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return a.shape == b.shape and a.tobytes() == b.tobytes()
+
+
+def test_compute_batch_matches_compute_mode_tax():
+    modes, income, salaries, expenses, amortization = _grid(MODES, INCOMES, SALARIES, EXPENSES, AMORTIZATION)
+    res = compute_batch(income, salaries, expenses, amortization, modes)
+    scalar = [compute_mode_tax(*row) for row in zip(modes, income, salaries, expenses, amortization)]
+    assert _same(res["mode_tax"], [tax for tax, _, _ in scalar])
+    assert _same(res["taxable_base"], [base for _, base, _ in scalar])
+    for i, (mk, (_, _, warnings)) in enumerate(zip(modes, scalar)):
+        if mk in MODE_KEYS:
+            assert warnings_at(res, mk, i) == warnings, (mk, income[i], salaries[i], expenses[i], amortization[i])
+        else:
+            assert not warnings and not any(res[name][i] for name in WARNING_FLAGS)
+
+
+def test_salary_items_batch_matches_scalar():
+    salaries = np.array(SALARIES + [-1.0, 1e9])
+    emp, er, emp_total, er_total = calc_salary_items_batch(salaries)
+    for i, s in enumerate(salaries):
+        s_emp, s_er, s_emp_total, s_er_total = calc_salary_items(s)
+        assert _same(emp_total[i], s_emp_total) and _same(er_total[i], s_er_total)
+        assert all(_same(emp[k][i], v) for k, v in s_emp.items())
+        assert all(_same(er[k][i], v) for k, v in s_er.items())
+
+
+def test_calculate_taxes_batch_matches_calculate_taxes():
+    modes, income, salaries, expenses = _grid(MODES, INCOMES, SALARIES, EXPENSES)
+    tax, after_tax, flags = calculate_taxes_batch(modes, income, salaries, expenses)
+    scalar = [calculate_taxes("ip", *row) for row in zip(modes, income, salaries, expenses)]
+    assert _same(tax, [t for t, _, _ in scalar])
+    assert _same(after_tax, [net for _, net, _ in scalar])
+    table = simple.REGIME_TABLE
+    for i, (mk, (_, _, warnings)) in enumerate(zip(modes, scalar)):
+        texts = table.texts[table.codes[mk]] if mk in table.codes else ()
+        assert [t for name, t in zip(WARNING_FLAGS, texts) if flags[name][i]] == warnings
+
+
+def test_compare_regimes_best_mode():
+    income, salaries, expenses, amortization = _grid(INCOMES, SALARIES, EXPENSES, AMORTIZATION)
+    res = compare_regimes_batch(income, salaries, expenses, amortization)
+    for i in range(income.size):
+        available = [mk for mk in MODE_KEYS if res[f"available_{mk}"][i]]
+        taxes = [res[f"tax_{mk}"][i] for mk in available]
+        if not available:
+            assert res["best_mode"][i] == -1
+        elif not np.isnan(taxes).any():
+            assert MODE_KEYS[res["best_mode"][i]] == available[int(np.argmin(taxes))]  # первый при равенстве
@@ -0,0 +1,30 @@
+# tests/test_batch_cli.py
+"""Потоковый прогон batch_cli.run: порции с разными выведенными типами колонок пишутся в один файл."""
+import pandas as pd
+import pytest
+
+from batch_cli import run
+
+# в первых порциях суммы и client_id целые, в последней — дробные / пустые
+CSV = """client_id,income,salaries,expenses,mode
+1,12000000,3000000,2000000,general_too
+2,20000000,0,1000000,snr_ip_too_kh
+3,5000000,1000000,6000000,general_ip
+4,1500000,0,0,snr_individual
+5,1.5e7,2500000.5,1000000.25,general_too
+,3e7,0.5,0,general_ip
+"""
+
+
+@pytest.mark.parametrize("compare", [False, True])
+@pytest.mark.parametrize("suffix", [".parquet", ".csv"])
+def test_mixed_chunk_types(tmp_path, compare, suffix):
+    src = tmp_path / "in.csv"
+    src.write_text(CSV)
+    chunked, whole = tmp_path / f"chunked{suffix}", tmp_path / f"whole{suffix}"
+    assert run(str(src), str(chunked), chunksize=2, compare=compare) == 6
+    assert run(str(src), str(whole), chunksize=100, compare=compare) == 6
+    read = pd.read_parquet if suffix == ".parquet" else pd.read_csv
+    out, expected = read(chunked), read(whole)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=suffix == ".csv")
+    assert out["income"].tolist() == [1.2e7, 2e7, 5e6, 1.5e6, 1.5e7, 3e7]
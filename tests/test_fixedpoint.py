@@ -0,0 +1,65 @@
+# tests/test_fixedpoint.py
+"""Расчёт в целых тиынах (fixedpoint.py) против decimal.Decimal с теми же правилами округления."""
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+import fixedpoint
+from fixedpoint import _MAX_SAFE, RATE_DENOM, apply_rate, compute_batch_tiyn, rate_numerators, to_tiyn
+
+DECIMAL_ROUNDING = {fixedpoint.HALF_UP: ROUND_HALF_UP, fixedpoint.HALF_EVEN: ROUND_HALF_EVEN,
+                    fixedpoint.DOWN: ROUND_DOWN}
+
+
+def decimal_rate(amount_tiyn, numerator, rounding=ROUND_HALF_UP):
+    return int((Decimal(int(amount_tiyn)) * numerator / RATE_DENOM).quantize(Decimal(1), rounding))
+
+
+def test_to_tiyn_matches_decimal():
+    rng = np.random.default_rng(0)
+    # три знака после запятой — половины тиына встречаются часто, в том числе у отрицательных
+    amounts = [float(Decimal(int(i)) / 1000) for i in rng.integers(-10 ** 12, 10 ** 12, 20_000)]
+    amounts += [0.005, -0.005, 0.015, -0.015, 1.125, -1.125, 2.345, -2.345, 0.0049, -0.0051]
+    expected = [int((Decimal(repr(x)) * 100).quantize(Decimal(1), ROUND_HALF_UP)) for x in amounts]
+    assert to_tiyn(amounts).tolist() == expected
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, -np.inf])
+def test_to_tiyn_rejects_non_finite(bad):
+    with pytest.raises(ValueError):
+        to_tiyn([1.0, bad])
+
+
+def test_to_tiyn_overflow():
+    with pytest.raises(OverflowError):
+        to_tiyn([1.0, -1e20])
+
+
+@pytest.mark.parametrize("mode", sorted(DECIMAL_ROUNDING))
+def test_apply_rate_matches_decimal(monkeypatch, mode):
+    monkeypatch.setitem(fixedpoint.ROUNDING, "mode_tax", (1, mode))
+    rng = np.random.default_rng(1)
+    numerator = rate_numerators()["so"]  # 3.5% -> 350: 100 тиын × нечётное дают ровно половину тиына
+    amounts = np.concatenate([rng.integers(-10 ** 12, 10 ** 12, 20_000), np.arange(-2_000, 2_001, 100),
+                              [_MAX_SAFE, -_MAX_SAFE, _MAX_SAFE - 1, -_MAX_SAFE + 1]])
+    expected = [decimal_rate(a, numerator, DECIMAL_ROUNDING[mode]) for a in amounts]
+    assert apply_rate(amounts, numerator, "mode_tax").tolist() == expected
+    assert apply_rate(-100, numerator, "mode_tax") == -decimal_rate(100, numerator, DECIMAL_ROUNDING[mode])
+
+
+def test_apply_rate_overflow():
+    with pytest.raises(OverflowError):
+        apply_rate([_MAX_SAFE + 1], 350, "so")
+    with pytest.raises(OverflowError):
+        apply_rate([-_MAX_SAFE - 1], 350, "so")
+
+
+def test_compute_batch_tiyn_matches_decimal():
+    r = rate_numerators()
+    income, salaries, expenses = to_tiyn([20_000_000.37, 3_000_000.5, 5_000_000.01])
+    res = compute_batch_tiyn([income] * 2, [salaries] * 2, [expenses] * 2, 0, ["general_too", "snr_ip_too_kh"])
+    profit = income - expenses - salaries
+    assert res["mode_tax"].tolist() == [decimal_rate(profit, r["too_kpn"]), decimal_rate(income, r["snr"])]
+    er = sum(decimal_rate(salaries, r[k]) for k in ("so", "osms_er", "soc_tax", "os_ns"))
+    assert res["employer_contributions_total"].tolist() == [er, er]
@@ -0,0 +1,74 @@
+# tests/test_inverse.py
+"""Обратный расчёт (inverse.py): решения в закрытом виде, проверенные скалярным прямым расчётом."""
+import itertools
+
+import numpy as np
+import pytest
+
+from inverse import SOLVE_METHODS, solve_batch
+from taxcore import MODE_KEYS, calc_salary_items, calculate_taxes, compute_mode_tax
+
+TARGETS = [-2e6, 0.0, 1e6, 8e6, 2.5e7]
+OTHERS = [0.0, 1.5e6, 6e6]
+TOL = 0.005
+
+
+def net_app2(mk, income, salaries, expenses, amortization):
+    """Чистый доход компании как в app2.main."""
+    mode_tax = compute_mode_tax(mk, income, salaries, expenses, amortization)[0]
+    er_total = calc_salary_items(salaries)[3]
+    return income - (salaries + expenses + amortization + mode_tax + er_total)
+
+
+def _grid(*axes):
+    return [np.array(col) for col in zip(*itertools.product(*axes))]
+
+
+@pytest.mark.parametrize("mk", MODE_KEYS)
+def test_income_round_trip(mk):
+    target, salaries, expenses = _grid(TARGETS, OTHERS, OTHERS)
+    res = solve_batch(target, "income", salaries=salaries, expenses=expenses, amortization=2e5, modes=mk)
+    for i in range(target.size):
+        if res["method"][i] == SOLVE_METHODS.index("infeasible"):
+            assert np.isnan(res["income"][i])
+            continue
+        assert res["method"][i] == SOLVE_METHODS.index("closed")
+        assert res["income"][i] >= 0
+        assert net_app2(mk, res["income"][i], salaries[i], expenses[i], 2e5) == pytest.approx(target[i], abs=TOL)
+    # положительная цель достижима всегда, отрицательная без расходов — нет (нужен отрицательный доход)
+    assert (res["method"][target > 0] == SOLVE_METHODS.index("closed")).all()
+    assert (res["method"][(target < 0) & (salaries == 0) & (expenses == 0)] ==
+            SOLVE_METHODS.index("infeasible")).all()
+
+
+@pytest.mark.parametrize("mk", MODE_KEYS)
+def test_salaries_round_trip(mk):
+    target, income, expenses = _grid(TARGETS, [0.0, 1e7, 4e7], OTHERS)
+    res = solve_batch(target, "salaries", income=income, expenses=expenses, modes=mk)
+    for i in range(target.size):
+        s = res["salaries"][i]
+        if np.isnan(s):
+            # недостижимо: даже при нулевом ФОТ чистый доход ниже цели
+            assert net_app2(mk, income[i], 0.0, expenses[i], 0.0) < target[i]
+            continue
+        assert s >= 0
+        assert net_app2(mk, income[i], s, expenses[i], 0.0) == pytest.approx(target[i], abs=TOL)
+        assert res["payroll_cost"][i] == pytest.approx(s + calc_salary_items(s)[3])
+
+
+@pytest.mark.parametrize("mk", MODE_KEYS)
+def test_app_engine_round_trip(mk):
+    target, salaries, expenses = _grid([0.0, 1e6, 8e6], OTHERS, OTHERS)
+    res = solve_batch(target, "income", salaries=salaries, expenses=expenses, modes=mk, engine="app")
+    for i in range(target.size):
+        after_tax = calculate_taxes("too", mk, res["income"][i], salaries[i], expenses[i])[1]
+        assert after_tax == pytest.approx(target[i], abs=TOL)
+
+
+def test_warnings_follow_solution():
+    # доход для 20 млн чистыми при СНР выше годового лимита — флаг как у compute_mode_tax
+    res = solve_batch([1e6, 2e7], "income", modes="snr_ip_too_kh")
+    for i, income in enumerate(res["income"]):
+        warnings = compute_mode_tax("snr_ip_too_kh", income, 0.0, 0.0, 0.0)[2]
+        assert bool(res["warn_year_limit"][i] or res["warn_month_limit"][i]) == bool(warnings)
+    assert res["warn_year_limit"][1]
@@ -0,0 +1,29 @@
+# tests/test_montecarlo.py
+"""Монте-Карло (montecarlo.py): сравнение без запасного общего режима и пустые выборки."""
+import numpy as np
+import pytest
+
+from montecarlo import simulate
+
+
+def test_without_fallback_mode():
+    # доход то ниже, то выше лимита СНР, общий режим не выбран
+    res = simulate(("uniform", 1e6, 1e8), draws=2000, modes=("snr_individual", "snr_ip_too_kh"))
+    summary = res["summary"]
+    assert 0 < res["snr_breach_probability"] < 1
+    assert np.isfinite(summary["mean"]).all()
+    assert summary["p_best"].sum() == pytest.approx(1 - res["snr_breach_probability"])
+    assert res["recommended"] in summary.index
+
+
+def test_never_available():
+    res = simulate(1e9, draws=100, modes=("snr_ip_too_kh",))
+    assert res["snr_breach_probability"] == 1.0
+    assert res["summary"]["mean"].isna().all()
+    assert res["summary"]["p_best"].sum() == 0
+    assert res["recommended"] is None
+
+
+def test_draws_validated():
+    with pytest.raises(ValueError):
+        simulate(1e6, draws=0)
@@ -0,0 +1,66 @@
+# tests/test_payroll.py
+"""Расчёт ФОТ по сотрудникам (payroll.py) против скалярного calc_salary_items и пределов баз по правилам."""
+import numpy as np
+
+from payroll import EMPLOYEE_ITEMS, EMPLOYER_ITEMS, compute_roster, payroll_items, roster_totals
+from taxcore import calc_salary_items, compute_mode_tax
+from taxcore.calc import CURRENT_RULES
+from taxcore.rules import PAYROLL_FIELDS
+
+R = CURRENT_RULES
+MZP, MRP = R.mzp, R.mrp
+# зарплаты вокруг всех пределов: 0, ниже МЗП (минимум базы СО), у 7/20/40/50 МЗП и выше
+SALARIES = np.array([
+    [0.0, 0.5 * MZP, MZP, 2e5, 7 * MZP, 7 * MZP + 1, 20 * MZP, 20 * MZP + 1],
+    [40 * MZP - 1, 40 * MZP, 50 * MZP, 50 * MZP + 1, 1e7, 14 * MRP, 14 * MRP - 1, 3e5],
+])
+
+
+def scalar_items(s):
+    """Статьи одного сотрудника за месяц по формулам из docstring payroll.py, скалярными float."""
+    opv = min(s, 50 * MZP) * R.rate_opv
+    osms_emp = min(s, 20 * MZP) * R.rate_osms_emp
+    ipn = max(0.0, s - opv - osms_emp - 14 * MRP) * R.rate_ipn
+    so = min(max(s, MZP), 7 * MZP) * R.rate_so if s > 0 else 0.0
+    osms_er = min(s, 40 * MZP) * R.rate_osms_er
+    return {"opv": opv, "osms_emp": osms_emp, "ipn": ipn, "so": so, "osms_er": osms_er,
+            "soc_tax": s * R.rate_soc_tax, "os_ns": s * R.rate_os_ns}
+
+
+def test_caps_match_scalar():
+    assert (R.opv_base_max_mzp, R.osms_emp_base_max_mzp, R.so_base_min_mzp, R.so_base_max_mzp,
+            R.osms_er_base_max_mzp, R.ipn_deduction_mrp) == (50, 20, 1, 7, 40, 14)  # пределы в SALARIES
+    items = payroll_items(SALARIES)
+    for idx, s in np.ndenumerate(SALARIES):
+        for k, v in scalar_items(float(s)).items():
+            assert items[k][idx] == v, (k, s)
+    assert np.array_equal(items["er_total"], items["so"] + items["osms_er"] + items["soc_tax"] + items["os_ns"])
+
+
+def test_without_caps_equals_calc_salary_items():
+    rules = R._replace(**dict.fromkeys(PAYROLL_FIELDS, 0))
+    items = payroll_items(SALARIES, rules)
+    for idx, s in np.ndenumerate(SALARIES):
+        emp, er, emp_total, er_total = calc_salary_items(float(s), rules)
+        assert {label: items[k][idx] for k, label in EMPLOYEE_ITEMS.items()} == emp
+        assert {label: items[k][idx] for k, label in EMPLOYER_ITEMS.items()} == er
+        assert (items["emp_total"][idx], items["er_total"][idx]) == (emp_total, er_total)
+    # одна зарплата на весь фонд — то же, что calc_salary_items от фонда
+    total = SALARIES.sum()
+    _, _, emp_total, er_total = roster_totals([[total]], rules)
+    assert (emp_total, er_total) == calc_salary_items(total, rules)[2:]
+
+
+def test_caps_lower_contributions_of_high_earners():
+    high = np.full((1, 12), 1e7)
+    _, _, _, capped = roster_totals(high)
+    assert capped < calc_salary_items(high.sum())[3]
+
+
+def test_compute_roster():
+    info = compute_roster("general_too", 5e7, SALARIES, 4e6, 1e5)
+    annual = SALARIES.sum()
+    assert info["salaries_annual"] == annual
+    assert (info["mode_tax"], info["taxable_base"], info["warnings"]) == compute_mode_tax(
+        "general_too", 5e7, annual, 4e6, 1e5)
+    assert info["company_total_tax"] == info["mode_tax"] + roster_totals(SALARIES)[3]
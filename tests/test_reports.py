@@ -0,0 +1,35 @@
+# tests/test_reports.py
+"""Отчёты по портфелю (reports.py): колонка mode с пустыми и неизвестными ключами."""
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from reports import client_tables, export_reports, report_chunk
+from taxcore import MODE_KEYS
+
+PORTFOLIO = pd.DataFrame({
+    "client": ["ok", "typo", "future", "empty"],
+    "income": [2e7, 2e7, 3e7, 1e7],
+    "salaries": [3e6, 3e6, 0.0, 1e6],
+    "expenses": [5e6, 5e6, 1e6, 0.0],
+    "mode": ["general_too", "genral_too", "patent", np.nan],
+})
+
+
+def test_unknown_mode_falls_back_to_modes():
+    out = report_chunk((0, PORTFOLIO), "xlsx")
+    assert [row for row, _, _ in out] == [1, 2, 3, 4]
+    assert out[0][2] == client_tables(2e7, 3e6, 5e6, 0.0, ("general_too", "snr_individual", "snr_ip_too_kh",
+                                                           "general_ip"))
+    for _, client, tables in out[1:]:
+        expected = client_tables(*PORTFOLIO.loc[PORTFOLIO["client"] == client,
+                                                ["income", "salaries", "expenses"]].iloc[0], 0.0, MODE_KEYS)
+        assert tables == expected
+
+
+def test_export_with_unknown_mode(tmp_path):
+    assert export_reports([PORTFOLIO.iloc[:2], PORTFOLIO.iloc[2:]], str(tmp_path / "p.xlsx")) == 4
+    assert export_reports([PORTFOLIO], str(tmp_path / "p.zip")) == 4
+    with zipfile.ZipFile(tmp_path / "p.zip") as z:
+        assert len(z.namelist()) == 4
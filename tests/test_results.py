@@ -0,0 +1,77 @@
+# tests/test_results.py
+"""Колоночные результаты (results.py): выбор лучшего режима, память и обмен через Arrow/Parquet."""
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from batch import compare_regimes_batch, compute_batch
+from results import FLAG_BITS, VALUE_COLUMNS, ModeResults
+from taxcore import MODE_KEYS
+
+INCOME = np.array([2e7, 1e6, 3e7, 5e6])
+SALARIES = np.array([3e6, 0.0, 0.0, 1e5])
+EXPENSES = np.array([5e6, 2e6, 1e6, 0.0])
+
+
+def _results(mode="general_too", available=None):
+    res = compute_batch(INCOME, SALARIES, EXPENSES, 0.0, mode)
+    return ModeResults.from_batch(res, mode, INCOME, SALARIES, EXPENSES, 0.0, available)
+
+
+def _one_client(taxes, available):
+    n = len(taxes)
+    return ModeResults(np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n), taxes, np.zeros(n),
+                       ModeResults.pack_flags(unavailable=~np.asarray(available, dtype=bool)))
+
+
+def test_best_matches_compare_regimes():
+    for i in range(INCOME.size):
+        cmp = compare_regimes_batch(INCOME[i], SALARIES[i], EXPENSES[i], 0.0)
+        results = _one_client([cmp[f"tax_{mk}"] for mk in MODE_KEYS],
+                              [bool(cmp[f"available_{mk}"]) for mk in MODE_KEYS])
+        assert results.best() == cmp["best_mode"]
+
+
+def test_best_skips_nan_and_unavailable():
+    assert _one_client([np.nan, 5.0, 3.0, 3.0], [True, True, True, True]).best() == 2
+    assert _one_client([1.0, np.nan, 4.0], [False, True, True]).best() == 2
+    assert _one_client([np.nan, 1.0], [True, False]).best() == -1
+    assert _one_client([1.0, 2.0], [False, False]).best() == -1
+    assert _one_client([], []).best() == -1
+
+
+def test_nbytes_counts_broadcast_column_once():
+    results = _results()
+    assert results.mode.strides == (0,)  # режим один на все строки — broadcast без копии
+    expected = results.mode.itemsize + sum(getattr(results, c).nbytes for c in VALUE_COLUMNS) + results.flags.nbytes
+    assert results.nbytes() == expected
+    modes = np.array(MODE_KEYS)
+    assert ModeResults.from_batch(compute_batch(INCOME, SALARIES, EXPENSES, 0.0, modes), modes, INCOME, SALARIES,
+                                  EXPENSES, 0.0).nbytes() == expected - 1 + INCOME.size
+
+
+def _from_table(table):
+    mode = table.column("mode").combine_chunks()
+    codes = mode.indices.fill_null(-1).to_numpy()
+    assert mode.dictionary.to_pylist() == list(MODE_KEYS)
+    return ModeResults(codes, *(table.column(c).to_numpy() for c in VALUE_COLUMNS), table.column("flags").to_numpy())
+
+
+def test_arrow_round_trip(tmp_path):
+    modes = np.array(MODE_KEYS[:3] + ("bogus",))  # неизвестный режим — код -1, в Arrow — null
+    available = np.array([True, False, True, True])
+    res = compute_batch(INCOME, SALARIES, EXPENSES, 0.0, modes)
+    results = ModeResults.from_batch(res, modes, INCOME, SALARIES, EXPENSES, 0.0, available)
+    table = results.to_arrow()
+    assert table.column("mode").to_pylist() == list(MODE_KEYS[:3]) + [None]
+    assert table.column("flags").type == pa.uint8()
+
+    path = tmp_path / "r.parquet"
+    results.to_parquet(str(path))
+    for back in (_from_table(table), _from_table(pq.read_table(path))):
+        for name in results.__slots__:
+            assert np.array_equal(getattr(back, name), getattr(results, name)), name
+        assert back.best() == results.best()
+        assert [back.warnings(i) for i in range(len(back))] == [results.warnings(i) for i in range(len(results))]
+        assert (back.flag("unavailable") == ~available).all()
+    assert results.flags[1] & FLAG_BITS["unavailable"]
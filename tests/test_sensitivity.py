@@ -0,0 +1,86 @@
+# tests/test_sensitivity.py
+"""Чувствительность (sensitivity.py) против конечных разностей и обнуления входов в скалярном расчёте."""
+import itertools
+
+import numpy as np
+import pytest
+
+from sensitivity import sensitivity_batch
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax
+from taxcore.calc import regime_table
+from taxcore.regimes import WARNING_FLAGS
+
+# доход 1e7 при расходах 7e6 + ФОТ 3e6 — ровно нулевая прибыль (излом)
+INCOMES = [0.0, 1e6, 1e7, 3e7]
+SALARIES = [0.0, 3e6]
+EXPENSES = [0.0, 7e6]
+AMORTIZATION = [0.0, 5e5]
+RENT = 2e6  # статья внутри expenses (только там, где expenses >= RENT)
+
+
+def scalar(mk, income, salaries, expenses, amortization):
+    """(совокупный налог компании, чистый доход, доступен) как в app2.main."""
+    mode_tax, _, warnings = compute_mode_tax(mk, income, salaries, expenses, amortization)
+    tax = mode_tax + calc_salary_items(salaries)[3]
+    table = regime_table()
+    loss = table.texts[table.codes[mk]][WARNING_FLAGS.index("warn_loss")]
+    return tax, income - (salaries + expenses + amortization + tax), set(warnings) <= {loss}
+
+
+def _grid():
+    rows = list(itertools.product(INCOMES, SALARIES, EXPENSES, AMORTIZATION))
+    return [np.array(col) for col in zip(*rows)]
+
+
+def test_values_match_scalar():
+    income, salaries, expenses, amortization = _grid()
+    sens = sensitivity_batch(income, salaries, expenses, amortization)
+    for j, mk in enumerate(sens.modes):
+        for i in range(income.size):
+            tax, net, available = scalar(mk, income[i], salaries[i], expenses[i], amortization[i])
+            assert (sens.tax[j, i], sens.net[j, i], sens.available[j, i]) == (tax, net, available)
+
+
+def test_derivatives_match_right_differences():
+    income, salaries, expenses, amortization = _grid()
+    sens = sensitivity_batch(income, salaries, expenses, amortization)
+    h = 1.0  # следующий тенге: производные правые
+    for j, mk in enumerate(sens.modes):
+        for i in range(income.size):
+            point = {"income": income[i], "salaries": salaries[i], "expenses": expenses[i],
+                     "amortization": amortization[i]}
+            tax, net, _ = scalar(mk, **point)
+            for name in point:
+                tax_h, net_h, _ = scalar(mk, **dict(point, **{name: point[name] + h}))
+                assert sens.d_tax[name][j, i] == pytest.approx((tax_h - tax) / h, abs=1e-6), (mk, name, point)
+                assert sens.d_net[name][j, i] == pytest.approx((net_h - net) / h, abs=1e-6), (mk, name, point)
+            assert sens.marginal_rate[j, i] == sens.d_tax["income"][j, i]
+
+
+def test_deltas_match_zeroed_inputs():
+    income, salaries, expenses, amortization = _grid()
+    rent = np.minimum(expenses, RENT)
+    sens = sensitivity_batch(income, salaries, expenses, amortization, expense_items={"rent": rent})
+    for j, mk in enumerate(sens.modes):
+        for i in range(income.size):
+            point = {"income": income[i], "salaries": salaries[i], "expenses": expenses[i],
+                     "amortization": amortization[i]}
+            tax, net, _ = scalar(mk, **point)
+            zeroed = {name: dict(point, **{name: 0.0}) for name in point}
+            zeroed["rent"] = dict(point, expenses=expenses[i] - rent[i])
+            for name, without in zeroed.items():
+                tax_0, net_0, _ = scalar(mk, **without)
+                assert sens.delta_tax[name][j, i] == pytest.approx(tax - tax_0, abs=1e-6), (mk, name, point)
+                assert sens.delta_net[name][j, i] == pytest.approx(net - net_0, abs=1e-6), (mk, name, point)
+
+
+def test_effective_rate():
+    sens = sensitivity_batch([0.0, 2e7], 1e6, 2e6, modes=("general_too",))
+    assert np.isnan(sens.effective_rate[0, 0])
+    assert sens.effective_rate[0, 1] == sens.tax[0, 1] / 2e7
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        sensitivity_batch(1e6, 0.0, 0.0, modes=("general_too", "bogus"))
+    assert sensitivity_batch(1e6, 0.0, 0.0).modes == MODE_KEYS
@@ -0,0 +1,99 @@
+# tests/test_service.py
+"""HTTP-сервис (service.py): проверка входов и микропакет против скалярного compute_mode_tax."""
+import asyncio
+import json
+
+import pytest
+
+from service import TaxService
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax
+
+
+def _run(coro_func, **kwargs):
+    """Выполнить coro_func(service) с запущенным MicroBatcher."""
+    async def main():
+        service = TaxService(**kwargs)
+        service.batcher.start()
+        try:
+            return await coro_func(service)
+        finally:
+            await service.batcher.stop()
+    return asyncio.run(main())
+
+
+def _post(body):
+    return _run(lambda service: service.handle("POST", "/calculate", body))
+
+
+@pytest.mark.parametrize("body", [
+    b'{"income": NaN, "mode": "general_too"}',
+    b'{"income": Infinity, "mode": "general_too"}',
+    b'{"salaries": -Infinity, "mode": "general_too"}',
+    b'{"income": 1e400, "mode": "general_too"}',
+    b'{"income": 1' + b"0" * 400 + b', "mode": "general_too"}',
+    b'{"income": 1e308, "period": "month", "mode": "general_too"}',  # × 12 — уже inf
+])
+def test_non_finite_rejected(body):
+    status, payload = _post(body)
+    assert status == 400 and "конечным" in payload["error"]
+
+
+@pytest.mark.parametrize("body", [
+    b"{", b"", b"null", b"[1, 2]", b'"general_too"', b"\xff\xfe",
+    b'{"income": "1e6", "mode": "general_too"}',
+    b'{"income": true, "mode": "general_too"}',
+    b'{"income": 1e6}',
+    b'{"income": 1e6, "mode": "bogus"}',
+])
+def test_malformed_rejected(body):
+    status, payload = _post(body)
+    assert status == 400 and payload["error"]
+
+
+def test_micro_batch_matches_scalar():
+    rows = [{"income": 1e6 * (i + 1), "salaries": 3e5 * (i % 3), "expenses": 2e5 * i, "amortization": 1e4,
+             "mode": MODE_KEYS[i % len(MODE_KEYS)]} for i in range(40)]
+    rows.append({"income": 2e6, "salaries": 1e5, "period": "month", "mode": "snr_ip_too_kh"})
+
+    async def calculate(service):
+        return await asyncio.gather(*(service.handle("POST", "/calculate", json.dumps(r).encode()) for r in rows))
+
+    async def run(service):
+        responses = await calculate(service)
+        return responses, list(service.batcher.batch_sizes)
+
+    responses, batch_sizes = _run(run, max_batch=512, max_wait_ms=50.0)
+    assert batch_sizes == [len(rows)]  # одновременные запросы посчитаны одним пакетом
+    for row, (status, out) in zip(rows, responses):
+        factor = 12 if row.get("period") == "month" else 1
+        args = [row.get(k, 0.0) * factor for k in ("income", "salaries", "expenses", "amortization")]
+        mode_tax, taxable_base, warnings = compute_mode_tax(row["mode"], *args)
+        _, _, emp_total, er_total = calc_salary_items(args[1])
+        assert status == 200
+        assert (out["mode_tax"], out["taxable_base"], out["warnings"]) == (mode_tax, taxable_base, warnings)
+        assert out["employee_withholdings_total"] == emp_total
+        assert out["company_total_tax"] == mode_tax + er_total
+        assert out["warn_year_limit"] == any("годовой" in w for w in warnings)
+
+
+def test_http_round_trip():
+    async def run(service):
+        server = await asyncio.start_server(service.serve_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            replies = []
+            for body in (b'{"income": 5e6, "mode": "general_ip"}', b"{oops"):
+                writer.write(b"POST /calculate HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                status = int((await reader.readline()).split()[1])
+                headers = {}
+                while (line := await reader.readline()) != b"\r\n":
+                    name, _, value = line.decode().partition(":")
+                    headers[name.lower()] = value.strip()
+                replies.append((status, json.loads(await reader.readexactly(int(headers["content-length"])))))
+            writer.close()
+        return replies
+
+    (ok, out), (bad, err) = _run(run)
+    assert ok == 200 and out["mode_tax"] == compute_mode_tax("general_ip", 5e6, 0.0, 0.0, 0.0)[0]
+    assert bad == 400 and "error" in err
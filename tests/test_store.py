@@ -0,0 +1,44 @@
+# tests/test_store.py
+"""Хранилище результатов (taxcore/store.py): попадания, промахи, смена правил и ключи numpy-чисел."""
+import numpy as np
+
+from taxcore import compute_mode_tax
+from taxcore.calc import CURRENT_RULES
+from taxcore.store import ResultStore, fingerprint, make_key
+
+ROWS = [("general_too", 2e7, 3e6, 5e6, 0.0), ("snr_individual", 1.5e6, 0.0, 0.0, 0.0)]
+
+
+def test_hit_and_miss(tmp_path):
+    with ResultStore(str(tmp_path / "r.sqlite")) as store:
+        first = store.compute_many("compute_mode_tax", ROWS)
+        assert (store.hits, store.misses) == (0, 2)
+        again = store.compute_many("compute_mode_tax", ROWS + [("general_ip", 1e7, 0.0, 1e6, 0.0)])
+        assert (store.hits, store.misses) == (2, 3)
+        assert again[:2] == first
+        assert first == [list(compute_mode_tax(*row)) for row in ROWS]
+        assert store.stats()["size"] == 3
+
+
+def test_rules_change_invalidates(tmp_path):
+    path = str(tmp_path / "r.sqlite")
+    changed = CURRENT_RULES._replace(rate_too_kpn=0.25)
+    assert fingerprint("compute_mode_tax", changed) != fingerprint("compute_mode_tax")
+    with ResultStore(path) as store:
+        store.compute_many("compute_mode_tax", ROWS)
+        store.compute_many("compute_mode_tax", ROWS[:1], changed)
+        assert store.misses == 3  # при других правилах старая запись не находится
+        assert store.stats()["size"] == 3
+    # правил changed нет в rules.json — при открытии их записи удаляются
+    with ResultStore(path) as store:
+        assert store.stats()["size"] == 2
+
+
+def test_numpy_and_python_numbers_share_key():
+    fp = fingerprint("calculate_taxes")
+    key = make_key(fp, "calculate_taxes", ("ТОО", "general_too", 5, 0, -0.0))
+    for args in [("ТОО", "general_too", np.int64(5), np.int32(0), 0.0),
+                 ("ТОО", "general_too", np.float64(5), np.float32(0), np.float64(-0.0)),
+                 ("ТОО", "general_too", 5.0, 0.0, 0)]:
+        assert make_key(fp, "calculate_taxes", args) == key
+    assert make_key(fp, "calculate_taxes", ("ТОО", "general_too", 6, 0, 0)) != key
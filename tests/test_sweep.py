@@ -0,0 +1,61 @@
+# tests/test_sweep.py
+"""Карта режимов (sweep.py) против перебора скалярным compute_mode_tax на плотной сетке дохода."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sweep import regime_map
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax
+from taxcore.calc import regime_table
+from taxcore.regimes import WARNING_FLAGS
+
+EXPENSES = [0.0, 2e6, 1.2e7]
+PAYROLL = [0.0, 3e6]
+AMORTIZATION = 1e5
+INCOME_MIN, INCOME_MAX = 0.0, 6e7
+
+
+def scalar_best(income, expenses, payroll, modes):
+    """Лучший режим как в app2.main: минимум совокупного налога среди доступных, первый при равенстве."""
+    table = regime_table()
+    er_total = calc_salary_items(payroll)[3]
+    best, best_tax = None, np.inf
+    for mk in modes:
+        tax, _, warnings = compute_mode_tax(mk, income, payroll, expenses, AMORTIZATION)
+        loss = table.texts[table.codes[mk]][WARNING_FLAGS.index("warn_loss")]
+        if set(warnings) <= {loss} and tax + er_total < best_tax:
+            best, best_tax = mk, tax + er_total
+    return best
+
+
+def _mode(value):
+    return None if pd.isna(value) else value  # -1 -> None; pandas со строковым dtype хранит его как NaN
+
+
+@pytest.mark.parametrize("modes", [MODE_KEYS, ("general_too", "snr_ip_too_kh"), ("snr_individual",)])
+def test_regime_map_matches_scalar(modes):
+    df = regime_map(INCOME_MIN, INCOME_MAX, EXPENSES, PAYROLL, AMORTIZATION, modes=modes)
+    for (e, s), cell in df.groupby(["expenses", "payroll"], sort=False):
+        lo, hi, best = (cell[c].to_numpy() for c in ("income_from", "income_to", "best_mode"))
+        best = [_mode(mk) for mk in best]
+        # интервалы покрывают весь диапазон без разрывов, соседние — с разными победителями
+        assert lo[0] == INCOME_MIN and hi[-1] == INCOME_MAX and (lo[1:] == hi[:-1]).all()
+        assert all(a != b for a, b in zip(best, best[1:]))
+        # внутри интервала (на самих границах налоги равны) победитель тот же, что у перебора
+        for a, b, mk in zip(lo, hi, best):
+            for q in (1e-6, 0.25, 0.5, 0.75, 1 - 1e-6):
+                assert scalar_best(a + (b - a) * q, e, s, modes) == mk, (e, s, a, b, q)
+        # плотная сетка: каждая точка вне окрестности границ попадает в интервал своего победителя
+        edges = np.append(lo, INCOME_MAX)
+        for income in np.linspace(INCOME_MIN, INCOME_MAX, 1201):
+            if np.min(np.abs(edges - income)) >= 1e-3:
+                mk = best[np.searchsorted(edges, income, side="right") - 1]
+                assert scalar_best(income, e, s, modes) == mk, (e, s, income)
+
+
+def test_regime_map_has_snr_limit_breakpoint():
+    table = regime_table()
+    limit = min(12 * table.month_limit[0], table.year_limit[0])
+    df = regime_map(INCOME_MIN, INCOME_MAX, [0.0], [0.0], 0.0)
+    assert limit in set(df["income_to"])
+    assert df["best_mode"].iloc[-1] in ("general_ip", "general_too")
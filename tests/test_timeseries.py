@@ -0,0 +1,81 @@
+# tests/test_timeseries.py
+"""Помесячный расчёт (timeseries.py) против скалярного compute_mode_tax по месяцам и календарным годам."""
+import numpy as np
+import pytest
+
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax
+from taxcore.calc import CURRENT_RULES, regime_table
+from taxcore.regimes import WARNING_FLAGS
+from timeseries import compute_monthly
+
+N_MONTHS = 30
+START_MONTH = 7  # ряд с июля: календарные годы — 6, 12 и 12 месяцев
+
+
+def _series(seed):
+    rng = np.random.default_rng(seed)
+    # сезонный доход: в пиковые месяцы выше месячного лимита СНР, в среднем — около годового
+    income = np.round(rng.uniform(0.3, 2.5, N_MONTHS) * CURRENT_RULES.limit_snr_month / 1.3)
+    salaries = np.round(rng.uniform(0, 4e5, N_MONTHS))
+    expenses = np.round(rng.uniform(0, 1.2e6, N_MONTHS))
+    return income, salaries, expenses
+
+
+def _years():
+    """Срезы календарных годов ряда."""
+    first = 12 - (START_MONTH - 1)
+    bounds = [0] + list(range(first, N_MONTHS, 12)) + [N_MONTHS]
+    return [slice(a, b) for a, b in zip(bounds, bounds[1:])]
+
+
+def _warned(mk, flag, income):
+    table = regime_table()
+    text = table.texts[table.codes[mk]][WARNING_FLAGS.index(flag)]
+    return text in compute_mode_tax(mk, income, 0.0, 0.0, 0.0)[2]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("mk", MODE_KEYS)
+def test_monthly_matches_scalar(mk, seed):
+    income, salaries, expenses = _series(seed)
+    res = compute_monthly(income, salaries, expenses, 1e4, mk, start_month=START_MONTH)
+
+    # налог режима за календарный год — compute_mode_tax на годовые суммы того же года
+    for year in _years():
+        annual = compute_mode_tax(mk, income[year].sum(), salaries[year].sum(), expenses[year].sum(),
+                                  1e4 * (year.stop - year.start))[0]
+        assert res["mode_tax"][year].sum() == pytest.approx(annual, rel=1e-12, abs=1e-6)
+        ytd = np.cumsum(income[year])
+        assert (res["ytd_income"][year] == ytd).all()
+        # годовой лимит — по доходу с начала года, как предупреждение compute_mode_tax на эту сумму
+        assert res["year_breach"][year].tolist() == [_warned(mk, "warn_year_limit", x) for x in ytd]
+    # месячный лимит — доход месяца, пересчитанный в год (× 12), как в app2
+    assert res["month_breach"].tolist() == [_warned(mk, "warn_month_limit", 12 * x) for x in income]
+    assert res["first_month_breach"] == (int(np.argmax(res["month_breach"])) if res["month_breach"].any() else -1)
+    assert res["first_year_breach"] == (int(np.argmax(res["year_breach"])) if res["year_breach"].any() else -1)
+
+    # начисления по ФОТ — calc_salary_items от ФОТ каждого месяца
+    for i, s in enumerate(salaries):
+        _, _, emp_total, er_total = calc_salary_items(s)
+        assert res["employer_contributions"][i] == er_total
+        assert res["employee_withholdings"][i] == emp_total
+        assert res["company_total_tax"][i] == res["mode_tax"][i] + er_total
+
+
+def test_ytd_resets_each_calendar_year():
+    income = np.full(N_MONTHS, 2e6)
+    res = compute_monthly(income, modes="snr_ip_too_kh", start_month=START_MONTH)
+    expected = np.concatenate([np.cumsum(income[year]) for year in _years()])
+    assert (res["ytd_income"] == expected).all()
+    assert (res["rolling_income"][11:] == 24e6).all()
+
+
+def test_clients_axis():
+    rows = [_series(seed) for seed in range(3)]
+    income, salaries, expenses = (np.stack(cols) for cols in zip(*rows))
+    modes = np.array(["snr_individual", "general_ip", "snr_ip_too_kh"])
+    res = compute_monthly(income, salaries, expenses, 0.0, modes, start_month=START_MONTH)
+    for i, mk in enumerate(modes):
+        one = compute_monthly(income[i], salaries[i], expenses[i], 0.0, mk, start_month=START_MONTH)
+        for key, value in one.items():
+            assert np.array_equal(res[key][i], value), key
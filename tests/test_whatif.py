@@ -0,0 +1,99 @@
+# tests/test_whatif.py
+"""Граф «что если» (taxcore/whatif.py): инкрементальный пересчёт против прямого расчёта как в app2.main."""
+import numpy as np
+import pytest
+
+from taxcore import MODE_KEYS, calc_salary_items, compute_mode_tax, to_annual
+from taxcore.calc import regime_table
+from taxcore.regimes import WARNING_FLAGS
+from taxcore.whatif import ScenarioGraph
+
+LINES = ("Аренда", "Материалы", "Услуги подрядчиков", "Командировочные", "Проценты по кредитам", "Прочие расходы")
+
+
+def direct(period, income, salaries, amortization, expenses):
+    """Итоги режимов напрямую: годовые значения, сумма расходов в порядке строк, compute_mode_tax."""
+    income, salaries, amortization = (to_annual(v, period) for v in (income, salaries, amortization))
+    expenses_sum = sum(to_annual(amount, period) for amount, enabled in expenses if enabled)
+    _, _, emp_total, er_total = calc_salary_items(salaries)
+    out = {}
+    for mk in MODE_KEYS:
+        mode_tax, taxable_base, warnings = compute_mode_tax(mk, income, salaries, expenses_sum, amortization)
+        out[mk] = (mode_tax, taxable_base, warnings, mode_tax + er_total, emp_total, er_total)
+    return out
+
+
+def from_graph(sg):
+    table = regime_table()
+    out = {}
+    for mk, info in sg.get("mode_infos").items():
+        texts = dict(zip(WARNING_FLAGS, table.texts[table.codes[mk]]))
+        out[mk] = (info["mode_tax"], info["taxable_base"], [texts[f] for f in info["flags"]],
+                   info["company_total_tax"], info["employee_withholdings_total"],
+                   info["employer_contributions_total"])
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_direct(seed):
+    rng = np.random.default_rng(seed)
+    period = "В месяц"
+    inputs = {"income": 2e6, "salaries": 3e5, "amortization": 1e4}
+    expenses = {name: (float(rng.integers(0, 4e5)), True) for name in LINES}
+    sg = ScenarioGraph(period)
+    sg.set_inputs(**inputs)
+    for name, (amount, enabled) in expenses.items():
+        sg.set_expense(name, amount, enabled)
+    for _ in range(60):
+        kind = rng.integers(4)
+        if kind == 0:
+            name = LINES[rng.integers(len(LINES))]
+            expenses[name] = (expenses[name][0], not expenses[name][1])
+            sg.set_expense(name, *expenses[name])
+        elif kind == 1:
+            name = LINES[rng.integers(len(LINES))]
+            expenses[name] = (float(rng.choice([0.0, rng.uniform(0, 5e6)])), expenses[name][1])
+            sg.set_expense(name, *expenses[name])
+        elif kind == 2:
+            key = ("income", "salaries", "amortization")[rng.integers(3)]
+            inputs[key] = float(rng.choice([0.0, rng.uniform(0, 2e7)]))
+            sg.set_inputs(**{key: inputs[key]})
+        else:
+            period = "В год" if period == "В месяц" else "В месяц"
+            sg.set_inputs(period)
+        assert from_graph(sg) == direct(period, inputs["income"], inputs["salaries"], inputs["amortization"],
+                                        [expenses[name] for name in LINES])
+
+
+def _recomputed(sg):
+    sg.get("mode_infos")
+    return set(sg.graph.last_recomputed)
+
+
+def test_recompute_only_affected_nodes():
+    sg = ScenarioGraph("В месяц")
+    sg.set_inputs(income=2e6, salaries=3e5, amortization=0.0)
+    for name in LINES:
+        sg.set_expense(name, 1e5)
+    sg.set_expense("Нулевая", 0.0, False)
+    _recomputed(sg)
+
+    sg.set_expense("Аренда", 2e5)
+    done = _recomputed(sg)
+    assert "annual:expense:Аренда" in done and "expenses_sum" in done
+    assert {f"mode:{mk}" for mk in MODE_KEYS} <= done
+    assert "salary_items" not in done and "annual:expense:Материалы" not in done
+
+    sg.set_inputs(salaries=4e5)
+    done = _recomputed(sg)
+    assert "salary_items" in done and not any(n.startswith("annual:expense:") for n in done)
+
+    # включение нулевого расхода не меняет сумму — налоги режимов не пересчитываются (ранняя отсечка)
+    sg.set_expense("Нулевая", 0.0, True)
+    done = _recomputed(sg)
+    assert "expenses_components" in done and not any(n.startswith("mode:") for n in done)
+
+    total = sg.graph.stats()["total_recomputed"]
+    sg.set_inputs(income=2e6)  # то же значение — ничего не пересчитывается
+    sg.get("mode_infos")
+    assert sg.graph.stats()["total_recomputed"] == total
@@ -0,0 +1,126 @@
+# timeseries.py
+"""Помесячный расчёт: реальные месячные суммы вместо to_annual(…) = сумма × 12.
+
+Сезонный доход в среднем может укладываться в лимиты СНР, а в отдельные месяцы
+их превышать; средняя цифра это скрывает. Здесь входы — ряды по месяцам
+(последняя ось — месяцы, впереди может быть ось клиентов), и всё считается
+векторно по нарастающим итогам (cumsum) без циклов по месяцам:
+
+    ytd_income        доход нарастающим итогом с начала календарного года;
+    rolling_income    доход за скользящие 12 месяцев;
+    month_breach      доход месяца > лимита СНР в месяц;
+    year_breach       ytd_income > годового лимита СНР;
+    first_*_breach    индекс первого месяца с превышением (-1 — не было);
+    mode_tax          налог режима, начисленный за месяц;
+    employer_contributions, employee_withholdings, company_total_tax — по месяцам.
+
+Налог режима по месяцам: СНР — ставка от дохода месяца; общий режим — прирост
+налога на прибыль с начала года (налог на нарастающую прибыль минус налог на
+неё же месяцем раньше). Убыточный месяц поэтому уменьшает начисление, а сумма
+за календарный год равна налогу compute_mode_tax на годовые суммы.
+Начисления по ФОТ линейны и считаются от ФОТ каждого месяца.
+"""
+import numpy as np
+
+from batch import calc_salary_items_batch, group_values, in_codes, mode_codes, over_limit, regime_groups
+from taxcore.calc import CURRENT_RULES, regime_table
+
+MONTH_NAMES = ("Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+               "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь")
+
+
+def _year_start_index(n_months, start_month=1):
+    """Для каждого месяца ряда — индекс первого месяца его календарного года в ряду."""
+    offset = np.arange(n_months) + (start_month - 1)
+    return np.maximum(offset // 12 * 12 - (start_month - 1), 0)
+
+
+def year_to_date(values, start_month=1):
+    """Нарастающий итог с начала календарного года по последней оси."""
+    values = np.asarray(values, dtype=np.float64)
+    cum = np.cumsum(values, axis=-1)
+    before = cum - values  # сумма до месяца (не включая его)
+    start = _year_start_index(values.shape[-1], start_month)
+    return cum - np.take(before, start, axis=-1)
+
+
+def rolling_sum(values, window=12):
+    """Скользящая сумма за window месяцев (для первых месяцев — за сколько есть)."""
+    values = np.asarray(values, dtype=np.float64)
+    cum = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(cum)
+    shifted[..., window:] = cum[..., :-window]
+    return cum - shifted
+
+
+def first_true(mask):
+    """Индекс первого True по последней оси, -1 — если таких нет."""
+    mask = np.asarray(mask, dtype=bool)
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), -1)
+
+
+def compute_monthly(income, salaries=0.0, expenses=0.0, amortization=0.0, modes="general_too",
+                    start_month=1, rules=None):
+    """Помесячный расчёт по рядам (..., n_месяцев); суммы — месячные, не годовые.
+
+    modes — режим (строка/код) для каждого ряда, форма входов без оси месяцев.
+    start_month — календарный месяц первого элемента ряда (1 — январь);
+    с него отсчитываются календарные годы для годового лимита и налога на прибыль.
+    Возвращает словарь массивов формы (..., n_месяцев) и first_*_breach формы (...).
+    """
+    r = rules or CURRENT_RULES
+    income, salaries, expenses, amortization = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (income, salaries, expenses, amortization)))
+    codes = np.broadcast_to(mode_codes(modes)[..., None], income.shape)
+
+    groups = regime_groups(regime_table(r))
+    income_base = in_codes(codes, groups.income_base)
+    profit_base = in_codes(codes, groups.profit_base)
+
+    ytd_income = year_to_date(income, start_month)
+    ytd_profit = year_to_date(income - expenses - salaries - amortization, start_month)
+    ytd_general_tax = np.where(ytd_profit > 0, ytd_profit * group_values(codes, groups.profit_rates, 0.0), 0.0)
+    prev = np.zeros_like(ytd_general_tax)
+    prev[..., 1:] = ytd_general_tax[..., :-1]
+    year_start = _year_start_index(income.shape[-1], start_month) == np.arange(income.shape[-1])
+    general_tax = ytd_general_tax - np.where(year_start, 0.0, prev)
+    mode_tax = np.select([income_base, profit_base], [income * group_values(codes, groups.income_rates, 0.0), general_tax], 0.0)
+
+    _, _, emp_total, er_total = calc_salary_items_batch(salaries, r)
+    month_breach = over_limit(codes, income, groups.month_limit)
+    year_breach = over_limit(codes, ytd_income, groups.year_limit)
+    return {
+        "ytd_income": ytd_income,
+        "rolling_income": rolling_sum(income),
+        "ytd_profit": ytd_profit,
+        "mode_tax": mode_tax,
+        "employee_withholdings": emp_total,
+        "employer_contributions": er_total,
+        "company_total_tax": mode_tax + er_total,
+        "warn_employees": in_codes(codes, groups.no_employees) & (salaries > 0),
+        "month_breach": month_breach,
+        "year_breach": year_breach,
+        "first_month_breach": first_true(month_breach),
+        "first_year_breach": first_true(year_breach),
+    }
+
+
+def monthly_frame(income, salaries=0.0, expenses=0.0, amortization=0.0, mode="general_too",
+                  start_month=1, rules=None):
+    """Таблица pandas по месяцам одного ряда (для app2 и отчётов)."""
+    import pandas as pd
+
+    res = compute_monthly(income, salaries, expenses, amortization, mode, start_month, rules)
+    n = res["mode_tax"].shape[-1]
+    months = [MONTH_NAMES[(start_month - 1 + i) % 12] for i in range(n)]
+    return pd.DataFrame({
+        "Месяц": months,
+        "Доход": np.broadcast_to(np.asarray(income, dtype=np.float64), (n,)),
+        "Доход с начала года": res["ytd_income"],
+        "Доход за 12 мес.": res["rolling_income"],
+        "Налог по режиму": res["mode_tax"],
+        "Начисления работодателя": res["employer_contributions"],
+        "Налог (компания)": res["company_total_tax"],
+        "Превышен лимит в месяц": res["month_breach"],
+        "Превышен лимит в год": res["year_breach"],
+    })